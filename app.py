@@ -6,7 +6,7 @@ from modules.ai_innovation import render_innovation
 from modules.ai_receipt import render_receipt
 from modules.ai_research import render_research
 from modules.ai_favorites import render_favorites
-from gemini_utils import gemini_generate
+from gemini_utils import gemini_generate, register_api_key
 
 # Must be first Streamlit call
 st.set_page_config(
@@ -53,6 +53,7 @@ if not api_key:
 
 try:
     client = genai.Client(api_key=api_key)
+    register_api_key(client, api_key)
 except Exception as e:
     st.error(f"❌ 初始化 Gemini 失敗：{e}")
     st.stop()
@@ -69,6 +70,7 @@ with st.sidebar:
                 f"⏳ Gemini 暫時繁忙，{delay} 秒後重試（第 {attempt + 1} 次）…"
             ),
             on_error=lambda e: st.error(f"❌ Gemini 錯誤：{e}"),
+            use_cache=False,
         )
         if result:
             st.success("✅ 連線成功！Gemini 回覆：")
@@ -1,7 +1,18 @@
+import concurrent.futures
+import contextlib
+import hashlib
 import json
+import os
 import re
+import sqlite3
+import threading
 import time
-from typing import Any, Callable, Optional
+import weakref
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional, Sequence
+
+_PROJECT_ROOT = Path(__file__).resolve().parent
+DEFAULT_CACHE_DIR = Path(os.environ.get("FOOD_INNOVATOR_CACHE_DIR") or (_PROJECT_ROOT / ".cache"))
 
 
 def _extract_text(response) -> str:
@@ -26,6 +37,669 @@ def _extract_text(response) -> str:
     return ""
 
 
+@contextlib.contextmanager
+def _sqlite_connect(path: Path) -> Iterator[sqlite3.Connection]:
+    """Autocommit connection; callers open explicit transactions where needed."""
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+class ResponseCache:
+    """SQLite-backed response cache shared by every session and worker process.
+
+    Entries are keyed by ``sha256(model + prompt)``, expire after ``ttl_seconds``
+    and are evicted least-recently-used once the stored text exceeds ``max_bytes``.
+    Hit / miss counters live in the same database so they aggregate across processes.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        ttl_seconds: float = 7 * 24 * 3600,
+        max_bytes: int = 64 * 1024 * 1024,
+    ):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, model TEXT, value TEXT, size INTEGER,"
+                " created_at REAL, accessed_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (accessed_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)")
+
+    def _connect(self):
+        return _sqlite_connect(self.path)
+
+    @staticmethod
+    def make_key(model_name: str, prompt: str) -> str:
+        return hashlib.sha256(f"{model_name}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def _bump(self, conn: sqlite3.Connection, name: str) -> None:
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1)"
+            " ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._bump(conn, "misses")
+                return None
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._bump(conn, "hits")
+            return row[0]
+
+    def set(self, key: str, model_name: str, value: str) -> None:
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model_name, value, size, now, now),
+            )
+            conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                excess = total - self.max_bytes
+                for old_key, old_size in conn.execute(
+                    "SELECT key, size FROM responses ORDER BY accessed_at"
+                ).fetchall():
+                    if excess <= 0:
+                        break
+                    conn.execute("DELETE FROM responses WHERE key = ?", (old_key,))
+                    excess -= old_size
+            conn.execute("COMMIT")
+
+    def delete(self, key: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+            entries, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+            conn.execute("DELETE FROM counters")
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Process-wide :class:`ResponseCache` under ``DEFAULT_CACHE_DIR``."""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(DEFAULT_CACHE_DIR / "gemini_responses.sqlite3")
+    return _response_cache
+
+
+# -----------------------------------------------------------
+# Rate limiting
+# -----------------------------------------------------------
+
+# Published Gemini API quotas as (requests/min, tokens/min) per model and
+# usage tier; "*" and "*embedding*" are the fallbacks for unlisted models.
+# GEMINI_QUOTA_TIER picks the table (default "free"; "tier1" for a billed
+# project). GEMINI_RPM / GEMINI_TPM override every generate model and
+# GEMINI_EMBED_RPM / GEMINI_EMBED_TPM every embedding model; set_rate_limit()
+# overrides one model at runtime. A tokens/min of None means only requests are
+# metered.
+_QUOTA_TIERS: dict[str, dict[str, tuple[float, Optional[float]]]] = {
+    "free": {
+        "gemini-flash-latest": (10, 250_000),
+        "gemini-2.5-flash": (10, 250_000),
+        "gemini-2.5-flash-lite": (15, 250_000),
+        "gemini-2.0-flash": (15, 1_000_000),
+        "gemini-2.0-flash-lite": (30, 1_000_000),
+        "gemini-embedding-001": (100, 30_000),
+        "*": (10, 250_000),
+        "*embedding*": (100, 30_000),
+    },
+    "tier1": {
+        "gemini-flash-latest": (1_000, 1_000_000),
+        "gemini-2.5-flash": (1_000, 1_000_000),
+        "gemini-2.5-flash-lite": (4_000, 4_000_000),
+        "gemini-2.0-flash": (2_000, 4_000_000),
+        "gemini-2.0-flash-lite": (4_000, 4_000_000),
+        "gemini-embedding-001": (3_000, 1_000_000),
+        "*": (1_000, 1_000_000),
+        "*embedding*": (3_000, 1_000_000),
+    },
+}
+
+
+def _quota_table() -> dict[str, tuple[float, Optional[float]]]:
+    tier = os.environ.get("GEMINI_QUOTA_TIER", "free").strip().lower()
+    table = {}
+    for name, (rpm, tpm) in _QUOTA_TIERS.get(tier, _QUOTA_TIERS["free"]).items():
+        prefix = "GEMINI_EMBED" if "embedding" in name else "GEMINI"
+        table[name] = (
+            float(os.environ.get(f"{prefix}_RPM") or rpm),
+            float(os.environ.get(f"{prefix}_TPM") or tpm or 0) or None,
+        )
+    return table
+
+
+RATE_LIMITS: dict[str, tuple[float, Optional[float]]] = _quota_table()
+
+_CJK_RE = re.compile(r"[\u3000-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]")
+
+
+def estimate_tokens(text: Any) -> int:
+    """Rough token count: one per CJK character, one per four other characters."""
+    if not isinstance(text, str):
+        text = str(text or "")
+    cjk = len(_CJK_RE.findall(text))
+    return max(1, cjk + (len(text) - cjk) // 4)
+
+
+def set_rate_limit(model_name: str, rpm: float, tpm: Optional[float] = None) -> None:
+    RATE_LIMITS[model_name] = (float(rpm), float(tpm) if tpm else None)
+
+
+def rate_limit_for(model_name: str) -> tuple[float, Optional[float]]:
+    for name in (model_name, model_name.removeprefix("models/")):
+        if name in RATE_LIMITS:
+            return RATE_LIMITS[name]
+    if "embedding" in model_name:
+        return RATE_LIMITS["*embedding*"]
+    return RATE_LIMITS["*"]
+
+
+# API keys of live clients, bound by register_api_key where each client is made.
+_client_api_keys: "weakref.WeakKeyDictionary[Any, str]" = weakref.WeakKeyDictionary()
+
+
+def register_api_key(client: Any, api_key: str) -> None:
+    """Bind ``client`` to ``api_key`` so rate limits and context caches are scoped per key."""
+    _client_api_keys[client] = api_key
+
+
+def _client_api_key(client: Any) -> Optional[str]:
+    try:
+        return _client_api_keys.get(client)
+    except TypeError:  # not weak-referenceable
+        return None
+
+
+def client_limit_key(client_or_key: Any, model_name: str) -> str:
+    """Bucket id for (API key, model); the key itself is hashed, never stored.
+
+    Pass the API key itself, or a client bound with :func:`register_api_key`.
+    Unregistered clients share one bucket per model, so every process still
+    meters them together.
+    """
+    if isinstance(client_or_key, str):
+        api_key = client_or_key
+    else:
+        api_key = _client_api_key(client_or_key) or "unregistered"
+    digest = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+    return f"{digest}:{model_name}"
+
+
+class RateLimiter:
+    """Token bucket per key, stored in SQLite so threads and worker processes share it.
+
+    Each bucket meters requests/min and (optionally) tokens/min. ``acquire``
+    blocks until both have capacity, so callers queue at the quota ceiling
+    instead of collecting 429s.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with _sqlite_connect(self.path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                " key TEXT PRIMARY KEY, requests REAL, tokens REAL, updated_at REAL)"
+            )
+
+    def try_acquire(
+        self,
+        key: str,
+        rpm: float,
+        tpm: Optional[float],
+        requests: float = 1,
+        tokens: float = 0,
+    ) -> float:
+        """Take capacity if available; return 0, else the seconds to wait before retrying."""
+        now = time.time()
+        requests = min(requests, rpm)
+        tokens = min(tokens, tpm) if tpm else 0
+        with _sqlite_connect(self.path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT requests, tokens, updated_at FROM buckets WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                req_level, tok_level, updated = rpm, tpm or 0, now
+            else:
+                req_level, tok_level, updated = row
+            elapsed = max(0.0, now - updated)
+            req_level = min(rpm, req_level + elapsed * rpm / 60)
+            tok_level = min(tpm, tok_level + elapsed * tpm / 60) if tpm else 0
+            if req_level >= requests and (not tpm or tok_level >= tokens):
+                req_level -= requests
+                tok_level -= tokens
+                wait = 0.0
+            else:
+                wait = (requests - req_level) * 60 / rpm
+                if tpm:
+                    wait = max(wait, (tokens - tok_level) * 60 / tpm)
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?)",
+                (key, req_level, tok_level, now),
+            )
+            conn.execute("COMMIT")
+        return max(wait, 0.0)
+
+    def acquire(self, key: str, model_name: str, requests: float = 1, tokens: float = 0) -> None:
+        rpm, tpm = rate_limit_for(model_name)
+        while True:
+            wait = self.try_acquire(key, rpm, tpm, requests, tokens)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+
+_rate_limiter: Optional[RateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Process-wide :class:`RateLimiter` under ``DEFAULT_CACHE_DIR``."""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter(DEFAULT_CACHE_DIR / "rate_limits.sqlite3")
+    return _rate_limiter
+
+
+def _throttle(client, model_name: str, prompt) -> None:
+    try:
+        get_rate_limiter().acquire(
+            client_limit_key(client, model_name), model_name, tokens=estimate_tokens(prompt)
+        )
+    except sqlite3.Error:
+        pass
+
+
+def _cache_lookup(model_name: str, prompt, use_cache: bool) -> tuple[Optional[str], Optional[str]]:
+    """Return ``(cache_key, cached_text)``; the key is None when caching does not apply."""
+    if not use_cache or not isinstance(prompt, str):
+        return None, None
+    try:
+        cache = get_response_cache()
+        cache_key = cache.make_key(model_name, prompt)
+        return cache_key, cache.get(cache_key)
+    except sqlite3.Error:
+        return None, None
+
+
+def _cache_store(cache_key: Optional[str], model_name: str, text_out: str) -> None:
+    if not cache_key or not text_out:
+        return
+    try:
+        get_response_cache().set(cache_key, model_name, text_out)
+    except sqlite3.Error:
+        pass
+
+
+def evict_cached_response(model_name: str, prompt, cached_prefix: Optional[str] = None) -> None:
+    """Drop the cached response for ``prompt`` (e.g. text the caller could not parse)."""
+    if not isinstance(prompt, str):
+        return
+    try:
+        cache = get_response_cache()
+        cache.delete(cache.make_key(model_name, _join_prefix(cached_prefix, prompt)))
+    except sqlite3.Error:
+        pass
+
+
+def _strip_fences(text: str) -> str:
+    return text.replace("```json", "").replace("```", "").strip()
+
+
+def _clean_output(response) -> str:
+    return _strip_fences(_extract_text(response))
+
+
+def _is_transient(error: Exception) -> bool:
+    err_str = str(error)
+    return any(code in err_str for code in ("503", "429", "UNAVAILABLE", "ResourceExhausted"))
+
+
+# -----------------------------------------------------------
+# Single-flight
+# -----------------------------------------------------------
+
+class SingleFlight:
+    """Coalesce concurrent identical calls onto one in-flight execution.
+
+    The first caller for a key (the leader) runs the work; callers arriving
+    while it is pending wait on the same future and share its result.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: dict[str, concurrent.futures.Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def _claim(self, key: str) -> tuple[concurrent.futures.Future, bool]:
+        with self._lock:
+            self.calls += 1
+            fut = self._inflight.get(key)
+            if fut is not None:
+                self.coalesced += 1
+                return fut, False
+            fut = self._inflight[key] = concurrent.futures.Future()
+            return fut, True
+
+    def _finish(self, key: str, fut: concurrent.futures.Future, result=None, error=None) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+        if error is not None:
+            fut.set_exception(error)
+        else:
+            fut.set_result(result)
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        fut, leader = self._claim(key)
+        if not leader:
+            return fut.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, fut, error=e)
+            raise
+        self._finish(key, fut, result)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._inflight),
+            }
+
+
+_single_flight = SingleFlight()
+
+
+def single_flight_stats() -> dict:
+    """Counters for coalesced ``gemini_generate`` calls in this process."""
+    return _single_flight.stats()
+
+
+def _flight_key(model_name: str, prompt) -> Optional[str]:
+    return ResponseCache.make_key(model_name, prompt) if isinstance(prompt, str) else None
+
+
+# -----------------------------------------------------------
+# Context caching
+# -----------------------------------------------------------
+
+# Gemini only accepts explicit caches above a minimum size (1,024 tokens on
+# Flash, 4,096 on Pro), and below that caching saves nothing; smaller prefixes
+# are sent inline.
+CONTEXT_CACHE_MIN_TOKENS = int(os.environ.get("GEMINI_CACHE_MIN_TOKENS", 1024))
+
+
+class ContextCache:
+    """Explicit Gemini cached contents for large prompt prefixes sent repeatedly.
+
+    A prefix is uploaded once per (API key, model, text) with
+    ``client.caches.create`` and then referenced by name, so later calls bill
+    and transmit only their variable suffix. A handle within ``refresh_margin``
+    seconds of expiry is extended with ``caches.update``. Past ``max_entries``
+    the least-used handles are deleted. Prefixes under ``min_tokens`` or
+    rejected by the API are remembered and sent inline. Concurrent requests for
+    one prefix share a single ``create`` (see SingleFlight). ``create`` and
+    ``update`` draw on the same RateLimiter budget as ``generate_content`` and
+    are retried with backoff on transient errors. The client is passed per
+    call, so any object with ``caches.create/update/delete`` works.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = 3600,
+        refresh_margin: float = 300,
+        max_entries: int = 32,
+        min_tokens: int = CONTEXT_CACHE_MIN_TOKENS,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin = refresh_margin
+        self.max_entries = max_entries
+        self.min_tokens = min_tokens
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict] = {}
+        self._rejected: set[str] = set()
+        self._flight = SingleFlight()
+        self.counters = {"created": 0, "reused": 0, "refreshed": 0, "evicted": 0, "inline": 0}
+
+    @staticmethod
+    def make_key(client, model_name: str, prefix: str) -> str:
+        # Cached contents belong to one API key, so the key is part of the identity.
+        scope = f"{_client_api_key(client) or f'client-{id(client)}'}\x00{model_name}"
+        return hashlib.sha256(f"{scope}\x00{prefix}".encode("utf-8")).hexdigest()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def handle(self, client, model_name: str, prefix: str) -> Optional[str]:
+        """Name of a live cached content holding ``prefix``, or None to send it inline."""
+        if estimate_tokens(prefix) < self.min_tokens:
+            self._count("inline")
+            return None
+        key = self.make_key(client, model_name, prefix)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["expires_at"] - time.time() > self.refresh_margin:
+                entry["uses"] += 1
+                entry["last_used"] = time.time()
+                self.counters["reused"] += 1
+                return entry["name"]
+            if key in self._rejected:
+                self.counters["inline"] += 1
+                return None
+        return self._flight.do(key, lambda: self._create_or_refresh(client, model_name, prefix, key))
+
+    @staticmethod
+    def _limited(client, model_name: str, call: Callable[[], Any], prompt: str = "", max_retries: int = 4):
+        """Run ``call`` under the model's rate limit, backing off on transient errors."""
+        delay = 2
+        for attempt in range(max_retries):
+            _throttle(client, model_name, prompt)
+            try:
+                return call()
+            except Exception as e:
+                if not _is_transient(e) or attempt == max_retries - 1:
+                    raise
+                time.sleep(delay)
+                delay *= 2
+
+    def _create_or_refresh(self, client, model_name: str, prefix: str, key: str) -> Optional[str]:
+        ttl = f"{int(self.ttl_seconds)}s"
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            try:
+                self._limited(
+                    client, model_name, lambda: client.caches.update(name=entry["name"], config={"ttl": ttl})
+                )
+            except Exception:
+                with self._lock:
+                    self._entries.pop(key, None)
+            else:
+                with self._lock:
+                    entry["expires_at"] = time.time() + self.ttl_seconds
+                    entry["uses"] += 1
+                    entry["last_used"] = time.time()
+                    self.counters["refreshed"] += 1
+                return entry["name"]
+        try:
+            cached = self._limited(
+                client,
+                model_name,
+                lambda: client.caches.create(
+                    model=model_name,
+                    config={"contents": [prefix], "ttl": ttl, "display_name": f"prefix-{key[:12]}"},
+                ),
+                prefix,
+            )
+        except Exception as e:
+            with self._lock:
+                if not _is_transient(e):
+                    if len(self._rejected) > 4096:
+                        self._rejected.clear()
+                    self._rejected.add(key)
+                self.counters["inline"] += 1
+            return None
+        now = time.time()
+        expires_at = _timestamp(getattr(cached, "expire_time", None)) or now + self.ttl_seconds
+        with self._lock:
+            self._entries[key] = {
+                "name": cached.name,
+                "client": client,
+                "expires_at": expires_at,
+                "uses": 1,
+                "last_used": now,
+            }
+            self.counters["created"] += 1
+            victims = self._pop_victims(now)
+        for victim in victims:
+            try:
+                victim["client"].caches.delete(name=victim["name"])
+            except Exception:
+                pass  # it still expires on its own at the end of its TTL
+        return cached.name
+
+    def _pop_victims(self, now: float) -> list[dict]:
+        """Drop expired entries, then the least-used ones beyond ``max_entries`` (lock held)."""
+        victims = [self._entries.pop(k) for k, e in list(self._entries.items()) if e["expires_at"] <= now]
+        excess = len(self._entries) - self.max_entries
+        if excess > 0:
+            ranked = sorted(self._entries, key=lambda k: (self._entries[k]["uses"], self._entries[k]["last_used"]))
+            victims += [self._entries.pop(k) for k in ranked[:excess]]
+            self.counters["evicted"] += excess
+        return victims
+
+    def invalidate(self, client, model_name: str, prefix: str) -> None:
+        """Forget the handle for ``prefix`` (e.g. it was deleted or expired server-side)."""
+        with self._lock:
+            self._entries.pop(self.make_key(client, model_name, prefix), None)
+
+    def clear(self) -> None:
+        """Delete every cached content this process created."""
+        with self._lock:
+            victims = list(self._entries.values())
+            self._entries.clear()
+            self._rejected.clear()
+        for victim in victims:
+            try:
+                victim["client"].caches.delete(name=victim["name"])
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counters, "entries": len(self._entries)}
+
+
+_context_cache = ContextCache()
+
+
+def get_context_cache() -> ContextCache:
+    """Process-wide :class:`ContextCache`."""
+    return _context_cache
+
+
+def _join_prefix(cached_prefix: Optional[str], prompt):
+    """The prompt as the model sees it: ``cached_prefix`` (if any), a blank line, ``prompt``."""
+    return prompt if cached_prefix is None else f"{cached_prefix}\n\n{prompt}"
+
+
+def _prepare_contents(client, model_name: str, prompt, cached_prefix: Optional[str]):
+    """``(contents, config)`` for a call, using a cached-content handle for the prefix when possible."""
+    if cached_prefix is None:
+        return prompt, None
+    name = _context_cache.handle(client, model_name, cached_prefix)
+    if name is None:
+        return _join_prefix(cached_prefix, prompt), None
+    return prompt, {"cached_content": name}
+
+
+def _generate_with_retry(
+    client,
+    model_name: str,
+    prompt,
+    max_retries: int,
+    on_retry: Optional[Callable[[int, int], None]],
+    cache_key: Optional[str],
+    cached_prefix: Optional[str] = None,
+) -> tuple[str, Optional[Exception]]:
+    delay = 2
+    last_error = None
+    config = None
+    for attempt in range(max_retries):
+        try:
+            _throttle(client, model_name, _join_prefix(cached_prefix, prompt))
+            contents, config = _prepare_contents(client, model_name, prompt, cached_prefix)
+            response = client.models.generate_content(model=model_name, contents=contents, config=config)
+            text_out = _clean_output(response)
+            _cache_store(cache_key, model_name, text_out)
+            return text_out, None
+        except Exception as e:
+            last_error = e
+            if config and not _is_transient(e) and attempt < max_retries - 1:
+                # The handle may have expired or been deleted server-side: drop
+                # it and retry with the prefix inline.
+                _context_cache.invalidate(client, model_name, cached_prefix)
+                prompt, cached_prefix = _join_prefix(cached_prefix, prompt), None
+                continue
+            if _is_transient(e) and attempt < max_retries - 1:
+                if on_retry:
+                    on_retry(attempt, delay)
+                time.sleep(delay)
+                delay *= 2
+            else:
+                break
+    return "", last_error
+
+
 def gemini_generate(
     client,
     model_name: str,
@@ -33,27 +707,87 @@ def gemini_generate(
     max_retries: int = 4,
     on_retry: Optional[Callable[[int, int], None]] = None,
     on_error: Optional[Callable[[Exception], None]] = None,
+    use_cache: bool = True,
+    cached_prefix: Optional[str] = None,
 ) -> str:
     """Call Gemini with exponential-backoff retry on 503 / transient errors.
 
-    on_retry(attempt, delay) — called before sleeping on a transient error.
+    on_retry(attempt, delay) — called before sleeping on a transient error
+                               (only by the caller that owns the request).
     on_error(exception)      — called once on final failure.
+    use_cache                — read/write the shared on-disk response cache
+                               (string prompts only); pass False to bypass.
+    cached_prefix            — static text the model sees before ``prompt``;
+                               large prefixes are held as Gemini cached
+                               contents (see ContextCache) and not resent.
+    Identical string prompts already in flight in this process are not sent
+    again; the caller waits for and shares that result (see SingleFlight).
     Returns the response text, or "" on failure.
     """
+    full_prompt = _join_prefix(cached_prefix, prompt)
+    cache_key, cached = _cache_lookup(model_name, full_prompt, use_cache)
+    if cached is not None:
+        return cached
+
+    def _call() -> tuple[str, Optional[Exception]]:
+        return _generate_with_retry(
+            client, model_name, prompt, max_retries, on_retry, cache_key, cached_prefix
+        )
+
+    flight_key = _flight_key(model_name, full_prompt)
+    text_out, error = _single_flight.do(flight_key, _call) if flight_key else _call()
+    if error is not None and on_error:
+        on_error(error)
+    return text_out
+
+
+def gemini_stream(
+    client,
+    model_name: str,
+    prompt,
+    max_retries: int = 4,
+    on_retry: Optional[Callable[[int, int], None]] = None,
+    on_error: Optional[Callable[[Exception], None]] = None,
+    use_cache: bool = True,
+    cached_prefix: Optional[str] = None,
+) -> Iterator[str]:
+    """Yield response text incrementally via ``generate_content_stream``.
+
+    Thought / signature parts are skipped exactly as in :func:`_extract_text`.
+    Transient errors are retried with backoff only until the first chunk has
+    been yielded. A cache hit yields the stored text as one chunk, and a
+    completed stream is written back to the response cache. ``cached_prefix``
+    works as in :func:`gemini_generate`.
+    """
+    cache_key, cached = _cache_lookup(model_name, _join_prefix(cached_prefix, prompt), use_cache)
+    if cached is not None:
+        yield cached
+        return
+
     delay = 2
     last_error = None
+    config = None
     for attempt in range(max_retries):
+        pieces: list[str] = []
         try:
-            response = client.models.generate_content(model=model_name, contents=prompt)
-            text_out = _extract_text(response)
-            return text_out.replace("```json", "").replace("```", "").strip()
+            _throttle(client, model_name, _join_prefix(cached_prefix, prompt))
+            contents, config = _prepare_contents(client, model_name, prompt, cached_prefix)
+            for chunk in client.models.generate_content_stream(
+                model=model_name, contents=contents, config=config
+            ):
+                text = _extract_text(chunk)
+                if text:
+                    pieces.append(text)
+                    yield text
+            _cache_store(cache_key, model_name, _strip_fences("".join(pieces)))
+            return
         except Exception as e:
             last_error = e
-            err_str = str(e)
-            is_transient = any(
-                code in err_str for code in ("503", "429", "UNAVAILABLE", "ResourceExhausted")
-            )
-            if is_transient and attempt < max_retries - 1:
+            if not pieces and config and not _is_transient(e) and attempt < max_retries - 1:
+                _context_cache.invalidate(client, model_name, cached_prefix)
+                prompt, cached_prefix = _join_prefix(cached_prefix, prompt), None
+                continue
+            if not pieces and _is_transient(e) and attempt < max_retries - 1:
                 if on_retry:
                     on_retry(attempt, delay)
                 time.sleep(delay)
@@ -62,7 +796,6 @@ def gemini_generate(
                 break
     if on_error:
         on_error(last_error)
-    return ""
 
 
 def parse_json_loose(text: str) -> Any:
@@ -81,3 +814,154 @@ def parse_json_loose(text: str) -> Any:
         except Exception:
             pass
     return {}
+
+
+# -----------------------------------------------------------
+# Files API uploads
+# -----------------------------------------------------------
+
+# The Files API keeps uploads for 48 hours; used only when a response carries
+# no expiration_time.
+FILES_API_TTL_SECONDS = 48 * 3600
+
+
+@contextlib.contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    """Exclusive advisory lock on ``path`` across processes (POSIX ``flock``)."""
+    try:
+        import fcntl
+    except ImportError:  # Windows: state writes are still atomic, just unserialized.
+        yield
+        return
+    with open(path, "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _timestamp(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    if hasattr(value, "timestamp"):
+        return value.timestamp()
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _file_state_name(remote: Any) -> str:
+    state = getattr(remote, "state", None)
+    return str(getattr(state, "name", state) or "")
+
+
+class FileUploadCache:
+    """Gemini Files API uploads keyed by content hash, shared by every session.
+
+    The JSON state maps ``sha256(file bytes)`` to the remote file. A renamed
+    file reuses its upload, and a changed file with the same name uploads again
+    at once. Cached entries are checked with ``files.get``. One whose remote
+    copy is gone, failed, or expires within ``refresh_margin`` seconds (read
+    from the file's ``expiration_time``) is uploaded again. Uploads and checks
+    run in a thread pool. The state is re-read and merged under a file lock,
+    then replaced atomically, so concurrent sessions never lose or tear entries.
+    """
+
+    def __init__(self, path: Path, refresh_margin: float = 3600, max_workers: int = 4):
+        self.path = Path(path)
+        self.refresh_margin = refresh_margin
+        self.max_workers = max_workers
+        self._lock_path = self.path.with_name(self.path.name + ".lock")
+
+    @staticmethod
+    def content_hash(path: Path) -> str:
+        return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+    def _read(self) -> dict[str, dict]:
+        try:
+            state = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(state, dict):
+            return {}
+        # Older name-keyed entries carry no hash and are simply uploaded again.
+        return {k: v for k, v in state.items() if isinstance(v, dict) and v.get("sha256") == k}
+
+    def _write(self, state: dict[str, dict]) -> None:
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(state, indent=2, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def _entry(self, digest: str, path: Path, remote: Any) -> dict:
+        now = time.time()
+        expires_at = _timestamp(getattr(remote, "expiration_time", None))
+        if expires_at is None:
+            created = _timestamp(getattr(remote, "create_time", None)) or now
+            expires_at = created + FILES_API_TTL_SECONDS
+        return {
+            "sha256": digest,
+            "display_name": path.name,
+            "file_uri": remote.uri,
+            "file_name": remote.name,
+            "mime_type": getattr(remote, "mime_type", None),
+            "uploaded_at": now,
+            "expires_at": expires_at,
+        }
+
+    def _still_valid(self, client, entry: dict) -> Optional[dict]:
+        """``entry`` with fresh expiry from ``files.get``, or None when it must be re-uploaded."""
+        if entry.get("expires_at", 0) - time.time() <= self.refresh_margin:
+            return None
+        try:
+            remote = client.files.get(name=entry["file_name"])
+        except Exception:
+            return None
+        if _file_state_name(remote) == "FAILED":
+            return None
+        expires_at = _timestamp(getattr(remote, "expiration_time", None)) or entry["expires_at"]
+        if expires_at - time.time() <= self.refresh_margin:
+            return None
+        return {**entry, "expires_at": expires_at}
+
+    def ensure(
+        self,
+        client,
+        paths: Sequence[Path],
+        force: bool = False,
+        log_fn: Optional[Callable[[str], None]] = None,
+    ) -> dict[str, dict]:
+        """Make sure every file in ``paths`` is uploaded; return ``{file name: entry}``."""
+        paths = [Path(p) for p in paths]
+        digests = {p: self.content_hash(p) for p in paths}
+        with _file_lock(self._lock_path):
+            known = self._read()
+
+        def _resolve(path: Path) -> tuple[Path, dict, bool]:
+            digest = digests[path]
+            entry = None if force else known.get(digest)
+            if entry is not None:
+                entry = self._still_valid(client, entry)
+            if entry is not None:
+                return path, {**entry, "display_name": path.name}, False
+            if log_fn:
+                log_fn(f"⬆️ Uploading {path.name}…")
+            remote = client.files.upload(file=path, config={"display_name": path.name})
+            return path, self._entry(digest, path, remote), True
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as pool:
+            results = list(pool.map(_resolve, paths))
+
+        by_name: dict[str, dict] = {}
+        for path, entry, uploaded in results:
+            by_name[path.name] = entry
+            if log_fn:
+                log_fn(f"☁️ Uploaded {path.name}" if uploaded else f"✅ 使用快取: {path.name}")
+
+        now = time.time()
+        with _file_lock(self._lock_path):
+            state = self._read()
+            state.update({entry["sha256"]: entry for entry in by_name.values()})
+            self._write({k: v for k, v in state.items() if v.get("expires_at", 0) > now})
+        return by_name
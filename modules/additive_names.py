@@ -0,0 +1,442 @@
+"""Name folding, alias tables and trigram matching for food-additive lookups.
+
+Pure functions and data only (no third-party imports);
+:class:`modules.tw_additive_rag.AdditiveIndex` builds its lookup tables from these.
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+from collections import Counter
+from typing import Iterable, Iterator
+
+# Simplified -> traditional characters that occur in additive names. This is a
+# deliberately small table (no opencc dependency): it covers the characters in
+# the Taiwan additive list plus those in the common mainland synonyms below.
+_SIMPLIFIED = (
+    "钠钙钾亚氢维铁盐镁柠酰类黄锌淀铜坏铵铝硅号无铬纤单叶钼红丽锰苹缩碱环对树矾蜡钴萝绿双浓麸卜钒兰内榈"
+    "胆烟蓝脑过烧联链剂浆来组离鸟丝虫杂处关华霉没愈创胀气电尔发还织镍锡钛苄杨龙热结换级态矿宁马纽汉制麦"
+    "胶羟异干沉罗苏脱复应诱蓝藓赛纳变码软硬质乙"
+)
+_TRADITIONAL = (
+    "鈉鈣鉀亞氫維鐵鹽鎂檸醯類黃鋅澱銅壞銨鋁矽號無鉻纖單葉鉬紅麗錳蘋縮鹼環對樹礬蠟鈷蘿綠雙濃麩蔔釩蘭內櫚"
+    "膽菸藍腦過燒聯鏈劑漿來組離鳥絲蟲雜處關華黴沒癒創脹氣電爾發還織鎳錫鈦芐楊龍熱結換級態礦寧馬紐漢製麥"
+    "膠羥異乾沈羅蘇脫複應誘藍蘚賽納變碼軟硬質乙"
+)
+_S2T = str.maketrans(_SIMPLIFIED, _TRADITIONAL)
+
+# Mainland / trade terms rewritten to the Taiwan wording wherever they appear
+# inside a name (applied after simplified -> traditional folding).
+TERM_ALIASES: dict[str, str] = {
+    "山梨酸": "己二烯酸",
+    "脫氫乙酸": "去水醋酸",
+    "對羥基苯甲酸": "對羥苯甲酸",
+    "谷氨酸": "麩酸",
+    "菸酸": "菸鹼酸",
+    "菸醯胺": "菸鹼醯胺",
+    "氨基": "胺基",
+    "氨酸": "胺酸",
+    "枸櫞酸": "檸檬酸",
+    "維他命": "維生素",
+    "糖苷": "醣苷",
+    "焦亞硫酸": "偏亞硫酸氫",
+}
+
+# Whole-name synonyms -> Taiwan zh_name (keys are folded like any query).
+NAME_ALIASES: dict[str, str] = {
+    "安賽蜜": "醋磺內酯鉀",
+    "乙醯磺胺酸鉀": "醋磺內酯鉀",
+    "acesulfame k": "醋磺內酯鉀",
+    "甜蜜素": "環己基（代）磺醯胺酸鈉",
+    "環己基胺基磺酸鈉": "環己基（代）磺醯胺酸鈉",
+    "三氯蔗糖": "蔗糖素",
+    "黃原膠": "玉米糖膠",
+    "漢生膠": "玉米糖膠",
+    "三仙膠": "玉米糖膠",
+    "卡拉膠": "鹿角菜膠",
+    "角叉菜膠": "鹿角菜膠",
+    "瓜爾膠": "關華豆膠",
+    "瓜爾豆膠": "關華豆膠",
+    "槐豆膠": "刺槐豆膠",
+    "結冷膠": "結蘭膠",
+    "可得然膠": "卡德蘭熱凝膠",
+    "小蘇打": "碳酸氫鈉",
+    "baking soda": "碳酸氫鈉",
+    "sodium hydrogen carbonate": "碳酸氫鈉",
+    "純鹼": "碳酸鈉、無水碳酸鈉",
+    "味精": "L-麩酸鈉",
+    "msg": "L-麩酸鈉",
+    "monosodium glutamate": "L-麩酸鈉",
+    "檸檬黃": "食用黃色四號",
+    "日落黃": "食用黃色五號",
+    "胭脂紅": "食用紅色六號",
+    "赤蘚紅": "食用紅色七號",
+    "誘惑紅": "食用紅色四十號",
+    "亮藍": "食用藍色一號",
+    "靛藍": "食用藍色二號",
+    "固綠": "食用綠色三號",
+    "甜菊糖": "甜菊醣苷",
+    "甜菊苷": "甜菊醣苷",
+    "stevia": "甜菊醣苷",
+    "赤蘚糖醇": "赤藻糖醇",
+    "山梨糖醇": "D-山梨醇",
+    "甘露糖醇": "D-甘露醇",
+    "單甘酯": "脂肪酸甘油酯",
+    "單雙甘油脂肪酸酯": "脂肪酸甘油酯",
+    "蔗糖脂肪酸酯": "脂肪酸蔗糖酯",
+    "吐溫80": "聚山梨醇酐脂肪酸酯八十",
+    "tween 80": "聚山梨醇酐脂肪酸酯八十",
+    "納他黴素": "鏈黴菌素",
+    "特丁基對苯二酚": "第三丁基氫醌",
+    "tbhq": "第三丁基氫醌",
+    "丁基羥基茴香醚": "丁基羥基甲氧苯",
+    "維生素c": "抗壞血酸（維生素C ）",
+    "vitamin c": "抗壞血酸（維生素C ）",
+    "維生素e": "生育醇（維生素Ｅ）",
+    "vitamin e": "生育醇（維生素Ｅ）",
+    "葡萄糖酸內酯": "葡萄糖酸-δ內酯",
+    "gdl": "葡萄糖酸-δ內酯",
+    "明礬": "鉀明礬",
+    "cmc": "羧甲基纖維素鈉",
+    "sodium cmc": "羧甲基纖維素鈉",
+    "hpmc": "羥丙基甲基纖維素",
+    "pvp": "聚乙烯吡咯烷酮",
+}
+
+# Codex INS numbers (the E-numbers are the same codes with an "E" prefix) ->
+# Taiwan zh_name. Sub-numbers use the INS roman suffix, e.g. "500ii".
+INS_NUMBERS: dict[str, str] = {
+    "102": "食用黃色四號",
+    "104": "喹啉黃",
+    "110": "食用黃色五號",
+    "124": "食用紅色六號",
+    "127": "食用紅色七號",
+    "129": "食用紅色四十號",
+    "132": "食用藍色二號",
+    "133": "食用藍色一號",
+    "141i": "銅葉綠素",
+    "141ii": "銅葉綠素鈉",
+    "143": "食用綠色三號",
+    "150": "焦糖色素",
+    "160a": "β-胡蘿蔔素",
+    "160e": "β-衍-8'-胡蘿蔔醛",
+    "161b": "葉黃素",
+    "161g": "4-4'-二酮-β-胡蘿蔔素",
+    "171": "二氧化鈦",
+    "172": "氧化鐵",
+    "175": "金",
+    "200": "己二烯酸",
+    "201": "己二烯酸鈉",
+    "202": "己二烯酸鉀",
+    "203": "己二烯酸鈣",
+    "210": "苯甲酸",
+    "211": "苯甲酸鈉",
+    "212": "苯甲酸鉀",
+    "214": "對羥苯甲酸乙酯",
+    "216": "對羥苯甲酸丙酯",
+    "218": "對羥苯甲酸甲酯",
+    "221": "亞硫酸鈉",
+    "222": "亞硫酸氫鈉",
+    "223": "偏亞硫酸氫鈉",
+    "224": "偏亞硫酸氫鉀",
+    "225": "亞硫酸鉀",
+    "228": "亞硫酸氫鉀",
+    "230": "聯苯",
+    "234": "乳酸鏈球菌素",
+    "235": "鏈黴菌素",
+    "242": "二甲基二碳酸酯 (二碳酸二甲酯)",
+    "249": "亞硝酸鉀",
+    "250": "亞硝酸鈉",
+    "251": "硝酸鈉",
+    "252": "硝酸鉀",
+    "260": "醋酸",
+    "262i": "醋酸鈉； 醋酸鈉（無水）",
+    "262ii": "二醋酸鈉",
+    "263": "醋酸鈣",
+    "265": "去水醋酸",
+    "266": "去水醋酸鈉",
+    "270": "乳酸",
+    "280": "丙酸",
+    "281": "丙酸鈉",
+    "282": "丙酸鈣",
+    "290": "二氧化碳",
+    "296": "DL-蘋果酸（羥基丁二酸）",
+    "297": "反丁烯二酸",
+    "300": "L-抗壞血酸（維生素C ）",
+    "301": "L-抗壞血酸鈉",
+    "302": "L-抗壞血酸鈣",
+    "304": "L-抗壞血酸棕櫚酸酯",
+    "306": "混合濃縮生育醇",
+    "307": "生育醇（維生素E ）",
+    "310": "沒食子酸丙酯",
+    "315": "異抗壞血酸",
+    "316": "異抗壞血酸鈉",
+    "319": "第三丁基氫醌",
+    "320": "丁基羥基甲氧苯",
+    "321": "二丁基羥基甲苯",
+    "325": "乳酸鈉 (溶液)",
+    "327": "乳酸鈣",
+    "330": "檸檬酸",
+    "331i": "檸檬酸二氫鈉",
+    "331iii": "檸檬酸鈉",
+    "332": "檸檬酸鉀",
+    "333": "檸檬酸鈣",
+    "334": "酒石酸",
+    "336i": "酒石酸氫鉀",
+    "338": "磷酸",
+    "339i": "磷酸二氫鈉",
+    "339ii": "磷酸氫二鈉",
+    "339iii": "磷酸鈉",
+    "340i": "磷酸二氫鉀",
+    "340ii": "磷酸氫二鉀",
+    "340iii": "磷酸鉀",
+    "341i": "磷酸二氫鈣",
+    "341ii": "磷酸氫鈣",
+    "341iii": "磷酸鈣",
+    "350ii": "DL-蘋果酸鈉",
+    "352ii": "蘋果酸鈣",
+    "355": "己二酸",
+    "363": "琥珀酸",
+    "385": "乙烯二胺四醋酸二鈉或乙烯二胺四醋酸二鈉鈣",
+    "386": "乙烯二胺四醋酸二鈉或乙烯二胺四醋酸二鈉鈣",
+    "400": "海藻酸",
+    "401": "海藻酸鈉",
+    "402": "海藻酸鉀",
+    "403": "海藻酸銨",
+    "404": "海藻酸鈣",
+    "405": "海藻酸丙二醇",
+    "407": "鹿角菜膠",
+    "410": "刺槐豆膠",
+    "412": "關華豆膠",
+    "415": "玉米糖膠",
+    "418": "結蘭膠",
+    "420": "D-山梨醇",
+    "421": "D-甘露醇",
+    "422": "甘油",
+    "424": "卡德蘭熱凝膠",
+    "432": "聚山梨醇酐脂肪酸酯二十",
+    "433": "聚山梨醇酐脂肪酸酯八十",
+    "434": "聚氧化乙烯（20）山梨醇酐單棕櫚酸酯；聚山梨醇酐脂肪酸酯四十",
+    "435": "聚山梨醇酐脂肪酸酯六十",
+    "436": "聚山梨醇酐脂肪酸酯六十五",
+    "440": "果膠",
+    "450i": "酸性焦磷酸鈉",
+    "450iii": "焦磷酸鈉",
+    "450v": "焦磷酸鉀",
+    "450vii": "酸性焦磷酸鈣",
+    "461": "甲基纖維素",
+    "462": "乙基纖維素",
+    "463": "羥丙基纖維素",
+    "464": "羥丙基甲基纖維素",
+    "466": "羧甲基纖維素鈉",
+    "468": "交聯羧甲基纖維素鈉",
+    "471": "脂肪酸甘油酯",
+    "472b": "乳酸甘油酯",
+    "472c": "檸檬酸甘油酯",
+    "472d": "酒石酸甘油酯",
+    "472e": "單及雙脂肪酸甘油二乙醯酒石酸酯",
+    "473": "脂肪酸蔗糖酯",
+    "475": "脂肪酸聚合甘油酯",
+    "476": "交酯化蓖麻酸聚合甘油酯",
+    "477": "脂肪酸丙二醇酯",
+    "481i": "乳酸硬脂酸鈉",
+    "482i": "乳酸硬脂酸鈣",
+    "491": "脂肪酸山梨醇酐酯",
+    "500i": "碳酸鈉、無水碳酸鈉",
+    "500ii": "碳酸氫鈉",
+    "501i": "碳酸鉀",
+    "501ii": "碳酸氫鉀",
+    "503i": "碳酸銨",
+    "503ii": "碳酸氫銨",
+    "504i": "碳酸鎂",
+    "507": "鹽酸",
+    "508": "氯化鉀",
+    "509": "氯化鈣",
+    "510": "氯化銨",
+    "511": "氯化鎂",
+    "513": "硫酸",
+    "514i": "硫酸鈉",
+    "515i": "硫酸鉀",
+    "516": "硫酸鈣",
+    "517": "硫酸銨",
+    "518": "硫酸鎂",
+    "519": "硫酸銅",
+    "520": "硫酸鋁",
+    "522": "鉀明礬",
+    "523": "銨明礬",
+    "524": "氫氧化鈉",
+    "525": "氫氧化鉀",
+    "526": "氫氧化鈣",
+    "528": "氫氧化鎂",
+    "529": "氧化鈣",
+    "530": "氧化鎂",
+    "535": "亞鐵氰化鈉",
+    "536": "亞鐵氰化鉀",
+    "538": "亞鐵氰化鈣",
+    "551": "二氧化矽",
+    "552": "矽酸鈣",
+    "553iii": "滑石粉",
+    "554": "矽鋁酸鈉",
+    "558": "皂土",
+    "559": "矽酸鋁",
+    "570": "硬脂酸",
+    "574": "葡萄糖酸",
+    "575": "葡萄糖酸-δ內酯",
+    "576": "葡萄糖酸鈉",
+    "578": "葡萄糖酸鈣",
+    "579": "葡萄糖酸亞鐵",
+    "620": "L-麩酸",
+    "621": "L-麩酸鈉",
+    "627": "5’-鳥嘌呤核苷磷酸二鈉",
+    "631": "5’-次黃嘌呤核苷磷酸二鈉",
+    "634": "5'-核糖核苷酸鈣",
+    "640": "胺基乙酸",
+    "903": "棕櫚蠟",
+    "904": "蟲膠",
+    "920": "L-半胱胺酸鹽酸鹽",
+    "927a": "偶氮二甲醯胺",
+    "941": "氮氣",
+    "942": "一氧化二氮",
+    "950": "醋磺內酯鉀",
+    "951": "阿斯巴甜",
+    "952iv": "環己基（代）磺醯胺酸鈉",
+    "953": "異麥芽酮糖醇（巴糖醇）",
+    "954i": "糖精",
+    "954iv": "糖精鈉鹽",
+    "955": "蔗糖素",
+    "957": "索馬甜",
+    "960": "甜菊醣苷",
+    "961": "紐甜",
+    "965i": "麥芽糖醇",
+    "965ii": "麥芽糖醇糖漿",
+    "966": "乳糖醇",
+    "967": "木糖醇",
+    "968": "赤藻糖醇",
+    "1200": "聚糊精",
+    "1201": "聚乙烯吡咯烷酮",
+    "1202": "聚乙烯聚吡咯烷酮",
+    "1203": "聚乙烯醇",
+    "1401": "酸處理澱粉",
+    "1403": "漂白澱粉",
+    "1404": "氧化澱粉",
+    "1410": "磷酸澱粉",
+    "1412": "磷酸二澱粉",
+    "1413": "磷酸化磷酸二澱粉",
+    "1414": "乙醯化磷酸二澱粉",
+    "1420": "醋酸澱粉",
+    "1422": "乙醯化己二酸二澱粉",
+    "1440": "羥丙基澱粉",
+    "1442": "羥丙基磷酸二澱粉",
+    "1450": "辛烯基丁二酸鈉澱粉",
+    "1452": "辛烯基丁二酸鋁澱粉",
+    "1505": "檸檬酸三乙酯",
+    "1518": "三乙酸甘油酯",
+    "1520": "丙二醇",
+    "1521": "聚乙二醇",
+}
+
+# Parenthesised qualifiers that describe a form, not a synonym, so they must
+# not become aliases on their own.
+_FORM_WORDS = {
+    "無水", "anhydrous", "溶液", "solution", "synthetic", "乾燥", "dried", "algin",
+    "monohydrate", "dryform", "inoil",
+}
+
+_E_NUMBER_RE = re.compile(
+    r"\b(?:e|ins)\s*-?\s*(\d{3,4})\s*([a-g])?\s*(?:\(?\s*(i{1,3}|iv|v|vi{0,3})\s*\)?)?(?![a-z0-9])",
+)
+_PAREN_RE = re.compile(r"[(﹙（]([^()﹙﹚（）]*)[)﹚）]")
+_STEREO_RE = re.compile(r"^(?:dl|d|l|d&dl)-\s*")
+_SPLIT_RE = re.compile(r"[;；、/]|\bor\b|或")
+_NON_WORD_RE = re.compile(r"[\W_]+")
+
+
+def fold_name(name: object) -> str:
+    """NFKC, casefold and simplified -> traditional; spacing is kept."""
+    text = unicodedata.normalize("NFKC", str(name or "")).casefold().translate(_S2T)
+    return " ".join(text.split())
+
+
+def compact_key(name: object) -> str:
+    """:func:`fold_name` with every space and punctuation mark removed."""
+    return _NON_WORD_RE.sub("", fold_name(name))
+
+
+def apply_term_aliases(folded: str) -> str:
+    for term, replacement in TERM_ALIASES.items():
+        folded = folded.replace(term, replacement)
+    return folded
+
+
+def ins_codes(text: str) -> list[str]:
+    """INS / E-number codes in ``text`` ("E202", "INS 339(ii)", "e-150d"), most specific first."""
+    codes: list[str] = []
+    for num, letter, roman in _E_NUMBER_RE.findall(fold_name(text)):
+        for code in (num + letter + roman, num + letter, num + roman, num):
+            if code not in codes:
+                codes.append(code)
+    return codes
+
+
+def name_variants(name: str) -> Iterator[str]:
+    """
+    Alternative spellings of one catalogue name: the part outside parentheses,
+    each parenthesised synonym, each part of a "A、B" / "A; B" list, and the
+    name without an L-/D-/DL- prefix. Form qualifiers such as "無水" are skipped.
+    """
+    folded = fold_name(name)
+    outer = _PAREN_RE.sub(" ", folded).strip()
+    inner = [m.strip() for m in _PAREN_RE.findall(folded)]
+    for part in [outer, *inner]:
+        for piece in [part, *_SPLIT_RE.split(part)]:
+            piece = piece.strip(" ,，")
+            if not piece or compact_key(piece) in _FORM_WORDS:
+                continue
+            yield piece
+            stripped = _STEREO_RE.sub("", piece)
+            if stripped != piece:
+                yield stripped
+
+
+def query_variants(query: str) -> Iterator[str]:
+    """Spellings to try for a user query, from most to least literal."""
+    folded = fold_name(query)
+    yield folded
+    termed = apply_term_aliases(folded)
+    if termed != folded:
+        yield termed
+    yield from name_variants(termed)
+
+
+def trigrams(key: str) -> set[str]:
+    """Character trigrams of a compact key, padded so short CJK names still get three."""
+    padded = f"^{key}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Dice-coefficient nearest-name search over a fixed set of keys."""
+
+    def __init__(self, keys: Iterable[str]):
+        self.grams: dict[str, set[str]] = {}
+        self.sizes: dict[str, int] = {}
+        for key in keys:
+            grams = trigrams(key)
+            self.sizes[key] = len(grams)
+            for gram in grams:
+                self.grams.setdefault(gram, set()).add(key)
+
+    def best(self, key: str, *, limit: int = 2) -> list[tuple[float, str]]:
+        """Top ``limit`` ``(score, key)`` pairs by Dice coefficient, best first."""
+        grams = trigrams(key)
+        shared: Counter[str] = Counter()
+        for gram in grams:
+            for candidate in self.grams.get(gram, ()):
+                shared[candidate] += 1
+        scored = [
+            (2 * n / (len(grams) + self.sizes[candidate]), candidate)
+            for candidate, n in shared.items()
+        ]
+        scored.sort(key=lambda pair: (-pair[0], pair[1]))
+        return scored[:limit]
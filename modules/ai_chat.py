@@ -1,9 +1,10 @@
 """Floating AI consultant chat panel for the innovation tab."""
 
 import streamlit as st
-from typing import Any, Dict, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
 
-from gemini_utils import gemini_generate as _gemini_generate
+from gemini_utils import estimate_tokens, gemini_generate as _gemini_generate, gemini_stream as _gemini_stream
 
 
 _SYSTEM_PROMPT = """你是一位資深亞洲便利店食品研發顧問，專長包括：
@@ -15,6 +16,27 @@ _SYSTEM_PROMPT = """你是一位資深亞洲便利店食品研發顧問，專長
 請根據對話脈絡與目前節點資訊，提供簡潔、專業的繁體中文回覆。
 若問題超出食品研發範疇，請說明並引導回主題。"""
 
+_SUMMARY_PROMPT = """請將「既有摘要」與「新增對話」合併成一份更新後的對話摘要，供之後的回覆參考。
+保留：使用者的目標與限制、已討論的產品／原料／法規重點、已給出的結論與待辦事項。
+以繁體中文條列，不超過 {max_chars} 字，只輸出摘要本身。
+
+既有摘要：
+{summary}
+
+新增對話：
+{dialogue}"""
+
+# Turns (a user message plus its reply) kept verbatim in every prompt.
+CHAT_KEEP_TURNS = 6
+# Hard cap on the history part of the prompt (summary + messages), in estimate_tokens units.
+CHAT_HISTORY_TOKEN_BUDGET = 3000
+CHAT_SUMMARY_TOKENS = 600
+# Most messages folded into the summary by one background call.
+_FOLD_MAX_MESSAGES = 12
+
+# Summaries run off the script thread so a turn never waits for one.
+_summary_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chat-summary")
+
 
 def get_node_by_path(tree: List[Dict], path_str: Optional[str]) -> Optional[Dict]:
     """Return the node at idx_path from the idea tree, or None."""
@@ -30,12 +52,113 @@ def get_node_by_path(tree: List[Dict], path_str: Optional[str]) -> Optional[Dict
         return None
 
 
-def _build_prompt(messages: List[Dict], context_block: str) -> str:
-    history = "\n".join(
-        f"{'使用者' if m['role'] == 'user' else 'AI'}：{m['content']}"
-        for m in messages
+def _format_message(m: Dict) -> str:
+    return f"{'使用者' if m['role'] == 'user' else 'AI'}：{m['content']}"
+
+
+def _clip_tokens(text: str, max_tokens: int) -> str:
+    """``text`` cut at the end to at most ``max_tokens`` (estimate_tokens units)."""
+    max_tokens = max(1, max_tokens)
+    while text and estimate_tokens(text) > max_tokens:
+        keep = max(1, int(len(text) * max_tokens / estimate_tokens(text)) - 1)
+        text = text[:keep]
+    return text
+
+
+def _fold(client, model_name: str, summary: str, batch: List[Dict], upto: int, max_tokens: int) -> Tuple[str, int]:
+    """Worker: ``summary`` extended with ``batch``; runs off the script thread, so no Streamlit calls."""
+    text = _gemini_generate(
+        client,
+        model_name,
+        _SUMMARY_PROMPT.format(
+            max_chars=max_tokens,
+            summary=summary or "（無）",
+            dialogue="\n".join(_format_message(m) for m in batch),
+        ),
+        max_retries=2,
+        use_cache=False,  # every fold is a one-off prompt
     )
-    return f"{_SYSTEM_PROMPT}\n\n{context_block}\n\n對話記錄：\n{history}"
+    return _clip_tokens(text.strip(), max_tokens), upto
+
+
+class ChatMemory:
+    """
+    Bounded view of the chat for the prompt: a rolling summary plus the latest turns.
+
+    Messages older than the last ``keep_turns`` turns are folded into
+    ``summary`` by a background Gemini call, a batch at a time, so replying
+    never waits for summarization. Until a fold lands, the messages it covers
+    are still offered to the prompt; ``history_block`` trims everything to
+    ``token_budget``, newest first, so prompt size stays flat however long
+    the session runs.
+    """
+
+    def __init__(
+        self,
+        keep_turns: int = CHAT_KEEP_TURNS,
+        token_budget: int = CHAT_HISTORY_TOKEN_BUDGET,
+        summary_tokens: int = CHAT_SUMMARY_TOKENS,
+    ):
+        self.keep_turns = keep_turns
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget the summary; a fold still running is abandoned."""
+        self.summary = ""
+        self.folded = 0  # messages[:folded] are covered by summary
+        self._pending: Optional[Future] = None
+
+    def _collect(self) -> None:
+        if self._pending is None or not self._pending.done():
+            return
+        future, self._pending = self._pending, None
+        try:
+            summary, upto = future.result()
+        except Exception:
+            return  # the same messages are folded again next turn
+        if summary:
+            self.summary, self.folded = summary, upto
+
+    def update(self, client, model_name: str, messages: List[Dict]) -> None:
+        """Adopt a finished fold, then start folding the next batch of old messages."""
+        if len(messages) < self.folded:  # history was cleared or replaced
+            self.reset()
+        self._collect()
+        cutoff = max(0, len(messages) - 2 * self.keep_turns)
+        if self._pending is None and cutoff > self.folded:
+            upto = min(cutoff, self.folded + _FOLD_MAX_MESSAGES)
+            self._pending = _summary_pool.submit(
+                _fold, client, model_name, self.summary,
+                list(messages[self.folded:upto]), upto, self.summary_tokens,
+            )
+
+    def history_block(self, messages: List[Dict]) -> str:
+        """Summary and unsummarized messages, newest kept first, within ``token_budget``."""
+        summary = _clip_tokens(self.summary, min(self.summary_tokens, self.token_budget // 2))
+        budget = self.token_budget - (estimate_tokens(summary) if summary else 0)
+        # One long message may take at most half of what is left.
+        per_message = max(1, budget // 2)
+        lines: List[str] = []
+        for m in reversed(messages[self.folded:]):
+            line = _clip_tokens(_format_message(m), per_message)
+            cost = estimate_tokens(line)
+            if cost > budget:
+                if not lines:
+                    lines.append(_clip_tokens(line, budget))
+                break
+            lines.append(line)
+            budget -= cost
+        parts = []
+        if summary:
+            parts.append(f"先前對話摘要：\n{summary}")
+        parts.append("對話記錄：\n" + "\n".join(reversed(lines)))
+        return "\n\n".join(parts)
+
+
+def _build_prompt(history_block: str, context_block: str) -> str:
+    return f"{_SYSTEM_PROMPT}\n\n{context_block}\n\n{history_block}"
 
 
 def render_chat_panel(
@@ -65,6 +188,7 @@ def render_chat_panel(
     with col_clear:
         if st.button("🗑 清除紀錄", use_container_width=True):
             st.session_state.chat_messages = []
+            st.session_state.pop("chat_memory", None)
             st.rerun()
 
     st.divider()
@@ -72,6 +196,8 @@ def render_chat_panel(
     # -- Chat history --
     if "chat_messages" not in st.session_state:
         st.session_state.chat_messages = []
+    if "chat_memory" not in st.session_state:
+        st.session_state.chat_memory = ChatMemory()
 
     messages_container = st.container(height=420)
     with messages_container:
@@ -100,21 +226,22 @@ def render_chat_panel(
                 ctx_parts.append(f"節點描述：{ctx_node['desc']}")
         context_block = "\n".join(ctx_parts)
 
-        prompt = _build_prompt(st.session_state.chat_messages, context_block)
+        memory = st.session_state.chat_memory
+        memory.update(client, model_name, st.session_state.chat_messages)
+        prompt = _build_prompt(memory.history_block(st.session_state.chat_messages), context_block)
 
         with messages_container:
             with st.chat_message("assistant"):
-                with st.spinner("思考中…"):
-                    reply = _gemini_generate(
-                        client,
-                        model_name,
-                        prompt,
-                        on_retry=lambda attempt, delay: st.toast(
-                            f"⏳ 重試中（第 {attempt + 1} 次）…"
-                        ),
-                        on_error=lambda e: st.error(f"❌ Gemini 錯誤：{e}"),
-                    )
-                st.markdown(reply)
+                reply = st.write_stream(_gemini_stream(
+                    client,
+                    model_name,
+                    prompt,
+                    on_retry=lambda attempt, delay: st.toast(
+                        f"⏳ 重試中（第 {attempt + 1} 次）…"
+                    ),
+                    on_error=lambda e: st.error(f"❌ Gemini 錯誤：{e}"),
+                    use_cache=False,
+                )) or ""
 
         st.session_state.chat_messages.append({"role": "assistant", "content": reply})
         st.rerun()
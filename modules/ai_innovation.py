@@ -1,8 +1,8 @@
 import json
 import streamlit as st
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
-from gemini_utils import gemini_generate as _gemini_generate, parse_json_loose
+from gemini_utils import gemini_generate as _gemini_generate, gemini_stream as _gemini_stream, parse_json_loose
 from modules.ai_chat import render_chat_panel
 
 _LS_KEY = "food_innovator_favorites"
@@ -124,25 +124,15 @@ EXPAND_PROMPT = """
 ]
 """
 
-REPORT_PROMPT = """
-你是一位食品研發企劃。
-請將以下「靈感樹 JSON」整理成 Markdown 研發報告。
-報告結構：
-# 產品研發報告：{keyword}
-## 一、主題概述
-## 二、靈感層級摘要
-## 三、市場與法規洞察
-## 四、後續研發方向
-
-JSON：
-{json_payload}
-
-請務必輸出有效 Markdown，不要輸出 JSON 或多餘格式說明。
-"""
+# Both task specs live in one static guide shared by RD_PROMPT and REPORT_PROMPT,
+# so it is sent as gemini_stream's cached_prefix; the per-session tree JSON
+# changes on every run and travels in the prompt after it.
+INNOVATION_GUIDE = """
+你是一位食品研發專家兼研發企劃。
+使用者會提供目前的「靈感樹 JSON」，並指定執行下列其中一項任務。
 
-RD_PROMPT = """
-你是一位食品研發專家。
-請根據以下靈感樹內容（JSON），回答這八個問題，以條列格式輸出：
+【任務 A：研發八問】
+請根據靈感樹內容（JSON），回答這八個問題，以條列格式輸出：
 1. 產品定位是什麼？適合哪個消費族群？
 2. 有無競品？與現有市場產品差異在哪？
 3. 成本控制重點在哪？哪些原料可能影響成本？
@@ -151,11 +141,29 @@ RD_PROMPT = """
 6. 推薦的包裝形式是什麼？設計建議？
 7. 企劃面有什麼潛在主題或市場訴求？
 8. 需參考哪些食品標準或法規？
+請務必輸出純文字或 Markdown 條列清單，勿包含多餘符號。
 
-JSON：
+【任務 B：研發報告】
+請將「靈感樹 JSON」整理成 Markdown 研發報告。
+報告結構：
+# 產品研發報告：<關鍵字>
+## 一、主題概述
+## 二、靈感層級摘要
+## 三、市場與法規洞察
+## 四、後續研發方向
+請務必輸出有效 Markdown，不要輸出 JSON 或多餘格式說明。
+"""
+
+RD_PROMPT = """
+請執行【任務 A：研發八問】。
+以下是目前的「靈感樹 JSON」：
 {json_payload}
+"""
 
-請務必輸出純文字或 Markdown 條列清單，勿包含多餘符號。
+REPORT_PROMPT = """
+請執行【任務 B：研發報告】，關鍵字：{keyword}。
+以下是目前的「靈感樹 JSON」：
+{json_payload}
 """
 
 # -----------------------------------------------------------
@@ -239,6 +247,18 @@ def render_innovation(client, model_name):
             on_error=lambda e: st.error(f"❌ Gemini 錯誤：{e}"),
         )
 
+    def gemini_stream(prompt: str, cached_prefix: Optional[str] = None):
+        return _gemini_stream(
+            client,
+            model_name,
+            prompt,
+            cached_prefix=cached_prefix,
+            on_retry=lambda attempt, delay: st.toast(
+                f"⏳ Gemini 暫時繁忙，{delay} 秒後重試（第 {attempt + 1} 次）…"
+            ),
+            on_error=lambda e: st.error(f"❌ Gemini 錯誤：{e}"),
+        )
+
     # -----------------------------------------------------------
     # Sidebar inputs
     # -----------------------------------------------------------
@@ -422,32 +442,36 @@ def render_innovation(client, model_name):
                     mime="application/json",
                 )
             with c2:
-                if st.button("📋 生成研发八问分析"):
-                    with st.spinner("Gemini 正在分析研發八問..."):
-                        rd_text = gemini_generate(RD_PROMPT.format(
-                            json_payload=json.dumps(
-                                {"keyword": st.session_state.keyword, "nodes": st.session_state.idea_tree},
-                                ensure_ascii=False,
-                            )
-                        ))
-                    st.session_state.rd_analysis = rd_text
+                rd_clicked = st.button("📋 生成研发八问分析")
             with c3:
-                if st.button("📝 匯出 Markdown 報告"):
-                    with st.spinner("Gemini 正在整理報告..."):
-                        md = gemini_generate(REPORT_PROMPT.format(
-                            keyword=st.session_state.keyword,
-                            json_payload=json.dumps(
-                                {"keyword": st.session_state.keyword, "nodes": st.session_state.idea_tree},
-                                ensure_ascii=False,
-                            ),
-                        ))
-                    st.session_state.report_md = md
-
-            if st.session_state.rd_analysis:
+                report_clicked = st.button("📝 匯出 Markdown 報告")
+
+            # Stream full-width below the buttons rather than inside the narrow columns.
+            json_payload = json.dumps(
+                {"keyword": st.session_state.keyword, "nodes": st.session_state.idea_tree},
+                ensure_ascii=False,
+            )
+            if rd_clicked:
+                st.subheader("🧪 研發八問分析")
+                st.session_state.rd_analysis = st.write_stream(
+                    gemini_stream(
+                        RD_PROMPT.format(json_payload=json_payload),
+                        cached_prefix=INNOVATION_GUIDE,
+                    )
+                ) or ""
+            elif st.session_state.rd_analysis:
                 st.subheader("🧪 研發八問分析")
                 st.markdown(st.session_state.rd_analysis)
 
-            if st.session_state.report_md:
+            if report_clicked:
+                st.subheader("📄 研發報告（Markdown）")
+                st.session_state.report_md = st.write_stream(
+                    gemini_stream(
+                        REPORT_PROMPT.format(keyword=st.session_state.keyword, json_payload=json_payload),
+                        cached_prefix=INNOVATION_GUIDE,
+                    )
+                ) or ""
+            elif st.session_state.report_md:
                 st.subheader("📄 研發報告（Markdown）")
                 st.markdown(st.session_state.report_md)
         else:
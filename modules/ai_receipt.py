@@ -2,7 +2,7 @@ import json
 import requests
 import streamlit as st
 
-from gemini_utils import gemini_generate as _gemini_generate, parse_json_loose
+from gemini_utils import gemini_generate as _gemini_generate, gemini_stream as _gemini_stream, parse_json_loose
 from modules.ai_innovation import _load_favorites, _save_favorites
 
 
@@ -146,6 +146,15 @@ def render_receipt(client, model_name):
             on_error=lambda e: st.error(f"❌ Gemini 錯誤：{e}"),
         )
 
+    def gemini_stream(prompt: str):
+        return _gemini_stream(
+            client, model_name, prompt,
+            on_retry=lambda attempt, delay: st.toast(
+                f"⏳ Gemini 暫時繁忙，{delay} 秒後重試（第 {attempt + 1} 次）…"
+            ),
+            on_error=lambda e: st.error(f"❌ Gemini 錯誤：{e}"),
+        )
+
     # -----------------------------------------------------------
     # Inputs
     # -----------------------------------------------------------
@@ -344,8 +353,12 @@ green tea cake
   "regulatory_check_items": ["..."]
 }}
 """
-            with st.spinner("Gemini 正在生成配方 JSON…"):
-                text = gemini_generate(prompt)
+            # Show the JSON as it streams in, then replace it with the formatted recipe.
+            stream_box = st.empty()
+            with stream_box.container():
+                st.caption("Gemini 正在生成配方 JSON…")
+                text = st.write_stream(gemini_stream(prompt)) or ""
+            stream_box.empty()
 
             receipt_json = parse_json_loose(text)
             if not receipt_json:
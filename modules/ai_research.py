@@ -1,32 +1,51 @@
 import json
 import re
-import time
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Callable, Optional
 import yaml
 
-from gemini_utils import gemini_generate as _gemini_generate, parse_json_loose
+from gemini_utils import (
+    FileUploadCache,
+    estimate_tokens,
+    evict_cached_response,
+    gemini_generate as _gemini_generate,
+    parse_json_loose,
+)
 
 import pandas as pd
 import streamlit as st
-from bs4 import BeautifulSoup
 from google.genai.types import File
 
 from modules.tw_additive_rag import (
     DEFAULT_EMBEDDING_MODEL,
+    DEFAULT_RETRIEVAL_MODE,
     DEFAULT_MANIFEST_PATH,
     DEFAULT_VECTOR_DIR,
+    bind_query_embeddings,
+    get_country_source,
     get_tw_source,
-    load_tw_vector_store,
+    load_tw_faiss_index,
+    retrieve_each,
     retrieve_tw_additive_context,
     tw_reference_caption,
+    tw_index_needs_api_key,
+    tw_query_embeddings,
+    tw_resolves_locally,
     tw_staleness_warning_message,
+    tw_structured_verdicts,
     vector_store_dir_ready,
-    retrieve_tw_additive_context_exact_first,
+    retrieve_tw_additive_contexts_exact_first,
 )
+from modules.html_clean import clean_html, ensure_clean_txt_files  # noqa: F401 - re-exported
+from modules.reg_verdicts import get_verdict_cache, match_rows_to_items
 
 _PROJECT_ROOT = Path(__file__).resolve().parents[1]
 STATE_FILE = _PROJECT_ROOT / "uploaded_reg_files.json"
+# Section chunks built from html_pages/ by scripts/build_html_chunks.py.
+HK_DATA_DIR = _PROJECT_ROOT / "data" / "processed" / "hongkong"
+MO_DATA_DIR = _PROJECT_ROOT / "data" / "processed" / "macao"
 
 COUNTRY_CODE_TO_NAME = {
     "tw": "台灣",
@@ -50,9 +69,19 @@ COUNTRY_NAME_TO_CODE = {v: k for k, v in COUNTRY_CODE_TO_NAME.items()}
 #   vector_dir    – Path to the FAISS index directory
 #   manifest_path – Path to the sources_manifest.yaml for this country
 #   source_getter – callable(manifest_path=...) -> dict | None
-#   retriever     – callable(vector_store, items: list[str], k: int) -> str
+#   retriever     – callable(vector_store | None, items: list[str], k: int) -> list[str];
+#                   one context per item from a single batched search; gets
+#                   None when no vector store is loaded
 #   ready_checker – callable(vector_dir) -> bool
 #   cache_label   – human-readable label for st.cache_resource spinner
+# Optional keys:
+#   structured_answerer – callable(item: str) -> list[dict] | None; rows for
+#                         items answerable without Gemini, None otherwise
+#   local_resolver      – callable(item: str) -> bool; True when the retriever
+#                         finds the item without the vector store
+#   lexical_fallback    – True when the retriever runs BM25-only without a
+#                         vector store; otherwise it returns "" (no context)
+#   badge               – status shown next to the country (default "✅ RAG")
 # -----------------------------------------------------------
 COUNTRY_CONFIGS = {
     "tw": {
@@ -60,9 +89,42 @@ COUNTRY_CONFIGS = {
         "vector_dir": DEFAULT_VECTOR_DIR,
         "manifest_path": DEFAULT_MANIFEST_PATH,
         "source_getter": get_tw_source,
-        "retriever": lambda vs, items, k: retrieve_tw_additive_context_exact_first(vs, items, k=k),
+        "retriever": lambda vs, items, k: retrieve_tw_additive_contexts_exact_first(vs, items, k=k),
         "ready_checker": vector_store_dir_ready,
         "cache_label": "台灣添加物向量索引",
+        "structured_answerer": tw_structured_verdicts,
+        "local_resolver": tw_resolves_locally,
+    },
+    # Hong Kong / Macao: sections of the saved regulation pages. BM25 over the
+    # JSONL is used explicitly without a vector index; --embed adds one for
+    # hybrid search. The saved CFS page only lists legislation titles and
+    # links, so Hong Kong is badged as a link index, not full RAG.
+    "hk": {
+        "code": "hk",
+        "vector_dir": HK_DATA_DIR / "vector_store",
+        "manifest_path": DEFAULT_MANIFEST_PATH,
+        "source_getter": lambda manifest_path: get_country_source("hk", manifest_path=manifest_path),
+        "retriever": lambda vs, items, k: retrieve_each(
+            vs, items, k, mode=None if vs else "lexical",
+            jsonl_path=HK_DATA_DIR / "regulation_chunks.jsonl", country="hk",
+        ),
+        "ready_checker": vector_store_dir_ready,
+        "cache_label": "香港法規向量索引",
+        "lexical_fallback": True,
+        "badge": "🔗 法規索引",
+    },
+    "mo": {
+        "code": "mo",
+        "vector_dir": MO_DATA_DIR / "vector_store",
+        "manifest_path": DEFAULT_MANIFEST_PATH,
+        "source_getter": lambda manifest_path: get_country_source("mo", manifest_path=manifest_path),
+        "retriever": lambda vs, items, k: retrieve_each(
+            vs, items, k, mode=None if vs else "lexical",
+            jsonl_path=MO_DATA_DIR / "regulation_chunks.jsonl", country="mo",
+        ),
+        "ready_checker": vector_store_dir_ready,
+        "cache_label": "澳門法規向量索引",
+        "lexical_fallback": True,
     },
     # Example – uncomment and fill in when Japan RAG is ready:
     # "jp": {
@@ -70,12 +132,30 @@ COUNTRY_CONFIGS = {
     #     "vector_dir": _PROJECT_ROOT / "data" / "processed" / "japan" / "vector_store",
     #     "manifest_path": _PROJECT_ROOT / "data" / "japan_manifest.yaml",
     #     "source_getter": get_jp_source,
-    #     "retriever": lambda vs, items, k: retrieve_tw_additive_context(vs, items, k=k),
+    #     "retriever": lambda vs, items, k: retrieve_each(vs, items, k),
     #     "ready_checker": vector_store_dir_ready,
     #     "cache_label": "日本添加物向量索引",
     # },
 }
 
+# HTML-sourced countries are only offered once their section chunks exist: an
+# empty JSONL (e.g. a saved page with no content sections) retrieves nothing,
+# and the country would be badged RAG while every answer is 資料不足.
+for _code, _data_dir in (("hk", HK_DATA_DIR), ("mo", MO_DATA_DIR)):
+    _chunks = _data_dir / "regulation_chunks.jsonl"
+    if not _chunks.is_file() or _chunks.stat().st_size == 0:
+        del COUNTRY_CONFIGS[_code]
+
+# Upper bound on countries analysed concurrently in render_research.
+_MAX_COUNTRY_WORKERS = 4
+
+# Item batching for the per-country prompt: items are packed into groups whose
+# retrieved excerpts stay under the token budget, and groups run concurrently.
+_GROUP_TOKEN_BUDGET = 24_000
+_GROUP_MAX_ITEMS = 8
+_GROUP_ATTEMPTS = 2
+_MAX_GROUP_WORKERS = 6
+
 _COUNTRY_FLAGS = {
     "tw": "🇹🇼", "jp": "🇯🇵", "us": "🇺🇸", "hk": "🇭🇰",
     "mo": "🇲🇴", "cn": "🇨🇳", "kr": "🇰🇷", "sg": "🇸🇬",
@@ -99,11 +179,27 @@ OFFICIAL_SOURCE_HINTS = {
 
 
 @st.cache_resource(show_spinner="載入法規向量索引…")
-def _cached_country_faiss(vector_dir_str: str, google_api_key: str, embedding_model: str):
-    return load_tw_vector_store(
+def _cached_country_index(vector_dir_str: str):
+    # One index + docstore per directory, shared by every user of this process.
+    return load_tw_faiss_index(Path(vector_dir_str))
+
+
+@st.cache_resource(max_entries=64)
+def _cached_query_embeddings(vector_dir_str: str, google_api_key: str, embedding_model: str):
+    # Local backends ignore the key, so callers pass "" and share one instance.
+    return tw_query_embeddings(
         google_api_key=google_api_key,
-        vector_dir=Path(vector_dir_str),
         embedding_model=embedding_model,
+        vector_dir=Path(vector_dir_str),
+    )
+
+
+def _cached_country_faiss(vector_dir_str: str, google_api_key: str, embedding_model: str):
+    if not tw_index_needs_api_key(Path(vector_dir_str)):
+        google_api_key = ""
+    return bind_query_embeddings(
+        _cached_country_index(vector_dir_str),
+        _cached_query_embeddings(vector_dir_str, google_api_key, embedding_model),
     )
 
 
@@ -111,68 +207,14 @@ def _cached_country_faiss(vector_dir_str: str, google_api_key: str, embedding_mo
 # File utilities
 # -----------------------------------------------------------
 
-def clean_html(html_text: str) -> str:
-    soup = BeautifulSoup(html_text, "html.parser")
-    for tag in soup(["script", "style", "nav", "footer", "header"]):
-        tag.decompose()
-    for a in soup.find_all("a", href=True):
-        link_text = a.get_text(strip=True)
-        href = a["href"].strip()
-        a.replace_with(f"{link_text} ({href})" if link_text else href)
-    return soup.get_text(separator="\n", strip=True)
-
-
-def ensure_clean_txt_files(
-    folder_path="html_pages",
-    force_clean=False,
-    log_fn: Optional[Callable[[str], None]] = None,
-):
-    html_dir = Path(folder_path)
-    txt_files = []
-    for html_file in html_dir.glob("*.html"):
-        txt_path = html_file.with_suffix(".txt")
-        if force_clean or not txt_path.exists():
-            html = html_file.read_text(encoding="utf-8")
-            txt_path.write_text(clean_html(html), encoding="utf-8")
-            if log_fn:
-                log_fn(f"✅ Cleaned {html_file.name}")
-        else:
-            if log_fn:
-                log_fn(f"🔁 Using cached: {txt_path.name}")
-        txt_files.append(txt_path)
-    return txt_files
-
-
-def is_file_expired(info, hours=23):
-    return time.time() - info.get("uploaded_at", 0) > hours * 3600
-
-
 def upload_and_cache_files(
     client,
     txt_files,
     force=False,
     log_fn: Optional[Callable[[str], None]] = None,
 ):
-    uploaded_cache = json.loads(STATE_FILE.read_text()) if STATE_FILE.exists() else {}
-    for txt in txt_files:
-        name = txt.name
-        file_info = uploaded_cache.get(name)
-        if force or (not file_info) or is_file_expired(file_info):
-            if log_fn:
-                log_fn(f"⬆️ Uploading {name}…")
-            file = client.files.upload(file=txt)
-            uploaded_cache[name] = {
-                "file_uri": file.uri,
-                "file_name": file.name,
-                "uploaded_at": time.time(),
-            }
-            if log_fn:
-                log_fn(f"☁️ Uploaded {name}")
-        else:
-            if log_fn:
-                log_fn(f"✅ 使用快取: {name}")
-    STATE_FILE.write_text(json.dumps(uploaded_cache, indent=2, ensure_ascii=False))
-    return uploaded_cache
+    """Upload ``txt_files`` through the shared, content-hashed :class:`FileUploadCache`."""
+    return FileUploadCache(STATE_FILE).ensure(client, txt_files, force=force, log_fn=log_fn)
 
 
 def search_official_regulation_source(country_code: str):
@@ -196,6 +238,44 @@ def _dedupe_items(seq):
     return out
 
 
+def _merge_rag_contexts(texts) -> str:
+    """Join per-item retrieval results, dropping excerpts shared between items."""
+    seen = set()
+    blocks = []
+    for text in texts:
+        for block in (text or "").split("\n\n---\n\n"):
+            block = block.strip()
+            if block and block not in seen:
+                seen.add(block)
+                blocks.append(block)
+    return "\n\n---\n\n".join(blocks)
+
+
+def _pack_items_by_token_budget(
+    items: list,
+    contexts: dict,
+    token_budget: int = _GROUP_TOKEN_BUDGET,
+    max_items: int = _GROUP_MAX_ITEMS,
+) -> list:
+    """Greedily split ``items`` (in order) into groups whose excerpts fit ``token_budget``.
+
+    An item whose own excerpts exceed the budget gets a group to itself.
+    """
+    groups = []
+    current = []
+    used = 0
+    for item in items:
+        cost = estimate_tokens(contexts.get(item) or "")
+        if current and (used + cost > token_budget or len(current) >= max_items):
+            groups.append(current)
+            current, used = [], 0
+        current.append(item)
+        used += cost
+    if current:
+        groups.append(current)
+    return groups
+
+
 def country_display_name(country_code: str) -> str:
     return COUNTRY_CODE_TO_NAME.get(country_code, country_code)
 
@@ -237,8 +317,8 @@ def render_research(client, model_name):
 | 地區 | 狀態 | 說明 |
 |------|------|------|
 | 🇹🇼 台灣 | ✅ 已整合 | FAISS 本地向量索引（需先執行 `python scripts/build_tw_chunks.py --embed`） |
-| 🇭🇰 香港 | 🔧 整合中 | 已收集官方法規 HTML，尚未建立向量索引 |
-| 🇲🇴 澳門 | 🔧 整合中 | 已收集官方法規 HTML，尚未建立向量索引 |
+| 🇭🇰 香港 | 🔗 法規索引 | 僅含官方法例標題與連結、無添加物限量；項目需與標題相符才會查詢（`python scripts/build_html_chunks.py`） |
+| 🇲🇴 澳門 | 🔧 整合中 | 已建立分段流程；目前保存的頁面尚無法規內容，需重新保存 |
 | 🌏 其他地區 | ⏳ 計劃中 | 尚未建立索引，查詢結果將標示「資料不足」 |
 """)
 
@@ -247,8 +327,10 @@ def render_research(client, model_name):
 **已整合（可查詢）：**
 - 🇹🇼 [台灣食品添加物法規](https://law.moj.gov.tw/LawClass/LawAll.aspx?pcode=L0040001) ✅
 
+**法規索引（僅標題與連結）：**
+- 🇭🇰 [香港食物安全中心 - 食物規例 / 指引](https://www.cfs.gov.hk/tc_chi/food_leg/food_leg.html) 🔗
+
 **已收集、整合中：**
-- 🇭🇰 [香港食物安全中心 - 食品添加劑守則](https://www.cfs.gov.hk/tc_chi/food_leg/food_leg.html) 🔧
 - 🇲🇴 [澳門食品安全中心 - 食品添加劑資料](https://www.iam.gov.mo/foodsafety/c/lawstandard/list) 🔧
 
 **計劃中（尚未建立索引）：**
@@ -289,9 +371,8 @@ def render_research(client, model_name):
 
     with st.sidebar:
         if st.button("🔄 重新上傳 HK/MO 法規參考資料"):
-            txt_files = ensure_clean_txt_files("html_pages", force_clean=True, log_fn=log_msg)
-            if STATE_FILE.exists():
-                STATE_FILE.unlink()
+            # Only pages whose HTML changed since the last run are cleaned again.
+            txt_files = ensure_clean_txt_files("html_pages", log_fn=log_msg)
             upload_and_cache_files(client, txt_files, force=True, log_fn=log_msg)
             st.success("✅ 法規參考資料已重新上傳到 Gemini。")
 
@@ -305,7 +386,8 @@ def render_research(client, model_name):
         for country in selected_countries:
             code = COUNTRY_NAME_TO_CODE.get(country, "")
             flag = _COUNTRY_FLAGS.get(code, "🌏")
-            tag  = "✅ RAG" if code in COUNTRY_CONFIGS else "⏳ 資料不足"
+            cfg  = COUNTRY_CONFIGS.get(code)
+            tag  = cfg.get("badge", "✅ RAG") if cfg else "⏳ 資料不足"
             badges.append(f"{flag} {country} ({tag})")
         st.caption("查詢地區：" + "　·　".join(badges))
 
@@ -442,48 +524,191 @@ def render_research(client, model_name):
                     st.info("沒有可查詢的食材或添加物項目，已跳過法規批次查詢。")
                 else:
                     # 1. RAG countries (have a vector index in COUNTRY_CONFIGS)
+                    #
+                    # Session state and st.cache_resource lookups happen here on the
+                    # script thread; only retrieval → prompt → Gemini → parse runs in
+                    # the worker pool, which must not call Streamlit.
+                    api_key = (st.session_state.get("api_key_input") or "").strip()
+                    jobs = {}
                     for country_code in rag_countries:
-                        _flag = _COUNTRY_FLAGS.get(country_code, "🌏")
-                        _reg_status.write(f"{_flag} 查詢 {country_display_name(country_code)}…")
                         cfg = COUNTRY_CONFIGS[country_code]
                         source = cfg["source_getter"](manifest_path=cfg["manifest_path"])
-                        api_key = (st.session_state.get("api_key_input") or "").strip()
-
-                        use_rag = bool(api_key) and cfg["ready_checker"](cfg["vector_dir"])
-                        rag_text = ""
-
-                        log_msg(f"[{country_code}] API key: {bool(api_key)}, index ready: {cfg['ready_checker'](cfg['vector_dir'])}")
-
-                        if use_rag:
+                        index_ready = cfg["ready_checker"](cfg["vector_dir"])
+                        log_msg(f"[{country_code}] API key: {bool(api_key)}, index ready: {index_ready}")
+                        vs = None
+                        wants_vectors = DEFAULT_RETRIEVAL_MODE != "lexical"
+                        if wants_vectors and index_ready and (
+                            api_key or not tw_index_needs_api_key(cfg["vector_dir"])
+                        ):
                             try:
                                 vs = _cached_country_faiss(
                                     str(cfg["vector_dir"]),
                                     api_key,
                                     DEFAULT_EMBEDDING_MODEL,
                                 )
-                                if vs is not None:
-                                    rag_text = cfg["retriever"](vs, items, 6)
-                                    log_msg(f"[{country_code}] Retrieved {len(rag_text)} chars")
                             except Exception as e:
                                 log_msg(f"[{country_code}] 向量索引載入失敗：{e}")
-                                use_rag = False
+                        if vs is None and cfg.get("lexical_fallback"):
+                            log_msg(f"[{country_code}] 無向量索引，改用 BM25 關鍵字檢索")
+                        elif vs is None and wants_vectors:
+                            log_msg(f"[{country_code}] 無向量索引，僅能依名稱比對檢索")
+                        jobs[country_code] = (cfg, source, vs)
+
+                    def _verdict_key(source) -> dict:
+                        return {
+                            "source_id": str((source or {}).get("source_id") or ""),
+                            "as_of_date": str((source or {}).get("as_of_date") or ""),
+                            "model": model_name,
+                        }
 
-                        if use_rag and rag_text.strip():
-                            log_msg(f"[{country_code}] 使用 RAG 檢索分析")
-                            prompt = _batch_country_rag_prompt(
-                                country_display_name(country_code), items, rag_text, source
+                    def _run_group(country_code: str, source, group: list, contexts: dict) -> dict:
+                        prompt = _batch_country_rag_prompt(
+                            country_display_name(country_code),
+                            group,
+                            _merge_rag_contexts(contexts[i] for i in group),
+                            source,
+                        )
+                        # A group whose output does not parse is evicted from the response
+                        # cache and retried, so the bad text is never replayed and a good
+                        # retry is what later runs read back.
+                        for _attempt in range(_GROUP_ATTEMPTS):
+                            errors = []
+                            text = _gemini_generate(
+                                client, model_name, prompt,
+                                on_error=errors.append,
                             )
-                            text = gemini_generate(prompt)
                             reg_json = parse_json_loose(text)
-                            _append_reg_parse(reg_json, text, country_code, f"批次：{len(items)} 項（RAG）")
-                        else:
+                            if isinstance(reg_json, list) or (isinstance(reg_json, dict) and reg_json):
+                                try:
+                                    get_verdict_cache().put_many(
+                                        country_code,
+                                        match_rows_to_items(reg_json, group),
+                                        **_verdict_key(source),
+                                    )
+                                except sqlite3.Error:
+                                    pass
+                                return {"reg_json": reg_json, "text": text, "errors": errors}
+                            evict_cached_response(model_name, prompt)
+                        return {"reg_json": None, "text": text, "errors": errors}
+
+                    def _analyze_country(country_code: str) -> dict:
+                        cfg, source, vs = jobs[country_code]
+                        out = {"logs": [], "errors": [], "groups": [], "rag": False, "cached": [], "pending": items}
+                        # Exact hits in a structured limits table need no LLM call at all.
+                        structured = {}
+                        answerer = cfg.get("structured_answerer")
+                        if answerer:
                             for item in items:
-                                reg_results.append({
-                                    "國家": country_display_name(country_code),
-                                    "項目": item,
-                                    "使用狀態": "資料不足",
-                                    "原因": "RAG 未執行：可能是 API key 缺失、索引不存在，或未檢索到相關資料",
-                                })
+                                try:
+                                    rows = answerer(item)
+                                except Exception as e:
+                                    out["logs"].append(f"[{country_code}] 法規表查詢失敗（{item}）：{e}")
+                                    rows = None
+                                if rows:
+                                    structured[item] = [
+                                        {"國家": country_display_name(country_code), **r} for r in rows
+                                    ]
+                        if structured:
+                            out["logs"].append(
+                                f"[{country_code}] 法規表直接命中 {len(structured)}/{len(items)} 項"
+                            )
+                        remaining = [i for i in items if i not in structured]
+                        # Items already answered for this source snapshot + model skip Gemini.
+                        try:
+                            hits = get_verdict_cache().get_many(country_code, remaining, **_verdict_key(source))
+                        except sqlite3.Error:
+                            hits = {}
+                        out["cached"] = [
+                            row
+                            for i in items
+                            for row in (structured.get(i) or hits.get(i, []))
+                        ]
+                        todo = [i for i in remaining if i not in hits]
+                        out["pending"] = todo
+                        if hits:
+                            out["logs"].append(f"[{country_code}] 快取命中 {len(hits)}/{len(remaining)} 項")
+                        if not todo:
+                            return out
+                        resolver = cfg.get("local_resolver")
+                        if resolver:
+                            n_local = sum(1 for i in todo if resolver(i))
+                            if n_local:
+                                out["logs"].append(f"[{country_code}] 名稱索引命中 {n_local}/{len(todo)} 項")
+                        # One batched retrieval for every item, split per item.
+                        try:
+                            contexts = dict(zip(todo, cfg["retriever"](vs, todo, 6)))
+                        except Exception as e:
+                            out["logs"].append(f"[{country_code}] 檢索失敗：{e}")
+                            contexts = {}
+                        contexts = {item: contexts.get(item, "") for item in todo}
+                        total_chars = sum(len(t) for t in contexts.values())
+                        out["logs"].append(f"[{country_code}] Retrieved {total_chars} chars")
+                        # Items with no relevant excerpt are not sent to Gemini.
+                        with_context = [i for i in todo if contexts[i].strip()]
+                        out["pending"] = [i for i in todo if not contexts[i].strip()]
+                        if not with_context:
+                            return out
+                        out["rag"] = True
+                        groups = _pack_items_by_token_budget(with_context, contexts)
+                        out["logs"].append(f"[{country_code}] 使用 RAG 檢索分析（{len(groups)} 批）")
+                        futures = [
+                            group_pool.submit(_run_group, country_code, source, group, contexts)
+                            for group in groups
+                        ]
+                        for group, future in zip(groups, futures):
+                            res = future.result()
+                            out["errors"].extend(res["errors"])
+                            out["groups"].append((group, res))
+                        return out
+
+                    country_outputs = {}
+                    if rag_countries:
+                        _reg_status.write(
+                            "🔎 同步查詢："
+                            + "、".join(country_display_name(c) for c in rag_countries)
+                        )
+                    # Separate pools: country workers block on their groups, so sharing
+                    # one pool could deadlock.
+                    with ThreadPoolExecutor(max_workers=_MAX_GROUP_WORKERS) as group_pool, ThreadPoolExecutor(
+                        max_workers=max(1, min(_MAX_COUNTRY_WORKERS, len(rag_countries)))
+                    ) as pool:
+                        futures = {pool.submit(_analyze_country, code): code for code in rag_countries}
+                        for future in as_completed(futures):
+                            country_code = futures[future]
+                            try:
+                                country_outputs[country_code] = future.result()
+                            except Exception as e:
+                                country_outputs[country_code] = {
+                                    "logs": [f"[{country_code}] 分析失敗：{e}"],
+                                    "errors": [], "groups": [], "rag": False, "cached": [], "pending": items,
+                                }
+                            _flag = _COUNTRY_FLAGS.get(country_code, "🌏")
+                            _reg_status.write(
+                                f"{_flag} {country_display_name(country_code)} 完成"
+                                f"（{len(country_outputs)}/{len(rag_countries)}）"
+                            )
+
+                    # Merge in selection order so the table does not depend on finish order.
+                    for country_code in rag_countries:
+                        out = country_outputs[country_code]
+                        for line in out["logs"]:
+                            log_msg(line)
+                        for e in out["errors"]:
+                            st.error(f"❌ Gemini 錯誤：{e}")
+                        reg_results.extend(out["cached"])
+                        if out["rag"]:
+                            for group, res in out["groups"]:
+                                _append_reg_parse(
+                                    res["reg_json"], res["text"], country_code,
+                                    f"批次：{'、'.join(group)}（RAG）",
+                                )
+                        for item in out["pending"]:
+                            reg_results.append({
+                                "國家": country_display_name(country_code),
+                                "項目": item,
+                                "使用狀態": "資料不足",
+                                "原因": "RAG 未執行：可能是 API key 缺失、索引不存在，或未檢索到相關資料",
+                            })
 
                     # 2. Countries without a vector index yet
                     for country_code in missing_country_codes:
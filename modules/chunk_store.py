@@ -0,0 +1,120 @@
+"""Memory-mapped chunk store that sits next to ``index.faiss`` in a vector directory.
+
+Layout: ``chunks.jsonl`` holds one ``{"text", "metadata"}`` object per FAISS
+vector, in index order, and ``chunks.offsets.npy`` holds the N+1 byte offsets of
+its lines. Both are opened read-only with ``mmap``, so every worker shares one
+copy through the OS page cache and a search decodes only the rows it returns.
+Nothing is unpickled.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+from pathlib import Path
+from typing import Any, Iterable, Sequence
+
+TEXT_FILE = "chunks.jsonl"
+OFFSETS_FILE = "chunks.offsets.npy"
+
+
+def chunk_store_ready(directory: Path | str) -> bool:
+    d = Path(directory)
+    return (d / TEXT_FILE).is_file() and (d / OFFSETS_FILE).is_file()
+
+
+def write_chunk_store(
+    directory: Path | str,
+    texts: Sequence[str],
+    metadatas: Sequence[dict[str, Any]],
+) -> None:
+    """Write ``texts[i]`` / ``metadatas[i]`` as row i (the i-th FAISS vector)."""
+    import numpy as np
+
+    d = Path(directory)
+    d.mkdir(parents=True, exist_ok=True)
+    offsets = [0]
+    tmp_text = d / (TEXT_FILE + ".tmp")
+    with tmp_text.open("wb") as f:
+        for text, meta in zip(texts, metadatas):
+            line = json.dumps({"text": text, "metadata": meta}, ensure_ascii=False).encode("utf-8") + b"\n"
+            f.write(line)
+            offsets.append(offsets[-1] + len(line))
+    tmp_offsets = d / (OFFSETS_FILE + ".tmp")
+    with tmp_offsets.open("wb") as f:
+        np.save(f, np.asarray(offsets, dtype="uint64"))
+    os.replace(tmp_text, d / TEXT_FILE)
+    os.replace(tmp_offsets, d / OFFSETS_FILE)
+
+
+class ChunkStore:
+    """Read-only, random-access view of ``chunks.jsonl`` by row number."""
+
+    def __init__(self, directory: Path | str):
+        import numpy as np
+
+        d = Path(directory)
+        self.offsets = np.load(d / OFFSETS_FILE, mmap_mode="r")
+        self._file = (d / TEXT_FILE).open("rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self) -> int:
+        return max(len(self.offsets) - 1, 0)
+
+    def get(self, row: int) -> dict[str, Any]:
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        return json.loads(self._mm[start:end])
+
+    def get_many(self, rows: Iterable[int]) -> list[dict[str, Any]]:
+        return [self.get(r) for r in rows]
+
+
+class MappedVectorStore:
+    """
+    A FAISS index plus :class:`ChunkStore`, with the slice of the langchain
+    ``FAISS`` interface the retrievers use (``similarity_search``,
+    ``embedding_function``). Distances are raw L2, as in langchain's default.
+    """
+
+    def __init__(self, index, chunks: ChunkStore, embedding_function=None):
+        self.index = index
+        self.chunks = chunks
+        self.embedding_function = embedding_function
+
+    @classmethod
+    def load(cls, directory: Path | str, embedding_function=None) -> "MappedVectorStore":
+        import faiss
+
+        d = Path(directory)
+        return cls(faiss.read_index(str(d / "index.faiss")), ChunkStore(d), embedding_function)
+
+    def bind(self, embedding_function) -> "MappedVectorStore":
+        """A view sharing this index and chunk store, embedding queries with ``embedding_function``."""
+        return MappedVectorStore(self.index, self.chunks, embedding_function)
+
+    def search_vectors(self, vectors, k: int) -> list[list[tuple[int, float]]]:
+        """``(row, distance)`` hits for each query vector, from one ``index.search``."""
+        import numpy as np
+
+        matrix = np.asarray(vectors, dtype="float32").reshape(-1, self.index.d)
+        distances, rows = self.index.search(matrix, k)
+        return [
+            [(int(r), float(dist)) for r, dist in zip(row_ids, dists) if r != -1]
+            for row_ids, dists in zip(rows, distances)
+        ]
+
+    def documents(self, rows: Iterable[int]) -> list:
+        from langchain_core.documents import Document
+
+        return [
+            Document(page_content=chunk["text"], metadata=chunk["metadata"])
+            for chunk in self.chunks.get_many(rows)
+        ]
+
+    def similarity_search_by_vector(self, embedding: Sequence[float], k: int = 4, **kwargs: Any) -> list:
+        return self.documents(r for r, _ in self.search_vectors([embedding], k)[0])
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> list:
+        return self.similarity_search_by_vector(self.embedding_function.embed_query(query), k)
@@ -0,0 +1,295 @@
+"""Embedding wrappers shared by the vector-store loader and ``scripts/build_tw_chunks.py``.
+
+Imported lazily (it pulls in ``langchain_core``), like the FAISS helpers in
+``modules.tw_additive_rag``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import sqlite3
+import unicodedata
+import zlib
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Any, Iterable
+
+from langchain_core.embeddings import Embeddings
+
+from gemini_utils import (
+    DEFAULT_CACHE_DIR,
+    _sqlite_connect,
+    client_limit_key,
+    estimate_tokens,
+    get_rate_limiter,
+)
+
+
+class RateLimitedEmbeddings(Embeddings):
+    """Route every embed call through the shared (API key, model) token bucket.
+
+    A batch of N texts is metered as N requests, matching how the Gemini
+    embedding quota counts batched ``embedContent`` calls.
+    """
+
+    def __init__(self, inner: Embeddings, *, api_key: str, model_name: str):
+        self.inner = inner
+        self.model_name = model_name
+        self._limit_key = client_limit_key(api_key, model_name)
+
+    def _acquire(self, texts: list[str]) -> None:
+        get_rate_limiter().acquire(
+            self._limit_key,
+            self.model_name,
+            requests=len(texts),
+            tokens=sum(estimate_tokens(t) for t in texts),
+        )
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+        self._acquire(texts)
+        return self.inner.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        self._acquire([text])
+        return self.inner.embed_query(text)
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Embed several *queries* in one batched request."""
+        if not texts:
+            return []
+        self._acquire(texts)
+        return _batch_embed_queries(self.inner, texts)
+
+
+class UnboundEmbeddings(Embeddings):
+    """Placeholder for a vector store loaded without a query-embedding client."""
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        raise RuntimeError("No embedding client bound; use bind_query_embeddings().")
+
+    def embed_query(self, text: str) -> list[float]:
+        raise RuntimeError("No embedding client bound; use bind_query_embeddings().")
+
+
+def _batch_embed_queries(embeddings: Embeddings, texts: list[str]) -> list[list[float]]:
+    if hasattr(embeddings, "embed_queries"):
+        return embeddings.embed_queries(texts)
+    if type(embeddings).__name__ == "GoogleGenerativeAIEmbeddings":
+        # Same vectors as embed_query (RETRIEVAL_QUERY), but one round-trip per batch.
+        return embeddings.embed_documents(texts, task_type="RETRIEVAL_QUERY")
+    return [embeddings.embed_query(t) for t in texts]
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", text or "").split())
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Disk-backed cache of query vectors keyed by (embedding model, normalized text).
+
+    Shared by every session and worker through one SQLite file, so recurring
+    additive names need no network at all. ``embed_queries`` looks up a whole
+    request at once and embeds only the misses, in a single batch.
+    Document embedding is passed straight through.
+    """
+
+    def __init__(self, inner: Embeddings, *, model_name: str, path: Path | None = None):
+        self.inner = inner
+        self.model_name = model_name
+        self.path = Path(path) if path else DEFAULT_CACHE_DIR / "query_embeddings.sqlite3"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with _sqlite_connect(self.path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, vector BLOB)")
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        found: dict[str, list[float]] = {}
+        with _sqlite_connect(self.path) as conn:
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+                marks = ",".join("?" * len(part))
+                for key, blob in conn.execute(
+                    f"SELECT key, vector FROM vectors WHERE key IN ({marks})", part
+                ):
+                    found[key] = array("f", blob).tolist()
+        return found
+
+    def _put_many(self, items: dict[str, list[float]]) -> None:
+        with _sqlite_connect(self.path) as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO vectors VALUES (?, ?)",
+                [(k, array("f", v).tobytes()) for k, v in items.items()],
+            )
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        normalized = [normalize_query(t) for t in texts]
+        keys = [self._key(t) for t in normalized]
+        try:
+            found = self._get_many(list(set(keys)))
+        except sqlite3.Error:
+            found = {}
+        misses: dict[str, str] = {}
+        for key, text in zip(keys, normalized):
+            if key not in found and key not in misses:
+                misses[key] = text
+        if misses:
+            vectors = _batch_embed_queries(self.inner, list(misses.values()))
+            fresh = dict(zip(misses, vectors))
+            found.update(fresh)
+            try:
+                self._put_many(fresh)
+            except sqlite3.Error:
+                pass
+        return [found[k] for k in keys]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_queries([text])[0]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.inner.embed_documents(texts)
+
+
+def google_embeddings(
+    *,
+    google_api_key: str,
+    embedding_model: str,
+    **kwargs: Any,
+) -> Embeddings:
+    """Rate-limited ``GoogleGenerativeAIEmbeddings`` for ``embedding_model``.
+
+    Query-time callers wrap this in :class:`CachedQueryEmbeddings`.
+    """
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+    inner = GoogleGenerativeAIEmbeddings(
+        model=embedding_model,
+        google_api_key=google_api_key,
+        **kwargs,
+    )
+    return RateLimitedEmbeddings(inner, api_key=google_api_key, model_name=embedding_model)
+
+
+# -----------------------------------------------------------
+# Embedding backends
+#
+# A vector directory records how it was built in ``embedding.json``; query-time
+# loaders read it back so queries are always embedded like the documents.
+#   {"backend": "google", "model": "models/gemini-embedding-001"}
+#   {"backend": "hashed-ngram", "dim": 2048, "ngram_range": [1, 3]}
+# A directory without the file predates it and is treated as "google".
+# -----------------------------------------------------------
+EMBEDDING_CONFIG_FILE = "embedding.json"
+EMBEDDING_BACKENDS = ("google", "hashed-ngram")
+
+
+class HashedNgramEmbeddings(Embeddings):
+    """
+    CPU-only TF-IDF over hashed character n-grams; needs no network or API key.
+
+    Text is NFKC/casefolded, its 1..3-character grams are hashed (crc32) into
+    ``dim`` buckets, weighted by sublinear TF and the IDF fitted on the corpus,
+    then L2-normalized, so FAISS L2 ranking equals cosine ranking. Character
+    grams suit CJK names, which have no word boundaries. A short query embeds
+    in well under a millisecond.
+    """
+
+    IDF_FILE = "embedding_idf.npy"
+
+    def __init__(self, *, dim: int = 2048, ngram_range: tuple[int, int] = (1, 3), idf=None):
+        import numpy as np
+
+        self.dim = int(dim)
+        self.ngram_range = (int(ngram_range[0]), int(ngram_range[1]))
+        self.idf = np.ones(self.dim, dtype="float32") if idf is None else np.asarray(idf, dtype="float32")
+
+    def _buckets(self, text: str) -> Counter:
+        text = " ".join(unicodedata.normalize("NFKC", text or "").casefold().split())
+        lo, hi = self.ngram_range
+        counts: Counter = Counter()
+        for n in range(lo, hi + 1):
+            for i in range(len(text) - n + 1):
+                gram = text[i:i + n]
+                if not gram.isspace():
+                    counts[zlib.crc32(gram.encode("utf-8")) % self.dim] += 1
+        return counts
+
+    def fit(self, texts: Iterable[str]) -> "HashedNgramEmbeddings":
+        import numpy as np
+
+        df = np.zeros(self.dim, dtype="float64")
+        n_docs = 0
+        for text in texts:
+            n_docs += 1
+            df[list(self._buckets(text))] += 1
+        self.idf = (np.log((1 + n_docs) / (1 + df)) + 1).astype("float32")
+        return self
+
+    def _embed(self, text: str) -> list[float]:
+        import numpy as np
+
+        vec = np.zeros(self.dim, dtype="float32")
+        for bucket, count in self._buckets(text).items():
+            vec[bucket] = (1 + math.log(count)) * self.idf[bucket]
+        norm = float(np.linalg.norm(vec))
+        return (vec / norm if norm else vec).tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed(text)
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(t) for t in texts]
+
+    def config(self) -> dict[str, Any]:
+        return {"backend": "hashed-ngram", "dim": self.dim, "ngram_range": list(self.ngram_range)}
+
+    def save(self, directory: Path) -> None:
+        import numpy as np
+
+        np.save(Path(directory) / self.IDF_FILE, self.idf)
+
+    @classmethod
+    def load(cls, directory: Path, config: dict[str, Any]) -> "HashedNgramEmbeddings":
+        import numpy as np
+
+        return cls(
+            dim=config.get("dim", 2048),
+            ngram_range=tuple(config.get("ngram_range", (1, 3))),
+            idf=np.load(Path(directory) / cls.IDF_FILE),
+        )
+
+
+def read_embedding_config(vector_dir: Path | str) -> dict[str, Any]:
+    path = Path(vector_dir) / EMBEDDING_CONFIG_FILE
+    if not path.is_file():
+        return {"backend": "google"}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def write_embedding_config(vector_dir: Path | str, config: dict[str, Any]) -> None:
+    path = Path(vector_dir) / EMBEDDING_CONFIG_FILE
+    path.write_text(json.dumps(config, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+
+def embedding_needs_api_key(config: dict[str, Any]) -> bool:
+    return config.get("backend", "google") == "google"
+
+
+def local_embeddings(vector_dir: Path | str, config: dict[str, Any] | None = None) -> Embeddings:
+    """Query embeddings for a vector directory built with a CPU-local backend."""
+    config = config or read_embedding_config(vector_dir)
+    backend = config.get("backend")
+    if backend == "hashed-ngram":
+        return HashedNgramEmbeddings.load(Path(vector_dir), config)
+    raise ValueError(f"Unknown local embedding backend: {backend!r}")
@@ -0,0 +1,121 @@
+"""HTML -> plain-text cleaning for the saved regulation pages in ``html_pages/``.
+
+Kept free of Streamlit imports so ``ensure_clean_txt_files`` can fan pages out
+to worker processes cheaply.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+
+from bs4 import BeautifulSoup
+
+# lxml is a C parser, several times faster than the pure-Python html.parser on
+# the 200KB+ pages here; it is optional, so fall back when it is missing.
+CLEAN_HTML_PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+# Bump when clean_html changes output, so every page is cleaned again.
+CLEANER_VERSION = 1
+CLEAN_STATE_FILE = ".clean_state.json"
+# Below this many stale pages, starting worker processes costs more than it saves.
+POOL_MIN_PAGES = 8
+
+
+def clean_html(html_text: str, parser: str | None = None) -> str:
+    soup = BeautifulSoup(html_text, parser or CLEAN_HTML_PARSER)
+    for tag in soup(["script", "style", "nav", "footer", "header"]):
+        tag.decompose()
+    for a in soup.find_all("a", href=True):
+        link_text = a.get_text(strip=True)
+        href = a["href"].strip()
+        a.replace_with(f"{link_text} ({href})" if link_text else href)
+    return soup.get_text(separator="\n", strip=True)
+
+
+def _source_key(html_bytes: bytes, parser: str) -> str:
+    """Digest of the page plus everything that shapes its cleaned text."""
+    h = hashlib.sha256(html_bytes)
+    h.update(f"|{parser}|{CLEANER_VERSION}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _clean_file(html_path: str, txt_path: str, parser: str) -> None:
+    """Worker: clean one page and replace its .txt atomically."""
+    text = clean_html(Path(html_path).read_text(encoding="utf-8"), parser)
+    tmp = Path(f"{txt_path}.{os.getpid()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, txt_path)
+
+
+def _load_state(path: Path) -> dict[str, str]:
+    try:
+        state = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return state if isinstance(state, dict) else {}
+
+
+def ensure_clean_txt_files(
+    folder_path="html_pages",
+    force_clean=False,
+    log_fn: Optional[Callable[[str], None]] = None,
+    *,
+    max_workers: int | None = None,
+    parser: str | None = None,
+):
+    """
+    Clean every ``*.html`` in ``folder_path`` to a sibling ``.txt`` and return the .txt paths.
+
+    A page is skipped when its .txt exists and the source hash recorded in
+    ``.clean_state.json`` still matches (page bytes, parser, cleaner version),
+    so edited pages are picked up without ``force_clean``. Stale pages are
+    cleaned serially, or in a process pool of up to ``max_workers`` (default:
+    CPU count) once there are at least ``POOL_MIN_PAGES`` of them. The pool
+    spawns its workers: forking the multithreaded Streamlit server is unsafe.
+    """
+    parser = parser or CLEAN_HTML_PARSER
+    html_dir = Path(folder_path)
+    state_path = html_dir / CLEAN_STATE_FILE
+    state = _load_state(state_path)
+    txt_files = []
+    todo: list[tuple[Path, Path, str]] = []
+    html_files = sorted(html_dir.glob("*.html"))
+    for html_file in html_files:
+        txt_path = html_file.with_suffix(".txt")
+        key = _source_key(html_file.read_bytes(), parser)
+        if force_clean or not txt_path.exists() or state.get(html_file.name) != key:
+            todo.append((html_file, txt_path, key))
+        elif log_fn:
+            log_fn(f"🔁 Using cached: {txt_path.name}")
+        txt_files.append(txt_path)
+
+    if todo:
+        workers = min(len(todo), max_workers or os.cpu_count() or 1)
+        if workers > 1 and len(todo) >= POOL_MIN_PAGES:
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            ) as pool:
+                futures = [pool.submit(_clean_file, str(h), str(t), parser) for h, t, _ in todo]
+                for future in futures:
+                    future.result()
+        else:
+            for html_file, txt_path, _ in todo:
+                _clean_file(str(html_file), str(txt_path), parser)
+    for html_file, _, key in todo:
+        state[html_file.name] = key
+        if log_fn:
+            log_fn(f"✅ Cleaned {html_file.name}")
+    # Drop entries for pages that were removed, then publish atomically.
+    names = {p.name for p in html_files}
+    live = {name: key for name, key in state.items() if name in names}
+    if todo or live != state:
+        tmp = state_path.with_name(f"{state_path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(live, indent=2, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, state_path)
+    return txt_files
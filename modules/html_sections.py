@@ -0,0 +1,194 @@
+"""Split saved regulation HTML pages into heading-scoped sections for RAG chunks.
+
+Works on any page, not a per-site scraper. It strips page chrome (scripts,
+navigation, headers, footers, injected browser-extension widgets) and finds the
+main content container. It then walks the content in document order:
+
+- ``h1``–``h6`` open a new heading path;
+- each top-level list item and each table row becomes its own entry, since on
+  regulation pages that is one regulation or one additive;
+- loose paragraphs are collected into one entry per heading.
+
+Links are rendered as ``text (href)``, as in ``clean_html``, so excerpts can
+still cite their sources. Short or link-dense entries that sit outside every
+heading are treated as site navigation and dropped.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Iterator
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+from bs4.element import PreformattedString
+
+_CHROME_TAGS = [
+    "script", "style", "noscript", "template", "nav", "header", "footer",
+    "form", "button", "iframe", "svg", "select",
+]
+_CONTENT_SELECTORS = ["main", "[role=main]", "#content", "article", "#main-content"]
+_HEADINGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+_LISTS = {"ul", "ol", "dl"}
+_STRUCTURE = sorted(_HEADINGS | _LISTS | {"table"})
+_LINE_BREAKING = {"p", "div", "li", "tr", "pre", "blockquote", "dd", "dt", *_HEADINGS, *_LISTS}
+_SPACE_RE = re.compile(r"[ \t\f\v　\xa0]+")
+_TITLE_MAX_CHARS = 80
+_LINK_SUFFIX_RE = re.compile(r"\s*\((?:https?|mailto|ftp):[^()\s]*\)")
+# An entry with no heading above it is navigation, not content, when links
+# make up this share of its characters or it is shorter than NAV_MIN_CHARS.
+NAV_LINK_DENSITY = 0.8
+NAV_MIN_CHARS = 20
+
+
+def _inline_text(node: Tag, base_url: str, links: list[int] | None = None) -> str:
+    """
+    Visible text of ``node``; links become ``text (href)`` and blocks start new
+    lines. The length of each rendered link is appended to ``links``.
+    """
+    parts: list[str] = []
+    for child in node.children:
+        if isinstance(child, PreformattedString):  # comments, doctype, CDATA
+            continue
+        if isinstance(child, NavigableString):
+            parts.append(str(child))
+        elif child.name == "br":
+            parts.append("\n")
+        elif child.name == "a" and child.get("href"):
+            label = child.get_text(" ", strip=True)
+            href = child["href"].strip()
+            if href.startswith(("#", "javascript:")):
+                parts.append(label)
+                continue
+            href = urljoin(base_url, href) if base_url else href
+            parts.append(f"{label} ({href})" if label else href)
+            if links is not None:
+                links.append(len(parts[-1]))
+        elif child.name in _LINE_BREAKING:
+            parts.append(f"\n{_inline_text(child, base_url, links)}\n")
+        else:
+            parts.append(_inline_text(child, base_url, links))
+    return "".join(parts)
+
+
+def tidy_text(text: str) -> str:
+    """Collapse runs of spaces and drop blank lines."""
+    lines = (_SPACE_RE.sub(" ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def strip_chrome(soup: BeautifulSoup) -> BeautifulSoup:
+    for tag in soup(_CHROME_TAGS):
+        tag.decompose()
+    # Browser extensions inject custom elements such as <__hrp__>; real markup never starts with "_".
+    for tag in soup.find_all(lambda t: t.name.startswith("_")):
+        tag.decompose()
+    for tag in soup.find_all(attrs={"aria-hidden": "true"}):
+        tag.decompose()
+    return soup
+
+
+def content_root(soup: BeautifulSoup) -> Tag:
+    """A landmark element (``main``, ``#content``…), else the parent of the first ``h1``, else ``body``."""
+    for selector in _CONTENT_SELECTORS:
+        found = soup.select_one(selector)
+        if found is not None and found.get_text(strip=True):
+            return found
+    h1 = soup.find("h1")
+    if h1 is not None and h1.parent is not None:
+        return h1.parent
+    return soup.body or soup
+
+
+def _plain_title(text: str) -> str:
+    """First line of an entry without the ``(href)`` suffixes of its links, capped in length."""
+    first = text.splitlines()[0]
+    title = _LINK_SUFFIX_RE.sub("", first).strip() or first
+    return title if len(title) <= _TITLE_MAX_CHARS else title[:_TITLE_MAX_CHARS - 1] + "…"
+
+
+def _table_rows(table: Tag, base_url: str) -> Iterator[str]:
+    """One text per data row; with a header row, cells are labelled ``header: value``."""
+    header: list[str] = []
+    for row in table.find_all("tr"):
+        if row.find_parent("table") is not table:
+            continue
+        cells = row.find_all(["th", "td"], recursive=False)
+        values = [tidy_text(_inline_text(c, base_url)).replace("\n", " ") for c in cells]
+        if not any(values):
+            continue
+        if not header and all(c.name == "th" for c in cells):
+            header = values
+            continue
+        if len(header) == len(values):
+            yield "\n".join(f"{h}: {v}" if h else v for h, v in zip(header, values) if v)
+        else:
+            yield "\n".join(v for v in values if v)
+
+
+class _SectionWalker:
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.headings: list[tuple[int, str]] = []
+        self.pending: list[str] = []
+        self.pending_links: list[int] = []
+        self.sections: list[dict[str, Any]] = []
+
+    def emit(self, text: str, links: list[int], title: str = "") -> None:
+        text = tidy_text(text)
+        if not text:
+            return
+        path = [h for _, h in self.headings]
+        if not path and (len(text) < NAV_MIN_CHARS or sum(links) >= NAV_LINK_DENSITY * len(text)):
+            return
+        self.sections.append({"headings": path, "title": title or _plain_title(text), "text": text})
+
+    def flush(self) -> None:
+        """Emit the paragraphs collected under the current heading as one section."""
+        if self.pending:
+            path = [h for _, h in self.headings]
+            self.emit("\n".join(self.pending), self.pending_links, path[-1] if path else "")
+            self.pending, self.pending_links = [], []
+
+    def walk(self, node: Tag) -> None:
+        for child in node.children:
+            if isinstance(child, PreformattedString):
+                continue
+            if isinstance(child, NavigableString):
+                if child.strip():
+                    self.pending.append(str(child))
+                continue
+            name = child.name
+            if name in _HEADINGS:
+                self.flush()
+                title = tidy_text(child.get_text(" ", strip=True))
+                if title:
+                    level = int(name[1])
+                    while self.headings and self.headings[-1][0] >= level:
+                        self.headings.pop()
+                    self.headings.append((level, title))
+            elif name in _LISTS:
+                self.flush()
+                for item in child.find_all(["li", "dt", "dd"], recursive=False):
+                    links: list[int] = []
+                    self.emit(_inline_text(item, self.base_url, links), links)
+            elif name == "table":
+                self.flush()
+                for text in _table_rows(child, self.base_url):
+                    self.emit(text, [])
+            elif child.find(_STRUCTURE) is None:
+                self.pending.append(_inline_text(child, self.base_url, self.pending_links))
+            else:
+                self.walk(child)
+
+
+def html_sections(html: str, *, base_url: str = "") -> list[dict[str, Any]]:
+    """
+    ``{"headings", "title", "text"}`` entries for the main content of ``html``,
+    in document order. ``headings`` is the enclosing heading path, outermost first.
+    """
+    soup = strip_chrome(BeautifulSoup(html, "html.parser"))
+    walker = _SectionWalker(base_url)
+    walker.walk(content_root(soup))
+    walker.flush()
+    return walker.sections
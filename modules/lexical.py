@@ -0,0 +1,108 @@
+"""In-process BM25 over additive chunks, with CJK-aware tokenization.
+
+Used by ``modules.tw_additive_rag`` for lexical-only retrieval and, fused with
+FAISS via reciprocal-rank fusion, for hybrid retrieval.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from typing import Hashable, Iterable, Sequence
+
+from modules.additive_names import apply_term_aliases, fold_name
+
+_TOKEN_RE = re.compile(r"[㐀-鿿豈-﫿]+|[0-9a-zα-ω]+")
+_CJK_RE = re.compile(r"[㐀-鿿豈-﫿]")
+
+RRF_K = 60
+# Share of a query's IDF mass a document must contain to count as a hit, so a
+# chunk that only shares a common character such as "酸" is not retrieved.
+MIN_QUERY_COVERAGE = 0.5
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Fold (NFKC, case, simplified -> traditional, mainland terms) and split.
+
+    Latin/digit runs become words; CJK runs, which have no spaces, become
+    character unigrams plus bigrams, so "己二烯酸鉀" matches "己二烯酸" and "酸鉀".
+    """
+    tokens: list[str] = []
+    for run in _TOKEN_RE.findall(apply_term_aliases(fold_name(text))):
+        if not _CJK_RE.match(run):
+            tokens.append(run)
+            continue
+        tokens.extend(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over pre-tokenized documents, addressed by position."""
+
+    def __init__(self, docs: Iterable[Sequence[str]], *, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: dict[str, list[tuple[int, int]]] = {}
+        self.doc_len: list[int] = []
+        for doc_id, tokens in enumerate(docs):
+            self.doc_len.append(len(tokens))
+            for token, tf in Counter(tokens).items():
+                self.postings.setdefault(token, []).append((doc_id, tf))
+        n = len(self.doc_len)
+        self.avgdl = (sum(self.doc_len) / n) if n else 0.0
+        self.idf = {
+            token: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5))
+            for token, p in self.postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.doc_len)
+
+    def search(
+        self,
+        query: str,
+        top_n: int = 10,
+        *,
+        min_coverage: float = 0.0,
+    ) -> list[tuple[int, float]]:
+        """
+        ``(doc_id, score)`` pairs for the best ``top_n`` documents, best first.
+
+        Documents holding less than ``min_coverage`` of the query's IDF mass
+        (query tokens missing from the corpus count at the highest IDF) are
+        dropped.
+        """
+        scores: dict[int, float] = {}
+        covered: dict[int, float] = {}
+        k1, b, avgdl = self.k1, self.b, self.avgdl or 1.0
+        unseen_idf = math.log(1 + (len(self) + 0.5) / 0.5)
+        query_mass = 0.0
+        for token, qtf in Counter(tokenize(query)).items():
+            idf = self.idf.get(token)
+            query_mass += unseen_idf if idf is None else idf
+            if idf is None:
+                continue
+            for doc_id, tf in self.postings[token]:
+                norm = k1 * (1 - b + b * self.doc_len[doc_id] / avgdl)
+                scores[doc_id] = scores.get(doc_id, 0.0) + qtf * idf * tf * (k1 + 1) / (tf + norm)
+                covered[doc_id] = covered.get(doc_id, 0.0) + idf
+        if min_coverage > 0 and query_mass > 0:
+            scores = {d: v for d, v in scores.items() if covered[d] / query_mass >= min_coverage}
+        ranked = sorted(scores.items(), key=lambda pair: (-pair[1], pair[0]))
+        return ranked[:top_n]
+
+
+def reciprocal_rank_fusion(
+    rankings: Iterable[Sequence[Hashable]],
+    *,
+    k: int = RRF_K,
+) -> list[Hashable]:
+    """Merge ranked key lists by summed ``1 / (k + rank)``; ties keep first-seen order."""
+    scores: dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda key: -scores[key])
@@ -0,0 +1,145 @@
+"""Persistent per-item regulation verdicts produced by ``render_research``.
+
+A verdict depends only on the retrieved excerpts, which are fixed for a given
+source snapshot, so rows are keyed by (country_code, normalized additive name,
+source_id, as_of_date, model). Bumping ``as_of_date`` in ``sources_manifest.yaml``
+changes the key, and rows for older snapshots of that source are purged on the
+next write. Items answered "資料不足" are not stored, so a run with thin
+retrieval does not pin that answer for the whole snapshot.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterable
+
+from gemini_utils import DEFAULT_CACHE_DIR, _sqlite_connect
+from modules.tw_additive_rag import normalize_additive_name
+
+INSUFFICIENT_DATA = "資料不足"
+
+
+class VerdictCache:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with _sqlite_connect(self.path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS verdicts ("
+                " country TEXT, item TEXT, source_id TEXT, as_of_date TEXT, model TEXT,"
+                " row TEXT, created_at REAL,"
+                " PRIMARY KEY (country, item, source_id, as_of_date, model))"
+            )
+
+    def get_many(
+        self,
+        country: str,
+        items: Iterable[str],
+        *,
+        source_id: str,
+        as_of_date: str,
+        model: str,
+    ) -> dict[str, list[dict[str, Any]]]:
+        """Cached rows for ``items``, keyed by the item string as passed in."""
+        by_key: dict[str, list[str]] = {}
+        for item in items:
+            by_key.setdefault(normalize_additive_name(item), []).append(item)
+        if not by_key:
+            return {}
+        keys = list(by_key)
+        found: dict[str, list[dict[str, Any]]] = {}
+        with _sqlite_connect(self.path) as conn:
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+                marks = ",".join("?" * len(part))
+                rows = conn.execute(
+                    "SELECT item, row FROM verdicts"
+                    " WHERE country = ? AND source_id = ? AND as_of_date = ? AND model = ?"
+                    f" AND item IN ({marks})",
+                    (country, source_id, as_of_date, model, *part),
+                )
+                for key, row in rows:
+                    value = json.loads(row)
+                    for item in by_key[key]:
+                        found[item] = value if isinstance(value, list) else [value]
+        return found
+
+    def put_many(
+        self,
+        country: str,
+        rows: dict[str, list[dict[str, Any]]],
+        *,
+        source_id: str,
+        as_of_date: str,
+        model: str,
+    ) -> None:
+        """Store ``{item: [rows]}`` and drop rows for older snapshots of this source.
+
+        Items with any "資料不足" row are skipped and will be asked again.
+        """
+        rows = {
+            item: item_rows
+            for item, item_rows in rows.items()
+            if item_rows and not any(r.get("使用狀態") == INSUFFICIENT_DATA for r in item_rows)
+        }
+        if not rows:
+            return
+        now = time.time()
+        with _sqlite_connect(self.path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "DELETE FROM verdicts WHERE country = ? AND source_id = ? AND as_of_date != ?",
+                (country, source_id, as_of_date),
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        country,
+                        normalize_additive_name(item),
+                        source_id,
+                        as_of_date,
+                        model,
+                        json.dumps(item_rows, ensure_ascii=False),
+                        now,
+                    )
+                    for item, item_rows in rows.items()
+                ],
+            )
+            conn.execute("COMMIT")
+
+    def clear(self) -> None:
+        with _sqlite_connect(self.path) as conn:
+            conn.execute("DELETE FROM verdicts")
+
+
+def match_rows_to_items(reg_json: Any, items: Iterable[str]) -> dict[str, list[dict[str, Any]]]:
+    """Group Gemini output rows under the requested items by their normalized ``項目``."""
+    rows = reg_json if isinstance(reg_json, list) else [reg_json] if isinstance(reg_json, dict) else []
+    wanted = {normalize_additive_name(i): i for i in items}
+    matched: dict[str, list[dict[str, Any]]] = {}
+    for row in rows:
+        if not isinstance(row, dict):
+            continue
+        item = wanted.get(normalize_additive_name(row.get("項目")))
+        if item is not None:
+            matched.setdefault(item, []).append(row)
+    return matched
+
+
+_verdict_cache: VerdictCache | None = None
+_verdict_cache_lock = threading.Lock()
+
+
+def get_verdict_cache() -> VerdictCache:
+    """Process-wide :class:`VerdictCache` under ``DEFAULT_CACHE_DIR``."""
+    global _verdict_cache
+    with _verdict_cache_lock:
+        if _verdict_cache is None:
+            _verdict_cache = VerdictCache(DEFAULT_CACHE_DIR / "reg_verdicts.sqlite3")
+    return _verdict_cache
+
@@ -2,17 +2,42 @@
 
 from __future__ import annotations
 
+import csv
 import datetime as dt
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
 from pathlib import Path
 from typing import Any, Sequence
 
 import yaml
 
+from modules.additive_names import (
+    INS_NUMBERS,
+    NAME_ALIASES,
+    TrigramIndex,
+    compact_key,
+    ins_codes,
+    name_variants,
+    query_variants,
+)
+from modules.lexical import MIN_QUERY_COVERAGE, BM25Index, reciprocal_rank_fusion, tokenize
+
 REPO_ROOT = Path(__file__).resolve().parents[1]
 DEFAULT_MANIFEST_PATH = REPO_ROOT / "data" / "sources_manifest.yaml"
 DEFAULT_VECTOR_DIR = REPO_ROOT / "data" / "processed" / "taiwan" / "vector_store"
+DEFAULT_CHUNKS_PATH = DEFAULT_VECTOR_DIR.parent / "additive_chunks.jsonl"
+DEFAULT_LIMITS_PATH = DEFAULT_VECTOR_DIR.parent / "additive_limits.csv"
 DEFAULT_EMBEDDING_MODEL = "models/gemini-embedding-001"
 
+# "hybrid" fuses BM25 and FAISS rankings, "vector" is FAISS only, and
+# "lexical" is BM25 only (no embeddings or API key at all).
+RETRIEVAL_MODES = ("hybrid", "vector", "lexical")
+DEFAULT_RETRIEVAL_MODE = os.environ.get("FOOD_INNOVATOR_RETRIEVAL_MODE", "hybrid")
+
 
 def _as_iso_date(value: Any) -> str | None:
     if value is None:
@@ -36,7 +61,8 @@ def load_sources_manifest(manifest_path: Path | str | None = None) -> dict[str,
     return data if isinstance(data, dict) else {"sources": []}
 
 
-def get_tw_source(
+def get_country_source(
+    country_code: str,
     manifest: dict[str, Any] | None = None,
     *,
     manifest_path: Path | str | None = None,
@@ -50,11 +76,20 @@ def get_tw_source(
                 return s
         return None
     for s in sources:
-        if isinstance(s, dict) and s.get("country_code") == "tw":
+        if isinstance(s, dict) and s.get("country_code") == country_code:
             return s
     return None
 
 
+def get_tw_source(
+    manifest: dict[str, Any] | None = None,
+    *,
+    manifest_path: Path | str | None = None,
+    source_id: str | None = None,
+) -> dict[str, Any] | None:
+    return get_country_source("tw", manifest, manifest_path=manifest_path, source_id=source_id)
+
+
 def staleness_days(as_of: str | None, *, today: dt.date | None = None) -> int | None:
     if not as_of:
         return None
@@ -95,34 +130,119 @@ def tw_staleness_warning_message(
 
 
 def vector_store_dir_ready(vector_dir: Path | str | None = None) -> bool:
+    from modules.chunk_store import chunk_store_ready
+
     vdir = Path(vector_dir) if vector_dir else DEFAULT_VECTOR_DIR
-    return (vdir / "index.faiss").is_file() and (vdir / "index.pkl").is_file()
+    return (vdir / "index.faiss").is_file() and (
+        chunk_store_ready(vdir) or (vdir / "index.pkl").is_file()
+    )
 
 
-def load_tw_vector_store(
-    *,
-    google_api_key: str,
-    vector_dir: Path | str | None = None,
-    embedding_model: str = DEFAULT_EMBEDDING_MODEL,
-):
-    """Load read-only FAISS index built by ``scripts/build_tw_chunks.py --embed``."""
-    from langchain_community.vectorstores import FAISS
-    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+def load_tw_faiss_index(vector_dir: Path | str | None = None):
+    """
+    Load the FAISS index and chunk texts with no query-embedding client attached.
+
+    Directories written by ``build_tw_chunks.py`` carry a memory-mapped chunk
+    store (:mod:`modules.chunk_store`), which is used instead of unpickling
+    ``index.pkl``; older directories fall back to ``FAISS.load_local``.
+
+    The result holds no credentials, so one copy can be shared by every user in
+    the process; attach a per-user client with :func:`bind_query_embeddings`.
+    """
+    from modules.chunk_store import MappedVectorStore, chunk_store_ready
 
     vdir = Path(vector_dir) if vector_dir else DEFAULT_VECTOR_DIR
     if not vector_store_dir_ready(vdir):
         return None
-    embeddings = GoogleGenerativeAIEmbeddings(
-        model=embedding_model,
-        google_api_key=google_api_key,
-    )
+    if chunk_store_ready(vdir):
+        return MappedVectorStore.load(vdir)
+
+    from langchain_community.vectorstores import FAISS
+
+    from modules.embeddings import UnboundEmbeddings
+
     return FAISS.load_local(
         folder_path=str(vdir),
-        embeddings=embeddings,
+        embeddings=UnboundEmbeddings(),
         allow_dangerous_deserialization=True,
     )
 
 
+def tw_embedding_config(vector_dir: Path | str | None = None) -> dict[str, Any]:
+    """The ``embedding.json`` a vector directory was built with (``google`` if absent)."""
+    from modules.embeddings import read_embedding_config
+
+    return read_embedding_config(Path(vector_dir) if vector_dir else DEFAULT_VECTOR_DIR)
+
+
+def tw_index_needs_api_key(vector_dir: Path | str | None = None) -> bool:
+    from modules.embeddings import embedding_needs_api_key
+
+    return embedding_needs_api_key(tw_embedding_config(vector_dir))
+
+
+def tw_query_embeddings(
+    *,
+    google_api_key: str = "",
+    embedding_model: str = DEFAULT_EMBEDDING_MODEL,
+    vector_dir: Path | str | None = None,
+):
+    """
+    Query embeddings matching the backend ``vector_dir`` was built with.
+
+    Google: rate-limited and disk-cached per API key, using the model recorded
+    in the index. Local backends need no key and run in-process.
+    """
+    from modules.embeddings import CachedQueryEmbeddings, google_embeddings, local_embeddings
+
+    vdir = Path(vector_dir) if vector_dir else DEFAULT_VECTOR_DIR
+    config = tw_embedding_config(vdir)
+    if config.get("backend", "google") != "google":
+        return local_embeddings(vdir, config)
+    embedding_model = config.get("model") or embedding_model
+    return CachedQueryEmbeddings(
+        google_embeddings(
+            google_api_key=google_api_key,
+            embedding_model=embedding_model,
+        ),
+        model_name=embedding_model,
+    )
+
+
+def bind_query_embeddings(base_store, embeddings):
+    """A view over ``base_store``'s index and chunks that embeds queries with ``embeddings``."""
+    if base_store is None:
+        return None
+    if hasattr(base_store, "bind"):
+        return base_store.bind(embeddings)
+
+    from langchain_community.vectorstores import FAISS
+
+    return FAISS(
+        embedding_function=embeddings,
+        index=base_store.index,
+        docstore=base_store.docstore,
+        index_to_docstore_id=base_store.index_to_docstore_id,
+    )
+
+
+def load_tw_vector_store(
+    *,
+    google_api_key: str = "",
+    vector_dir: Path | str | None = None,
+    embedding_model: str = DEFAULT_EMBEDDING_MODEL,
+):
+    """Load read-only FAISS index built by ``scripts/build_tw_chunks.py --embed``."""
+    return bind_query_embeddings(
+        load_tw_faiss_index(vector_dir),
+        tw_query_embeddings(
+            google_api_key=google_api_key,
+            embedding_model=embedding_model,
+            vector_dir=vector_dir,
+        ),
+    )
+
+
 def _doc_dedupe_key(meta: dict[str, Any], fallback: str) -> tuple[Any, ...]:
     chunk_id = meta.get("chunk_id")
     part = meta.get("chunk_part", 0)
@@ -142,48 +262,411 @@ def extract_section(text: str, start: str, end_markers: list[str]) -> str:
 
     return part or "資料不足"
 
+def normalize_additive_name(name: Any) -> str:
+    """Fold width/case so lookups ignore full-width vs half-width and casing."""
+    return unicodedata.normalize("NFKC", str(name or "")).strip().casefold()
+
+
+FUZZY_MIN_SCORE = 0.72
+# BM25 term weight of an additive's names relative to the rest of its chunk.
+BM25_NAME_WEIGHT = 3
+# Digits, Latin letters and Chinese numerals tell apart names that are otherwise
+# near-identical (維生素B1 / B12, 黃色四號 / 四十號); a fuzzy match must keep them.
+_DISTINGUISHING_RE = re.compile(r"[0-9a-z]+|[零〇一二三四五六七八九十百千兩]+")
+
+
+def _distinguishing_parts(key: str) -> list[str]:
+    return _DISTINGUISHING_RE.findall(key)
+
+
+class AdditiveIndex:
+    """
+    In-memory view of ``additive_chunks.jsonl`` with O(1) exact name lookups.
+
+    Besides exact zh/en names it resolves folded spellings (simplified
+    characters, spacing, width), synonyms from ``modules.additive_names``,
+    E-number / INS codes and, optionally, near-misses by trigram similarity,
+    so most user inputs never need an embedding round-trip.
+
+    The file is parsed once; ``refresh()`` re-stats it and reloads only when the
+    mtime changed *and* the content hash differs from the loaded copy.
+    """
+
+    def __init__(self, jsonl_path: Path | str):
+        self.path = Path(jsonl_path)
+        self.records: list[dict[str, Any]] = []
+        self.by_zh: dict[str, list[dict[str, Any]]] = {}
+        self.by_en: dict[str, list[dict[str, Any]]] = {}
+        # compact key -> normalized zh names it stands for
+        self.names: dict[str, tuple[str, ...]] = {}
+        self.aliases: dict[str, tuple[str, ...]] = {}
+        self._trigrams = TrigramIndex(())
+        self._bm25: BM25Index | None = None
+        self._mtime_ns: int | None = None
+        self._digest: str | None = None
+        self._lock = threading.Lock()
+
+    def refresh(self) -> "AdditiveIndex":
+        try:
+            mtime_ns = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime_ns = None
+        if mtime_ns == self._mtime_ns and self._digest is not None:
+            return self
+        with self._lock:
+            if mtime_ns == self._mtime_ns and self._digest is not None:
+                return self
+            if mtime_ns is None:
+                self._load(b"")
+            else:
+                raw = self.path.read_bytes()
+                if hashlib.sha256(raw).hexdigest() != self._digest:
+                    self._load(raw)
+            self._mtime_ns = mtime_ns
+        return self
+
+    def _load(self, raw: bytes) -> None:
+        records: list[dict[str, Any]] = []
+        by_zh: dict[str, list[dict[str, Any]]] = {}
+        by_en: dict[str, list[dict[str, Any]]] = {}
+        for line in raw.decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            rec = json.loads(line)
+            records.append(rec)
+            meta = rec.get("metadata") or {}
+            zh = normalize_additive_name(meta.get("zh_name"))
+            en = normalize_additive_name(meta.get("en_name"))
+            if zh:
+                by_zh.setdefault(zh, []).append(rec)
+            if en:
+                by_en.setdefault(en, []).append(rec)
+        names, aliases = self._name_tables(records, by_zh)
+        trigram_index = TrigramIndex([*names, *(k for k in aliases if not k.startswith("ins:"))])
+        # Swap in one go so concurrent readers never see a half-built index.
+        self.records, self.by_zh, self.by_en = records, by_zh, by_en
+        self.names, self.aliases, self._trigrams = names, aliases, trigram_index
+        self._bm25 = None
+        self._digest = hashlib.sha256(raw).hexdigest()
+
+    @staticmethod
+    def _name_tables(
+        records: list[dict[str, Any]],
+        by_zh: dict[str, list[dict[str, Any]]],
+    ) -> tuple[dict[str, tuple[str, ...]], dict[str, tuple[str, ...]]]:
+        names: dict[str, set[str]] = {}
+        aliases: dict[str, set[str]] = {}
+        for rec in records:
+            meta = rec.get("metadata") or {}
+            zh = normalize_additive_name(meta.get("zh_name"))
+            if not zh:
+                continue
+            for raw_name in (meta.get("zh_name"), meta.get("en_name")):
+                if not raw_name:
+                    continue
+                key = compact_key(raw_name)
+                if key:
+                    names.setdefault(key, set()).add(zh)
+                for variant in name_variants(str(raw_name)):
+                    key = compact_key(variant)
+                    if key:
+                        aliases.setdefault(key, set()).add(zh)
+        curated = [(compact_key(a), t) for a, t in NAME_ALIASES.items()]
+        curated += [(f"ins:{code}", t) for code, t in INS_NUMBERS.items()]
+        for key, target in curated:
+            zh = normalize_additive_name(target)
+            if zh in by_zh:
+                aliases[key] = {zh}
+        # A variant shared by several additives ("維生素c") is not an alias.
+        return (
+            {k: tuple(sorted(v)) for k, v in names.items()},
+            {k: tuple(v) for k, v in aliases.items() if len(v) == 1 and k not in names},
+        )
+
+    def _records_for(self, zh_names: Sequence[str]) -> list[dict[str, Any]]:
+        return [rec for zh in zh_names for rec in self.by_zh.get(zh, [])]
+
+    def lookup(self, name: str) -> list[dict[str, Any]]:
+        """All records whose zh_name or en_name equals ``name`` (normalized), in file order."""
+        key = normalize_additive_name(name)
+        if not key:
+            return []
+        return self.by_zh.get(key) or self.by_en.get(key) or []
+
+    @property
+    def bm25(self) -> BM25Index:
+        """BM25 over names (weighted ``BM25_NAME_WEIGHT``) and chunk text, built on first use."""
+        bm25 = self._bm25
+        if bm25 is None:
+            with self._lock:
+                if self._bm25 is None:
+                    docs = []
+                    for rec in self.records:
+                        meta = rec.get("metadata") or {}
+                        names = f"{meta.get('zh_name', '')} {meta.get('en_name', '')}"
+                        # The chunk text already carries the names once (its
+                        # 中文品名 / 英文品名 or 項目 header).
+                        docs.append(
+                            tokenize(names) * (BM25_NAME_WEIGHT - 1) + tokenize(rec.get("text", ""))
+                        )
+                    self._bm25 = BM25Index(docs)
+                bm25 = self._bm25
+        return bm25
+
+    def search(
+        self,
+        query: str,
+        top_n: int = 10,
+        *,
+        min_coverage: float = MIN_QUERY_COVERAGE,
+    ) -> list[dict[str, Any]]:
+        """Records ranked by BM25 for ``query``, dropping those below ``min_coverage``."""
+        records = self.records
+        return [records[i] for i, _ in self.bm25.search(query, top_n, min_coverage=min_coverage)]
+
+    def first(self, name: str) -> dict[str, Any] | None:
+        hits = self.lookup(name)
+        return hits[0] if hits else None
+
+    def resolve(
+        self,
+        name: str,
+        *,
+        fuzzy: bool = True,
+        min_score: float = FUZZY_MIN_SCORE,
+    ) -> tuple[list[dict[str, Any]], str]:
+        """
+        Records for ``name`` and how they were found: ``"exact"``, ``"alias"``
+        (folded spelling, synonym or INS code) or ``"fuzzy"``; ``([], "")`` on a miss.
+
+        A fuzzy hit needs a trigram Dice score of at least ``min_score``, the
+        same digits / Latin letters / numerals as the query, and a unique best
+        candidate, so it never picks between two close additives. Callers treat
+        it as extra context only, never as a confirmed match.
+        """
+        hits = self.lookup(name)
+        if hits:
+            return hits, "exact"
+        keys = list(dict.fromkeys(k for k in map(compact_key, query_variants(name)) if k))
+        for key in keys:
+            zh_names = self.names.get(key) or self.aliases.get(key)
+            if zh_names:
+                return self._records_for(zh_names), "alias"
+        for code in ins_codes(name):
+            zh_names = self.aliases.get(f"ins:{code}")
+            if zh_names:
+                return self._records_for(zh_names), "alias"
+        if not fuzzy:
+            return [], ""
+        for key in keys[:2]:
+            parts = _distinguishing_parts(key)
+            ranked = [
+                (score, cand) for score, cand in self._trigrams.best(key, limit=8)
+                if _distinguishing_parts(cand) == parts
+            ][:2]
+            if not ranked or ranked[0][0] < min_score:
+                continue
+            best = self.names.get(ranked[0][1]) or self.aliases.get(ranked[0][1])
+            if len(ranked) > 1 and ranked[1][0] == ranked[0][0]:
+                runner_up = self.names.get(ranked[1][1]) or self.aliases.get(ranked[1][1])
+                if runner_up != best:
+                    continue
+            return self._records_for(best), "fuzzy"
+        return [], ""
+
+
+_ADDITIVE_INDEXES: dict[Path, AdditiveIndex] = {}
+_ADDITIVE_INDEXES_LOCK = threading.Lock()
+
+
+def get_additive_index(jsonl_path: Path | str | None = None) -> AdditiveIndex:
+    """Process-wide, lazily built :class:`AdditiveIndex` for ``jsonl_path``."""
+    path = Path(jsonl_path) if jsonl_path else DEFAULT_CHUNKS_PATH
+    key = path.resolve()
+    with _ADDITIVE_INDEXES_LOCK:
+        index = _ADDITIVE_INDEXES.get(key)
+        if index is None:
+            index = _ADDITIVE_INDEXES[key] = AdditiveIndex(key)
+    return index.refresh()
+
+
+class LimitsTable:
+    """
+    Structured scope/limit clauses from ``additive_limits.csv``, grouped by chunk_id.
+
+    Written by ``scripts/build_tw_chunks.py``; reloaded when the file's mtime changes.
+    """
+
+    def __init__(self, csv_path: Path | str):
+        self.path = Path(csv_path)
+        self.by_chunk: dict[str, list[dict[str, str]]] = {}
+        self._mtime_ns: int | None = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def refresh(self) -> "LimitsTable":
+        try:
+            mtime_ns = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime_ns = None
+        if self._loaded and mtime_ns == self._mtime_ns:
+            return self
+        with self._lock:
+            if self._loaded and mtime_ns == self._mtime_ns:
+                return self
+            by_chunk: dict[str, list[dict[str, str]]] = {}
+            if mtime_ns is not None:
+                with self.path.open(encoding="utf-8", newline="") as f:
+                    for row in csv.DictReader(f):
+                        by_chunk.setdefault(row["chunk_id"], []).append(row)
+            self.by_chunk = by_chunk
+            self._mtime_ns = mtime_ns
+            self._loaded = True
+        return self
+
+    def clauses(self, chunk_id: str) -> list[dict[str, str]]:
+        return self.by_chunk.get(chunk_id, [])
+
+
+_LIMITS_TABLES: dict[Path, LimitsTable] = {}
+
+
+def get_limits_table(csv_path: Path | str | None = None) -> LimitsTable:
+    """Process-wide, lazily loaded :class:`LimitsTable` for ``csv_path``."""
+    path = (Path(csv_path) if csv_path else DEFAULT_LIMITS_PATH).resolve()
+    with _ADDITIVE_INDEXES_LOCK:
+        table = _LIMITS_TABLES.get(path)
+        if table is None:
+            table = _LIMITS_TABLES[path] = LimitsTable(path)
+    return table.refresh()
+
+
+def _format_limit(clause: dict[str, str]) -> str:
+    kind = clause.get("limit_type")
+    amount = f"{clause.get('max_amount', '')} {clause.get('unit', '')}".strip()
+    basis = clause.get("basis") or ""
+    note = clause.get("note") or ""
+    if kind == "gmp":
+        text = "視實際需要適量使用"
+    elif kind == "scope":
+        text = "未訂定限量"
+    elif kind == "residue":
+        text = f"殘留量 {amount} 以下"
+    elif kind == "daily":
+        text = f"每日食用量中{basis}總含量 {amount} 以下"
+    else:
+        text = f"{amount} 以下" + (f"（以 {basis} 計）" if basis else "")
+    return f"{text}（{note}）" if note else text
+
+
+# Category rules that narrow a "允許" answer: food-range exclusions (鮮乳及保久乳)
+# and the combined-use sum rule for preservatives, sweeteners and antioxidants.
+_CONDITION_RULE_RE = re.compile(r"混合使用|不包括|禁止")
+_RULE_ITEM_RE = re.compile(r"(?:^|\n)\s*\d+\s*[.．、]\s*")
+
+
+def usage_conditions(text: str) -> list[str]:
+    """Condition sentences from a chunk's 類別規則與說明 section, wrapped lines joined."""
+    rules = extract_section(text, "類別規則與說明:", [])
+    if rules == "資料不足":
+        return []
+    items = (re.sub(r"\s*\n\s*", "", part).strip() for part in _RULE_ITEM_RE.split(rules))
+    return [item for item in items if item and _CONDITION_RULE_RE.search(item)]
+
+
+def tw_structured_verdicts(
+    item: str,
+    *,
+    jsonl_path: Path | str | None = None,
+    limits_path: Path | str | None = None,
+) -> list[dict[str, Any]] | None:
+    """
+    Answer a Taiwan name hit straight from the structured limits table.
+
+    Exact names, folded spellings, synonyms and INS codes count as hits; fuzzy
+    matches do not. Returns one result row per scope clause, in the same shape
+    ``render_research`` expects from Gemini, or None when the name does not
+    resolve or any clause could not be parsed. In that case the item needs
+    RAG + Gemini. Category exclusions and combined-use rules are carried into
+    ``標示或衛生要求`` and mark the row "允許（附條件）".
+    """
+    records, how = get_additive_index(jsonl_path).resolve(item, fuzzy=False)
+    if not records:
+        return None
+    table = get_limits_table(limits_path)
+    rows: list[dict[str, Any]] = []
+    for rec in records:
+        clauses = table.clauses(rec.get("id", ""))
+        if not clauses or any(c.get("parsed") != "1" for c in clauses):
+            return None
+        meta = rec.get("metadata", {})
+        restrictions = extract_section(rec.get("text", ""), "使用限制:", ["類別規則與說明:"])
+        conditions = usage_conditions(rec.get("text", ""))
+        requirements = [r for r in (restrictions,) if r != "資料不足"] + conditions
+        for clause in clauses:
+            zh = meta.get("zh_name", "")
+            rows.append({
+                "項目": zh if how == "exact" else f"{zh}（{item}）",
+                "類型": meta.get("category", ""),
+                "使用狀態": "允許（附條件）" if conditions else "允許",
+                "最大添加量": _format_limit(clause),
+                "適用食品類別": clause.get("food_scope", ""),
+                "標示或衛生要求": "\n".join(requirements),
+                "條文或來源": f"{meta.get('official_url', '')}；item_no={meta.get('item_no', '')}",
+            })
+    return rows
+
+
 # do exact match and return the result -- pending to use
 def exact_match_tw_additive(item: str, jsonl_path=None):
-    import json
+    rec = get_additive_index(jsonl_path).first(item)
+    if rec is None:
+        return None
 
-    jsonl_path = jsonl_path or (DEFAULT_VECTOR_DIR.parent / "additive_chunks.jsonl")
-    q = str(item).strip().lower()
+    meta = rec.get("metadata", {})
+    zh = str(meta.get("zh_name", "")).strip()
+    en = str(meta.get("en_name", "")).strip()
+    text = rec.get("text", "")
 
-    with open(jsonl_path, encoding="utf-8") as f:
-        for line in f:
-            rec = json.loads(line)
-            meta = rec.get("metadata", {})
-            zh = str(meta.get("zh_name", "")).strip()
-            en = str(meta.get("en_name", "")).strip()
-
-            if q == zh.lower() or q == en.lower():
-                text = rec.get("text", "")
-
-                scope = extract_section(
-                    text,
-                    "使用食品範圍及限量:",
-                    ["使用限制:", "類別規則與說明:"]
-                )
-
-                restrictions = extract_section(
-                    text,
-                    "使用限制:",
-                    ["類別規則與說明:"]
-                )
-
-                return {
-                    "國家": meta.get("country", "tw"),
-                    "項目": zh,
-                    "英文名稱": en,
-                    "類型": meta.get("category", "資料不足"),
-                    "使用狀態": "可查到法規資料",
-                    "最大添加量": scope,
-                    "適用食品類別": scope,
-                    "使用限制": restrictions,
-                    "條文或來源": f"{meta.get('official_url', '資料不足')}；item_no={meta.get('item_no', '')}",
-                }
+    scope = extract_section(
+        text,
+        "使用食品範圍及限量:",
+        ["使用限制:", "類別規則與說明:"]
+    )
 
-    return None
+    restrictions = extract_section(
+        text,
+        "使用限制:",
+        ["類別規則與說明:"]
+    )
+
+    return {
+        "國家": meta.get("country", "tw"),
+        "項目": zh,
+        "英文名稱": en,
+        "類型": meta.get("category", "資料不足"),
+        "使用狀態": "可查到法規資料",
+        "最大添加量": scope,
+        "適用食品類別": scope,
+        "使用限制": restrictions,
+        "條文或來源": f"{meta.get('official_url', '資料不足')}；item_no={meta.get('item_no', '')}",
+    }
+
+
+def _local_name_blocks(index: AdditiveIndex, query: str, seen_ids: set) -> tuple[list[str], bool]:
+    """Blocks for records the name index finds for ``query``, and whether that is a confirmed match."""
+    records, how = index.resolve(query)
+    blocks = []
+    for rec in records:
+        if rec.get("id") in seen_ids:
+            continue
+        seen_ids.add(rec.get("id"))
+        meta = rec.get("metadata", {})
+        zh = meta.get("zh_name", "")
+        en = meta.get("en_name", "")
+        block = f"[{zh} / {en}] category={meta.get('category')} item_no={meta.get('item_no')}\n{rec.get('text')}"
+        blocks.append(block)
+    return blocks, bool(records) and how != "fuzzy"
 
 
 def retrieve_tw_additive_context_exact_first(
@@ -193,79 +676,169 @@ def retrieve_tw_additive_context_exact_first(
     jsonl_path=None,
     k=6,
 ):
-    import json
-    from pathlib import Path
-
-    # load raw chunks
-    jsonl_path = jsonl_path or (DEFAULT_VECTOR_DIR.parent / "additive_chunks.jsonl")
-
-    records = []
-    with open(jsonl_path, encoding="utf-8") as f:
-        for line in f:
-            rec = json.loads(line)
-            records.append(rec)
+    index = get_additive_index(jsonl_path)
 
     blocks = []
     matched = set()
+    seen_ids = set()
 
-    # 1️⃣ exact match first
+    # 1️⃣ local name match first (exact, alias, INS code, then trigram); a
+    # trigram guess only adds context, the query still goes to retrieval
     for q in queries:
         q = q.strip()
-        for rec in records:
-            meta = rec.get("metadata", {})
-            zh = meta.get("zh_name", "")
-            en = meta.get("en_name", "")
+        local, confirmed = _local_name_blocks(index, q, seen_ids)
+        blocks.extend(local)
+        if confirmed:
+            matched.add(q)
 
-            if q == zh or q.lower() == en.lower():
-                block = f"[{zh} / {en}] category={meta.get('category')} item_no={meta.get('item_no')}\n{rec.get('text')}"
-                blocks.append(block)
-                matched.add(q)
-                break
-
-    # 2️⃣ fallback to FAISS for remaining
-    remaining = [q for q in queries if q not in matched]
+    # 2️⃣ fallback to BM25 / FAISS retrieval for true misses only
+    remaining = [q for q in queries if q.strip() not in matched]
 
     if remaining:
-        faiss_text = retrieve_tw_additive_context(vector_store, remaining, k=k)
+        faiss_text = retrieve_tw_additive_context(vector_store, remaining, k=k, jsonl_path=jsonl_path)
         if faiss_text:
             blocks.append(faiss_text)
 
     return "\n\n---\n\n".join(blocks)
 
-def retrieve_tw_additive_context(
+
+def retrieve_tw_additive_contexts_exact_first(
     vector_store,
-    queries: Sequence[str],
+    queries,
     *,
-    k: int = 6,
-    max_chars: int = 120_000,
-) -> str:
+    jsonl_path=None,
+    k=6,
+) -> list[str]:
     """
-    Run similarity search per query string, dedupe overlapping segments, format for prompts.
+    Per-query form of :func:`retrieve_tw_additive_context_exact_first`.
 
-    Metadata is expected from ``build_tw_chunks.py`` (``chunk_id``, ``zh_name``, ``en_name``, etc.).
+    Names the local index confirms need no search; every other query goes to
+    one batched :func:`retrieve_each` call. Returns one context per query.
     """
-    if not vector_store or not queries:
-        return ""
-    seen: set[tuple[Any, ...]] = set()
-    blocks: list[str] = []
-    total_len = 0
-
+    index = get_additive_index(jsonl_path)
+    queries = [(q or "").strip() for q in queries]
+    local: list[list[str]] = []
+    remaining: list[str] = []
     for q in queries:
-        q = (q or "").strip()
-        if not q:
+        blocks, confirmed = _local_name_blocks(index, q, set()) if q else ([], False)
+        local.append(blocks)
+        if q and not confirmed:
+            remaining.append(q)
+    searched = dict(zip(remaining, retrieve_each(vector_store, remaining, k, jsonl_path=jsonl_path)))
+    return [
+        "\n\n---\n\n".join(b for b in (*blocks, searched.get(q, "")) if b)
+        for q, blocks in zip(queries, local)
+    ]
+
+
+def tw_resolves_locally(item: str, *, jsonl_path=None) -> bool:
+    """True when ``retrieve_tw_additive_context_exact_first`` needs no vector search for ``item``."""
+    records, how = get_additive_index(jsonl_path).resolve(item.strip())
+    return bool(records) and how != "fuzzy"
+
+
+Hit = tuple[tuple[Any, ...], str, dict[str, Any]]
+
+
+def _doc_hits(docs, country: str = "tw") -> list[Hit]:
+    hits = []
+    for doc in docs:
+        text = (doc.page_content or "").strip()
+        if not text:
             continue
+        meta = dict(doc.metadata) if getattr(doc, "metadata", None) else {}
+        if meta.get("country") and meta.get("country") != country:
+            continue
+        hits.append((_doc_dedupe_key(meta, text), text, meta))
+    return hits
+
+
+def _vector_hits_many(
+    vector_store,
+    queries: Sequence[str],
+    k: int,
+    country: str = "tw",
+) -> list[list[Hit]]:
+    """One batched embedding request and one ``index.search`` for all ``queries``."""
+    import numpy as np
+
+    embeddings = vector_store.embedding_function
+    if hasattr(embeddings, "embed_queries"):
+        vectors = embeddings.embed_queries(list(queries))
+    else:
+        vectors = [embeddings.embed_query(q) for q in queries]
+    if hasattr(vector_store, "search_vectors"):
+        return [
+            _doc_hits(vector_store.documents(row for row, _ in hits), country)
+            for hits in vector_store.search_vectors(vectors, k)
+        ]
+    # langchain FAISS: same search, rows mapped through its docstore.
+    _, rows = vector_store.index.search(np.asarray(vectors, dtype="float32"), k)
+    return [
+        _doc_hits(
+            (
+                vector_store.docstore.search(vector_store.index_to_docstore_id[int(r)])
+                for r in row_ids
+                if r != -1
+            ),
+            country,
+        )
+        for row_ids in rows
+    ]
+
+
+def _lexical_hits(index: AdditiveIndex, query: str, k: int) -> list[Hit]:
+    hits = []
+    for rec in index.search(query, k):
+        text = (rec.get("text") or "").strip()
+        meta = {**(rec.get("metadata") or {}), "chunk_id": rec.get("id"), "chunk_part": 0}
+        hits.append((_doc_dedupe_key(meta, text), text, meta))
+    return hits
+
+
+def _fuse_hits(rankings: list[list[Hit]], k: int) -> list[Hit]:
+    """RRF over hit lists; a chunk found by several rankers keeps the first ranker's text."""
+    if len(rankings) == 1:
+        return rankings[0][:k]
+    by_key: dict[tuple[Any, ...], Hit] = {}
+    for ranking in rankings:
+        for hit in ranking:
+            by_key.setdefault(hit[0], hit)
+    fused = reciprocal_rank_fusion([[hit[0] for hit in ranking] for ranking in rankings])
+    return [by_key[key] for key in fused[:k]]
+
+
+def _ranked_hits_many(
+    vector_store,
+    queries: list[str],
+    k: int,
+    mode: str,
+    jsonl_path: Path | str | None,
+    country: str,
+) -> list[list[Hit]]:
+    """Fused top-``k`` hits per query: one vector batch plus BM25 per query."""
+    rankings_per_query: list[list[list[Hit]]] = [[] for _ in queries]
+    if mode != "lexical":
         try:
-            docs = vector_store.similarity_search(q, k=k)
+            vector_hits = _vector_hits_many(vector_store, queries, k, country)
         except Exception:
-            continue
-        for doc in docs:
-            text = (doc.page_content or "").strip()
-            if not text:
-                continue
-            meta = dict(doc.metadata) if getattr(doc, "metadata", None) else {}
-            if meta.get("country") and meta.get("country") != "tw":
-                continue
-            key = _doc_dedupe_key(meta, text)
+            vector_hits = [[] for _ in queries]
+        for rankings, hits in zip(rankings_per_query, vector_hits):
+            rankings.append(hits)
+    if mode != "vector":
+        index = get_additive_index(jsonl_path)
+        for rankings, q in zip(rankings_per_query, queries):
+            rankings.append(_lexical_hits(index, q, k))
+    return [_fuse_hits(rankings, k) for rankings in rankings_per_query]
+
+
+def _format_hits(hits_per_query, max_chars: int) -> str:
+    """Prompt blocks for hits in order, overlapping segments deduped, capped at ``max_chars``."""
+    seen: set[tuple[Any, ...]] = set()
+    blocks: list[str] = []
+    total_len = 0
+    for hits in hits_per_query:
+        for key, text, meta in hits:
             if key in seen:
                 continue
             seen.add(key)
@@ -286,5 +859,92 @@ def retrieve_tw_additive_context(
                 return "\n\n---\n\n".join(blocks)
             blocks.append(block)
             total_len += len(block)
-
     return "\n\n---\n\n".join(blocks)
+
+
+def _retrieval_mode(vector_store, mode: str | None) -> str | None:
+    """Effective mode, or None when nothing can be retrieved (no vector store, not lexical)."""
+    mode = mode or DEFAULT_RETRIEVAL_MODE
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown retrieval mode: {mode!r}")
+    if not vector_store and mode != "lexical":
+        return None
+    return mode
+
+
+def retrieve_many(
+    vector_store,
+    queries: Sequence[str],
+    k: int = 6,
+    *,
+    max_chars: int = 120_000,
+    mode: str | None = None,
+    jsonl_path: Path | str | None = None,
+    country: str = "tw",
+) -> str:
+    """
+    Retrieve excerpts for all ``queries`` at once and format them for prompts.
+
+    The vector side embeds every query in one batched request and runs a single
+    ``index.search`` over the stacked query matrix. ``mode`` (default
+    ``FOOD_INNOVATOR_RETRIEVAL_MODE``, else ``"hybrid"``) picks FAISS, BM25 over
+    ``additive_chunks.jsonl``, or both fused by reciprocal rank per query.
+    Without a vector store only ``mode="lexical"`` retrieves anything; hybrid
+    and vector return "", so BM25-only context is always an explicit choice.
+    Hits are merged in query order, overlapping segments deduped, and output
+    capped at ``max_chars``.
+
+    Metadata is expected from ``build_tw_chunks.py`` or ``build_html_chunks.py``
+    (``chunk_id``, ``zh_name``, ``en_name``, etc.); vector hits for another
+    ``country`` are dropped. Pass ``jsonl_path`` for a non-Taiwan chunk file.
+    """
+    mode = _retrieval_mode(vector_store, mode)
+    queries = [q.strip() for q in queries or [] if (q or "").strip()]
+    if mode is None or not queries:
+        return ""
+    return _format_hits(_ranked_hits_many(vector_store, queries, k, mode, jsonl_path, country), max_chars)
+
+
+def retrieve_each(
+    vector_store,
+    queries: Sequence[str],
+    k: int = 6,
+    *,
+    max_chars: int = 120_000,
+    mode: str | None = None,
+    jsonl_path: Path | str | None = None,
+    country: str = "tw",
+) -> list[str]:
+    """
+    Like :func:`retrieve_many`, but one formatted context per query, in order.
+
+    Still a single batched embedding request and ``index.search`` for all
+    queries; only the formatting (dedupe, ``max_chars``) is per query.
+    """
+    mode = _retrieval_mode(vector_store, mode)
+    stripped = [(q or "").strip() for q in queries or []]
+    wanted = [q for q in stripped if q]
+    if mode is None or not wanted:
+        return ["" for _ in stripped]
+    ranked = dict(zip(wanted, _ranked_hits_many(vector_store, wanted, k, mode, jsonl_path, country)))
+    return [_format_hits([ranked[q]], max_chars) if q else "" for q in stripped]
+
+
+def retrieve_tw_additive_context(
+    vector_store,
+    queries: Sequence[str],
+    *,
+    k: int = 6,
+    max_chars: int = 120_000,
+    mode: str | None = None,
+    jsonl_path: Path | str | None = None,
+) -> str:
+    """Keyword-argument form of :func:`retrieve_many`, kept for existing callers."""
+    return retrieve_many(
+        vector_store,
+        queries,
+        k,
+        max_chars=max_chars,
+        mode=mode,
+        jsonl_path=jsonl_path,
+    )
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Benchmark chunk building in build_tw_chunks.py: row-wise reference vs column-wise.
+
+Loads the Taiwan CSVs from the manifest, repeats the rows --repeat times (with
+distinct item numbers) to approximate a multi-country list, then times cleaning
+plus JSONL writing both ways and checks the outputs are byte-identical.
+
+    python scripts/bench_build_chunks.py --repeat 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from scripts.build_tw_chunks import (  # noqa: E402
+    ADDITIVE_COL_MAP,
+    CATEGORY_COL_MAP,
+    DEFAULT_MANIFEST,
+    _repo_path,
+    additive_chunk_id,
+    build_chunk_text,
+    clean_frame,
+    load_tw_source,
+    normalize_cell,
+    write_jsonl,
+)
+
+
+def clean_frame_rowwise(df: pd.DataFrame) -> pd.DataFrame:
+    """The previous element-wise ``clean_frame`` (reference implementation)."""
+    df = df.copy()
+    df.columns = [str(c).strip() for c in df.columns]
+    unnamed = [c for c in df.columns if str(c).startswith("Unnamed")]
+    for c in unnamed:
+        if df[c].isna().all() or (df[c].astype(str).str.strip() == "").all():
+            df = df.drop(columns=[c])
+    for col in df.columns:
+        if col in unnamed:
+            continue
+        df[col] = df[col].map(lambda x: normalize_cell(x) if pd.notna(x) else "")
+    return df
+
+
+def write_jsonl_rowwise(
+    merged: pd.DataFrame,
+    out_path: Path,
+    country: str,
+    source_id: str,
+    as_of_date: str,
+    official_url: str,
+) -> list[dict[str, Any]]:
+    """The previous ``iterrows`` ``write_jsonl`` (reference implementation)."""
+    records: list[dict[str, Any]] = []
+    with out_path.open("w", encoding="utf-8") as out_f:
+        for _, row in merged.iterrows():
+            item_no = str(row["item_no"])
+            cid = additive_chunk_id(country, row["zh_name"], item_no)
+            text = build_chunk_text(
+                row["zh_name"],
+                row["en_name"],
+                row["category"],
+                row.get("scope_and_limits", ""),
+                row.get("usage_restrictions", ""),
+                row.get("category_description", "") or "",
+            )
+            meta = {
+                "country": country,
+                "source_id": source_id,
+                "zh_name": row["zh_name"],
+                "en_name": row["en_name"],
+                "category": row["category"],
+                "as_of_date": as_of_date,
+                "official_url": official_url,
+                "doc_type": "additive",
+                "item_no": item_no,
+            }
+            rec = {"id": cid, "text": text, "metadata": meta}
+            records.append(rec)
+            out_f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    return records
+
+
+def merge(add_df: pd.DataFrame, cat_df: pd.DataFrame, clean) -> pd.DataFrame:
+    add_df = clean(add_df).rename(columns=ADDITIVE_COL_MAP)
+    cat_df = clean(cat_df).rename(columns=CATEGORY_COL_MAP)
+    cat_df = cat_df.drop_duplicates(subset=["category_name"], keep="first")
+    merged = add_df.merge(
+        cat_df[["category_name", "category_description"]],
+        how="left",
+        left_on="category",
+        right_on="category_name",
+        validate="m:1",
+    )
+    merged["category_name"] = merged["category_name"].fillna("")
+    merged["category_description"] = merged["category_description"].fillna("")
+    return merged
+
+
+def run(add_df, cat_df, clean, write, out_path: Path) -> float:
+    start = time.perf_counter()
+    merged = merge(add_df, cat_df, clean)
+    write(merged, out_path, "tw", "bench", "2026-01-01", "https://example.invalid")
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--manifest", type=Path, default=DEFAULT_MANIFEST)
+    parser.add_argument("--encoding", type=str, default="utf-8-sig")
+    parser.add_argument("--repeat", type=int, default=50, help="Copies of the additive rows.")
+    args = parser.parse_args()
+
+    source = load_tw_source(args.manifest, None)
+    additives_path, categories_path = [_repo_path(p) for p in source["raw_paths"][:2]]
+    base = pd.read_csv(additives_path, encoding=args.encoding)
+    cat_df = pd.read_csv(categories_path, encoding=args.encoding)
+    item_col = next(k for k, v in ADDITIVE_COL_MAP.items() if v == "item_no")
+    copies = []
+    for i in range(args.repeat):
+        copy = base.copy()
+        copy[item_col] = copy[item_col].astype(str) + f"-{i}"
+        copies.append(copy)
+    add_df = pd.concat(copies, ignore_index=True)
+    rows = len(add_df)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        old_path, new_path = Path(tmp) / "rowwise.jsonl", Path(tmp) / "columnwise.jsonl"
+        t_old = run(add_df, cat_df, clean_frame_rowwise, write_jsonl_rowwise, old_path)
+        t_new = run(add_df, cat_df, clean_frame, write_jsonl, new_path)
+        identical = old_path.read_bytes() == new_path.read_bytes()
+
+    print(f"{rows} rows")
+    print(f"row-wise    : {t_old:7.2f}s  {rows / t_old:10,.0f} rows/s")
+    print(f"column-wise : {t_new:7.2f}s  {rows / t_new:10,.0f} rows/s  ({t_old / t_new:.1f}x)")
+    print(f"identical output: {identical}")
+    if not identical:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
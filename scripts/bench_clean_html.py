@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark HTML cleaning in modules/html_clean.py: serial html.parser vs the
+pooled, hash-skipping ensure_clean_txt_files.
+
+Copies the pages in html_pages/ --repeat times into a temp folder, then times
+a cold run the old way (one page after another with html.parser), a cold run
+with the default parser (in a spawned process pool from POOL_MIN_PAGES stale
+pages), and a warm run where every page is unchanged. Checks that every .txt
+matches the html.parser output.
+
+    python scripts/bench_clean_html.py --repeat 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from modules.html_clean import CLEAN_HTML_PARSER, clean_html, ensure_clean_txt_files  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=Path, default=REPO_ROOT / "html_pages")
+    parser.add_argument("--repeat", type=int, default=20, help="Copies of each page.")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count).")
+    args = parser.parse_args()
+
+    sources = sorted(args.pages.glob("*.html"))
+    if not sources:
+        raise SystemExit(f"No .html files in {args.pages}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work = Path(tmp)
+        for i in range(args.repeat):
+            for src in sources:
+                shutil.copyfile(src, work / f"{src.stem}_{i}.html")
+        pages = sorted(work.glob("*.html"))
+        n = len(pages)
+
+        start = time.perf_counter()
+        reference = {p.name: clean_html(p.read_text(encoding="utf-8"), "html.parser") for p in pages}
+        t_serial = time.perf_counter() - start
+
+        start = time.perf_counter()
+        ensure_clean_txt_files(work, max_workers=args.workers)
+        t_cold = time.perf_counter() - start
+
+        start = time.perf_counter()
+        ensure_clean_txt_files(work, max_workers=args.workers)
+        t_warm = time.perf_counter() - start
+
+        identical = all(
+            p.with_suffix(".txt").read_text(encoding="utf-8") == reference[p.name] for p in pages
+        )
+
+    print(f"{n} pages, parser={CLEAN_HTML_PARSER}")
+    print(f"serial html.parser : {t_serial:7.2f}s  {n / t_serial:8.1f} pages/s")
+    print(f"cold               : {t_cold:7.2f}s  {n / t_cold:8.1f} pages/s  ({t_serial / t_cold:.1f}x)")
+    print(f"unchanged          : {t_warm:7.2f}s  {n / t_warm:8.1f} pages/s  ({t_serial / t_warm:.1f}x)")
+    print(f"identical output: {identical}")
+    if not identical:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
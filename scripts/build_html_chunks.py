@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Build regulation RAG chunks from saved HTML pages listed in data/sources_manifest.yaml.
+
+For every source whose raw_paths are .html files (Hong Kong and Macao by
+default), the page is split into heading-scoped sections by
+modules/html_sections.py: one chunk per regulation or additive entry, plus one
+per run of loose paragraphs. They are written in the same JSONL schema as
+build_tw_chunks.py, so the app's BM25 / FAISS retrieval serves only the
+relevant excerpts. With --embed, a FAISS index and chunk store are built per
+country exactly as for Taiwan.
+
+    python scripts/build_html_chunks.py                 # hk + mo JSONL
+    python scripts/build_html_chunks.py --country hk --embed --embedding-backend hashed-ngram
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from modules.html_sections import html_sections  # noqa: E402
+from scripts.build_tw_chunks import DEFAULT_MANIFEST, _repo_path, build_faiss_index  # noqa: E402
+
+PROCESSED_DIR = REPO_ROOT / "data" / "processed"
+# Output folder under data/processed per country code.
+COUNTRY_DIRS = {
+    "hk": "hongkong",
+    "mo": "macao",
+}
+CHUNKS_FILE = "regulation_chunks.jsonl"
+
+
+def country_dir(country: str) -> Path:
+    return PROCESSED_DIR / COUNTRY_DIRS.get(country, country)
+
+
+def load_html_sources(manifest_path: Path, countries: list[str] | None) -> list[dict[str, Any]]:
+    with manifest_path.open(encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+    sources = [
+        s
+        for s in data.get("sources") or []
+        if any(str(p).endswith((".html", ".htm")) for p in s.get("raw_paths") or [])
+    ]
+    if countries:
+        sources = [s for s in sources if s.get("country_code") in countries]
+    if not sources:
+        raise SystemExit("No HTML sources in the manifest for the requested countries.")
+    return sources
+
+
+def section_chunk_id(country: str, source_id: str, headings: list[str], title: str, ordinal: int) -> str:
+    raw = f"{country}|{source_id}|{' > '.join(headings)}|{title}|{ordinal}".encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+def build_section_text(title: str, headings: list[str], body: str) -> str:
+    parts = [f"項目: {title}"]
+    if headings:
+        parts.append(f"章節: {' > '.join(headings)}")
+    parts.append(f"內容:\n{body}")
+    return "\n".join(parts)
+
+
+def section_records(source: dict[str, Any]) -> list[dict[str, Any]]:
+    """One JSONL record per section of every HTML page in ``source``, in page order."""
+    country = source["country_code"]
+    source_id = source.get("source_id") or f"{country}_regulation_pages"
+    as_of_date = str(source.get("as_of_date") or "")
+    official_url = str(source.get("official_url") or "")
+    records: list[dict[str, Any]] = []
+    for path_str in source.get("raw_paths") or []:
+        path = _repo_path(path_str)
+        if not path.is_file():
+            raise SystemExit(f"Missing file: {path}")
+        sections = html_sections(path.read_text(encoding="utf-8"), base_url=official_url)
+        if not sections:
+            print(
+                f"Warning: no content sections in {path.name}; the saved page may be "
+                "rendered by JavaScript. Save the page after it has loaded.",
+                file=sys.stderr,
+            )
+        for section in sections:
+            ordinal = len(records) + 1
+            headings, title = section["headings"], section["title"]
+            records.append({
+                "id": section_chunk_id(country, source_id, headings, title, ordinal),
+                "text": build_section_text(title, headings, section["text"]),
+                "metadata": {
+                    "country": country,
+                    "source_id": source_id,
+                    "zh_name": title,
+                    "en_name": "",
+                    "category": " > ".join(headings),
+                    "as_of_date": as_of_date,
+                    "official_url": official_url,
+                    "doc_type": "regulation_section",
+                    "item_no": str(ordinal),
+                },
+            })
+    return records
+
+
+def write_records(records: list[dict[str, Any]], out_path: Path) -> None:
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with out_path.open("w", encoding="utf-8") as f:
+        f.writelines(json.dumps(rec, ensure_ascii=False) + "\n" for rec in records)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build regulation chunks JSONL (+ optional FAISS) from HTML pages.")
+    parser.add_argument("--manifest", type=Path, default=DEFAULT_MANIFEST)
+    parser.add_argument(
+        "--country",
+        action="append",
+        default=None,
+        help="Country code to build (repeatable); default: every HTML source in the manifest.",
+    )
+    parser.add_argument(
+        "--embed",
+        action="store_true",
+        help="Also build data/processed/<country>/vector_store (the google backend needs GOOGLE_API_KEY).",
+    )
+    parser.add_argument(
+        "--embedding-backend",
+        choices=("google", "hashed-ngram"),
+        default=None,
+        help="Embedding backend for --embed; defaults to the source's embedding_backend, else google.",
+    )
+    parser.add_argument("--embedding-model", type=str, default="models/gemini-embedding-001")
+    parser.add_argument("--embed-max-chars", type=int, default=1800)
+    parser.add_argument("--embed-overlap", type=int, default=200)
+    args = parser.parse_args()
+
+    manifest_path = args.manifest if args.manifest.is_absolute() else REPO_ROOT / args.manifest
+    for source in load_html_sources(manifest_path, args.country):
+        country = source["country_code"]
+        records = section_records(source)
+        out_jsonl = country_dir(country) / CHUNKS_FILE
+        write_records(records, out_jsonl)
+        print(f"[{country}] Wrote {len(records)} chunks to {out_jsonl}")
+        if args.embed and records:
+            build_faiss_index(
+                records,
+                country_dir(country) / "vector_store",
+                args.embedding_model,
+                args.embed_max_chars,
+                args.embed_overlap,
+                backend=args.embedding_backend or source.get("embedding_backend") or "google",
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,19 +2,25 @@
 """
 Build Taiwan additive RAG chunks from raw CSVs listed in data/sources_manifest.yaml.
 
-Writes JSONL (one additive per line). With --embed, builds a local FAISS index
-(long texts are split into multiple vectors sharing the same additive id).
+Writes JSONL (one additive per line) and a structured scope/limit CSV
+(one row per 使用食品範圍及限量 clause). With --embed, builds a local FAISS index
+(long texts are split into multiple vectors sharing the same additive id) plus
+a memory-mapped chunk store the app reads instead of unpickling index.pkl.
+Embeddings are checkpointed after every batch, so an interrupted --embed run
+resumes where it stopped; --incremental keeps them keyed by segment text hash
+and re-embeds only new or changed segments. --embedding-backend hashed-ngram
+builds the index with a CPU-local vectorizer instead (no API key or network).
 """
 
 from __future__ import annotations
 
 import argparse
+import csv
 import hashlib
 import json
 import os
 import re
 import sys
-import time
 from pathlib import Path
 from typing import Any
 
@@ -22,9 +28,12 @@ import pandas as pd
 import yaml
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
 DEFAULT_MANIFEST = REPO_ROOT / "data" / "sources_manifest.yaml"
 DEFAULT_JSONL = REPO_ROOT / "data" / "processed" / "taiwan" / "additive_chunks.jsonl"
 DEFAULT_VECTOR_DIR = REPO_ROOT / "data" / "processed" / "taiwan" / "vector_store"
+DEFAULT_LIMITS_CSV = REPO_ROOT / "data" / "processed" / "taiwan" / "additive_limits.csv"
 
 ADDITIVE_COL_MAP = {
     "項次": "item_no",
@@ -73,6 +82,15 @@ def normalize_cell(value: Any) -> str:
     return s.strip()
 
 
+def normalize_column(col: pd.Series) -> pd.Series:
+    """:func:`normalize_cell` for a whole column, using vectorized string ops."""
+    out = col.astype(str)
+    out = out.str.replace("\r\n", "\n", regex=False).str.replace("\r", "\n", regex=False).str.strip()
+    out = out.str.replace(r"\n{3,}", "\n\n", regex=True)
+    out = out.str.replace(r"[ \t\f\v]+", " ", regex=True).str.strip()
+    return out.where(col.notna(), "")
+
+
 def clean_frame(df: pd.DataFrame) -> pd.DataFrame:
     df = df.copy()
     df.columns = [str(c).strip() for c in df.columns]
@@ -84,7 +102,7 @@ def clean_frame(df: pd.DataFrame) -> pd.DataFrame:
     for col in df.columns:
         if col in unnamed:
             continue
-        df[col] = df[col].map(lambda x: normalize_cell(x) if pd.notna(x) else "")
+        df[col] = normalize_column(df[col])
     return df
 
 
@@ -93,6 +111,16 @@ def additive_chunk_id(country: str, zh_name: str, item_no: str) -> str:
     return hashlib.sha256(raw).hexdigest()
 
 
+def additive_chunk_ids(country: str, zh_names: pd.Series, item_nos: pd.Series) -> pd.Series:
+    """:func:`additive_chunk_id` for every row; keys are concatenated column-wise."""
+    keys = (country + "|") + zh_names.astype(str) + "|" + item_nos.astype(str)
+    return pd.Series(
+        [hashlib.sha256(k.encode("utf-8")).hexdigest() for k in keys],
+        index=zh_names.index,
+        dtype=object,
+    )
+
+
 def build_chunk_text(
     zh_name: str,
     en_name: str,
@@ -115,6 +143,169 @@ def build_chunk_text(
     return "\n\n".join(parts)
 
 
+def build_chunk_texts(merged: pd.DataFrame) -> pd.Series:
+    """:func:`build_chunk_text` for every row of ``merged``, column-wise."""
+
+    def col(name: str) -> pd.Series:
+        if name not in merged.columns:
+            return pd.Series("", index=merged.index, dtype=object)
+        return merged[name].fillna("").astype(str)
+
+    def optional(header: str, values: pd.Series) -> pd.Series:
+        return ("\n\n" + header + "\n" + values).where(values != "", "")
+
+    text = (
+        "中文品名: " + col("zh_name")
+        + "\n\n英文品名: " + col("en_name")
+        + "\n\n類別: " + col("category")
+    )
+    text = text + optional("使用食品範圍及限量:", col("scope_and_limits"))
+    text = text + optional("使用限制:", col("usage_restrictions"))
+    return text + optional("類別規則與說明:", col("category_description"))
+
+
+# -----------------------------------------------------------
+# Structured scope / limit clauses (使用食品範圍及限量)
+#
+# Each numbered clause is matched against the phrasings the FDA list actually
+# uses. Anything else, including clauses with trailing exceptions (但…), is
+# kept with parsed=0 so the app sends that additive to RAG + Gemini instead.
+# Compound clauses (one food range nesting another 用量…以下 limit, or several
+# ranges joined by ；) are also left unparsed: the lazy food group would swallow
+# the inner limit and keep only the last one.
+# -----------------------------------------------------------
+
+_NUM = r"(?P<amount>\d+(?:\.\d+)?)"
+_MASS_UNIT = r"(?P<unit>g/kg|mg/kg|ppm|%|％|g/L|mg/L)"
+_USE = r"(?:本品)?可(?:使用|用)?於"
+_TAIL = r"\s*(?:[(（](?P<note>[^()（）]*)[)）])?\s*[。.]?$"
+
+SCOPE_CLAUSE_PATTERNS = [
+    ("limit", re.compile(
+        "^" + _USE + r"(?P<foods>.+?)[；;，,]\s*(?:其)?用量以?(?P<basis>[^；;，,。]+?)計(?:為|在)?\s*"
+        + _NUM + r"\s*" + _MASS_UNIT + r"\s*以下" + _TAIL
+    )),
+    ("limit", re.compile(
+        "^" + _USE + r"(?P<foods>.+?)[；;，,]\s*(?:其)?用量(?:為|在)\s*"
+        + _NUM + r"\s*" + _MASS_UNIT + r"\s*以下" + _TAIL
+    )),
+    ("residue", re.compile(
+        "^" + _USE + r"(?P<foods>.+?)[；;，,]\s*(?:於\S*?中)?(?:之)?殘留量(?:應)?(?:在|為)\s*"
+        + _NUM + r"\s*" + _MASS_UNIT + r"\s*以下" + _TAIL
+    )),
+    ("gmp", re.compile("^" + _USE + r"(?P<foods>.+?)中?視(?:為)?實際需要(?:適)?量使用[。.]?$")),
+    ("daily", re.compile(
+        r"^(?P<foods>[^，。；]+?)，在每日食用量(?P<per300>或每300g食品\(未標示每日食用量者\))?中，"
+        r"其(?P<basis>[^；;，,。]+?)之總含量不得高於\s*" + _NUM + r"\s*(?P<unit>mg|μg|g)[。.]?$"
+    )),
+    ("scope", re.compile("^" + _USE + r"(?P<foods>[^；;，,。]+?)[。.]?$")),
+]
+
+_NESTED_CLAUSE = re.compile(r"用量|以下|[；;]")
+
+_TO_G_PER_KG = {"g/kg": 1.0, "mg/kg": 0.001, "ppm": 0.001, "%": 10.0, "％": 10.0}
+
+LIMIT_COLUMNS = [
+    "chunk_id",
+    "item_no",
+    "zh_name",
+    "en_name",
+    "category",
+    "clause_no",
+    "limit_type",
+    "food_scope",
+    "max_amount",
+    "unit",
+    "max_g_per_kg",
+    "basis",
+    "note",
+    "parsed",
+    "clause_text",
+]
+
+
+def split_scope_clauses(scope_text: str) -> list[str]:
+    clauses = []
+    for line in (scope_text or "").split("\n"):
+        line = re.sub(r"^\s*\d+\s*[.．、]\s*", "", line).strip()
+        if line:
+            clauses.append(line)
+    return clauses
+
+
+def parse_scope_clause(clause: str) -> dict[str, Any]:
+    """Structured fields for one clause; ``parsed`` is False when no pattern matched."""
+    normalized = re.sub(r"\s*/\s*", "/", clause)
+    for limit_type, pattern in SCOPE_CLAUSE_PATTERNS:
+        m = pattern.match(normalized)
+        if not m:
+            continue
+        g = m.groupdict()
+        if _NESTED_CLAUSE.search(g.get("foods") or ""):
+            break
+        unit = g.get("unit") or ""
+        amount = g.get("amount") or ""
+        factor = _TO_G_PER_KG.get(unit)
+        note = g.get("note") or ""
+        if g.get("per300"):
+            note = "未標示每日食用量者以每300g食品計"
+        return {
+            "limit_type": limit_type,
+            "food_scope": (g.get("foods") or "").strip(),
+            "max_amount": amount,
+            "unit": unit,
+            "max_g_per_kg": f"{float(amount) * factor:g}" if amount and factor else "",
+            "basis": (g.get("basis") or "").strip(),
+            "note": note.strip(),
+            "parsed": True,
+        }
+    return {
+        "limit_type": "",
+        "food_scope": "",
+        "max_amount": "",
+        "unit": "",
+        "max_g_per_kg": "",
+        "basis": "",
+        "note": "",
+        "parsed": False,
+    }
+
+
+def write_limits_table(merged: pd.DataFrame, out_path: Path, country: str) -> tuple[int, int]:
+    """Write one CSV row per scope clause; return (rows, additives fully parsed)."""
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    n_rows = 0
+    n_parsed = 0
+    item_nos = merged["item_no"].astype(str)
+    chunk_ids = additive_chunk_ids(country, merged["zh_name"], item_nos)
+    scopes = merged["scope_and_limits"] if "scope_and_limits" in merged.columns else [""] * len(merged)
+    with out_path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=LIMIT_COLUMNS)
+        writer.writeheader()
+        for cid, item_no, zh_name, en_name, category, scope in zip(
+            chunk_ids, item_nos, merged["zh_name"], merged["en_name"], merged["category"], scopes
+        ):
+            clauses = split_scope_clauses(scope)
+            all_parsed = bool(clauses)
+            for i, clause in enumerate(clauses, 1):
+                fields = parse_scope_clause(clause)
+                all_parsed = all_parsed and fields["parsed"]
+                writer.writerow({
+                    "chunk_id": cid,
+                    "item_no": item_no,
+                    "zh_name": zh_name,
+                    "en_name": en_name,
+                    "category": category,
+                    "clause_no": i,
+                    **fields,
+                    "parsed": int(fields["parsed"]),
+                    "clause_text": clause,
+                })
+                n_rows += 1
+            n_parsed += all_parsed
+    return n_rows, n_parsed
+
+
 def split_for_embedding(text: str, max_chars: int, overlap: int) -> list[str]:
     if not text:
         return [""]
@@ -165,61 +356,166 @@ def write_jsonl(
     source_id: str,
     as_of_date: str,
     official_url: str,
+    batch_rows: int = 5000,
 ) -> list[dict[str, Any]]:
+    """
+    Write one JSON line per additive and return the records.
+
+    Ids and chunk texts are built column-wise for the whole frame; lines are
+    serialized and written ``batch_rows`` at a time.
+    """
     out_path.parent.mkdir(parents=True, exist_ok=True)
+    item_nos = merged["item_no"].astype(str)
+    chunk_ids = additive_chunk_ids(country, merged["zh_name"], item_nos)
+    texts = build_chunk_texts(merged)
+    columns = list(zip(chunk_ids, texts, merged["zh_name"], merged["en_name"], merged["category"], item_nos))
     records: list[dict[str, Any]] = []
     with out_path.open("w", encoding="utf-8") as out_f:
-        for _, row in merged.iterrows():
-            zh_name = row["zh_name"]
-            en_name = row["en_name"]
-            item_no = str(row["item_no"])
-            category = row["category"]
-            scope = row.get("scope_and_limits", "")
-            restrictions = row.get("usage_restrictions", "")
-            cat_desc = row.get("category_description", "") or ""
-            cid = additive_chunk_id(country, zh_name, item_no)
-            text = build_chunk_text(
-                zh_name, en_name, category, scope, restrictions, cat_desc
-            )
-            meta = {
-                "country": country,
-                "source_id": source_id,
-                "zh_name": zh_name,
-                "en_name": en_name,
-                "category": category,
-                "as_of_date": as_of_date,
-                "official_url": official_url,
-                "doc_type": "additive",
-                "item_no": item_no,
-            }
-            rec = {"id": cid, "text": text, "metadata": meta}
-            records.append(rec)
-            out_f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        for start in range(0, len(columns), batch_rows):
+            lines = []
+            for cid, text, zh_name, en_name, category, item_no in columns[start:start + batch_rows]:
+                meta = {
+                    "country": country,
+                    "source_id": source_id,
+                    "zh_name": zh_name,
+                    "en_name": en_name,
+                    "category": category,
+                    "as_of_date": as_of_date,
+                    "official_url": official_url,
+                    "doc_type": "additive",
+                    "item_no": item_no,
+                }
+                rec = {"id": cid, "text": text, "metadata": meta}
+                records.append(rec)
+                lines.append(json.dumps(rec, ensure_ascii=False) + "\n")
+            out_f.writelines(lines)
     return records
 
 
+def _text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _write_atomic(path: Path, write) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+class EmbeddingStore:
+    """
+    Text-hash → vector sidecar, saved after every batch.
+
+    Layout: ``embeddings.npy`` (row i is the vector for ``keys.json[i]``, a
+    sha256 of the segment text) and ``meta.json`` naming the embedding model;
+    a store written with another model is ignored. Used as the resume
+    checkpoint for full builds and as the persistent cache for --incremental.
+    """
+
+    def __init__(self, directory: Path, embedding_model: str):
+        self.directory = directory
+        self.meta = {"embedding_model": embedding_model}
+        self.keys: list[str] = []
+        self.matrix = None
+        self._row: dict[str, int] = {}
+
+    @property
+    def _paths(self) -> tuple[Path, Path, Path]:
+        d = self.directory
+        return d / "embeddings.npy", d / "keys.json", d / "meta.json"
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._row
+
+    def load(self) -> int:
+        import numpy as np
+
+        npy_path, keys_path, meta_path = self._paths
+        if not (npy_path.is_file() and keys_path.is_file() and meta_path.is_file()):
+            return 0
+        if json.loads(meta_path.read_text(encoding="utf-8")) != self.meta:
+            print(f"Ignoring embedding store in {self.directory} (different embedding model).")
+            return 0
+        keys = json.loads(keys_path.read_text(encoding="utf-8"))
+        matrix = np.load(npy_path)
+        if len(matrix) != len(keys):
+            return 0
+        self._set(keys, matrix)
+        return len(keys)
+
+    def _set(self, keys: list[str], matrix) -> None:
+        self.keys = keys
+        self.matrix = matrix
+        self._row = {k: i for i, k in enumerate(keys)}
+
+    def save(self) -> None:
+        import numpy as np
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        npy_path, keys_path, meta_path = self._paths
+        matrix = self.matrix if self.matrix is not None else np.zeros((0, 0), dtype="float32")
+        _write_atomic(npy_path, lambda f: np.save(f, matrix))
+        _write_atomic(keys_path, lambda f: f.write(json.dumps(self.keys).encode("utf-8")))
+        _write_atomic(meta_path, lambda f: f.write(json.dumps(self.meta).encode("utf-8")))
+
+    def add(self, keys: list[str], vectors: list[list[float]]) -> None:
+        import numpy as np
+
+        new = np.asarray(vectors, dtype="float32")
+        matrix = new if self.matrix is None or not len(self.matrix) else np.vstack([self.matrix, new])
+        self._set(self.keys + list(keys), matrix)
+        self.save()
+
+    def prune(self, keep: set[str]) -> int:
+        """Drop vectors whose key is not in ``keep``; return how many were removed."""
+        rows = [i for i, k in enumerate(self.keys) if k in keep]
+        removed = len(self.keys) - len(rows)
+        if removed:
+            self._set([self.keys[i] for i in rows], self.matrix[rows])
+            self.save()
+        return removed
+
+    def vectors_for(self, keys: list[str]) -> list[list[float]]:
+        return self.matrix[[self._row[k] for k in keys]].tolist()
+
+    def discard(self) -> None:
+        for p in self._paths:
+            p.unlink(missing_ok=True)
+        if self.directory.is_dir() and not any(self.directory.iterdir()):
+            self.directory.rmdir()
+
+
 def build_faiss_index(
     records: list[dict[str, Any]],
     vector_dir: Path,
     embedding_model: str,
     max_chunk_chars: int,
     overlap: int,
+    batch_size: int = 80,
+    incremental: bool = False,
+    backend: str = "google",
 ) -> None:
     try:
         from langchain_community.vectorstores import FAISS
-        from langchain_core.documents import Document
-        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+        from modules.chunk_store import write_chunk_store
+        from modules.embeddings import (
+            HashedNgramEmbeddings,
+            google_embeddings,
+            write_embedding_config,
+        )
     except ImportError as e:
         raise SystemExit(
             "Embedding dependencies missing. Install requirements "
             "(langchain, langchain-community, langchain-google-genai, faiss-cpu)."
         ) from e
 
-    if not os.environ.get("GOOGLE_API_KEY"):
-        raise SystemExit("GOOGLE_API_KEY is required for --embed.")
-
-    embeddings = GoogleGenerativeAIEmbeddings(model=embedding_model)
-    docs: list[Document] = []
+    texts: list[str] = []
+    metadatas: list[dict[str, Any]] = []
     for rec in records:
         base_id = rec["id"]
         meta_base = dict(rec["metadata"])
@@ -232,32 +528,80 @@ def build_faiss_index(
                 "chunk_part": i,
                 "chunk_total": total,
             }
-            docs.append(Document(page_content=piece, metadata=md))
+            texts.append(piece)
+            metadatas.append(md)
 
-    vector_dir.mkdir(parents=True, exist_ok=True)
-    batch_size = 80
-    store = None
-    for i in range(0, len(docs), batch_size):
-        batch = docs[i:i + batch_size]
-        batch_no = i // batch_size + 1
-        total_batches = (len(docs) + batch_size - 1) // batch_size
-
-        print(f"Embedding batch {batch_no}/{total_batches}: {len(batch)} docs")
-
-    if store is None:
-        store = FAISS.from_documents(batch, embeddings)
-    else:
-        store.add_documents(batch)
-
-    if i + batch_size < len(docs):
-        print("Sleeping 65s to avoid Gemini free-tier 429...")
-        time.sleep(65)
-
-    if store is None:
+    if not texts:
         raise SystemExit("No documents to embed.")
 
+    vector_dir.mkdir(parents=True, exist_ok=True)
+    if backend == "hashed-ngram":
+        # CPU-local and fast enough to rebuild from scratch; no checkpointing needed.
+        local = HashedNgramEmbeddings().fit(texts)
+        store = FAISS.from_embeddings(
+            text_embeddings=list(zip(texts, local.embed_documents(texts))),
+            embedding=local,
+            metadatas=metadatas,
+        )
+        store.save_local(str(vector_dir))
+        write_chunk_store(vector_dir, texts, metadatas)
+        local.save(vector_dir)
+        write_embedding_config(vector_dir, local.config())
+        print(f"Wrote FAISS index to {vector_dir} ({len(texts)} vectors, hashed-ngram).")
+        return
+
+    api_key = os.environ.get("GOOGLE_API_KEY")
+    if not api_key:
+        raise SystemExit("GOOGLE_API_KEY is required for --embed with the google backend.")
+
+    # Calls queue on the shared token bucket (GEMINI_EMBED_RPM / GEMINI_EMBED_TPM)
+    # instead of sleeping a fixed interval between batches.
+    embeddings = google_embeddings(google_api_key=api_key, embedding_model=embedding_model)
+    # --incremental keeps the store next to the index for the next run; a full
+    # build only uses it as a resume checkpoint and removes it on success.
+    store_dir = vector_dir / ("embedding_store" if incremental else "embed_checkpoint")
+    emb_store = EmbeddingStore(store_dir, embedding_model)
+    if emb_store.load():
+        print(f"Loaded {len(emb_store)} stored embeddings from {store_dir}.")
+
+    keys = [_text_hash(t) for t in texts]
+    todo: dict[str, str] = {}
+    for key, text in zip(keys, texts):
+        if key not in emb_store and key not in todo:
+            todo[key] = text
+    print(f"{len(texts)} segments: {len(texts) - len(todo)} reused, {len(todo)} to embed.")
+
+    todo_keys = list(todo)
+    total_batches = (len(todo_keys) + batch_size - 1) // batch_size
+    for start in range(0, len(todo_keys), batch_size):
+        batch_keys = todo_keys[start:start + batch_size]
+        batch_no = start // batch_size + 1
+        print(f"Embedding batch {batch_no}/{total_batches}: {len(batch_keys)} docs")
+        try:
+            vectors = embeddings.embed_documents([todo[k] for k in batch_keys])
+        except Exception as e:
+            raise SystemExit(
+                f"Embedding failed on batch {batch_no} ({e}). "
+                f"Completed batches are saved in {store_dir}; rerun to resume."
+            ) from e
+        emb_store.add(batch_keys, vectors)
+
+    removed = emb_store.prune(set(keys))
+    if removed:
+        print(f"Dropped {removed} embeddings for segments no longer present.")
+
+    store = FAISS.from_embeddings(
+        text_embeddings=list(zip(texts, emb_store.vectors_for(keys))),
+        embedding=embeddings,
+        metadatas=metadatas,
+    )
     store.save_local(str(vector_dir))
-    print(f"Wrote FAISS index to {vector_dir} ({len(docs)} vectors).")
+    write_chunk_store(vector_dir, texts, metadatas)
+    (vector_dir / HashedNgramEmbeddings.IDF_FILE).unlink(missing_ok=True)
+    write_embedding_config(vector_dir, {"backend": "google", "model": embedding_model})
+    if not incremental:
+        emb_store.discard()
+    print(f"Wrote FAISS index to {vector_dir} ({len(texts)} vectors).")
 
 
 def main() -> None:
@@ -266,7 +610,24 @@ def main() -> None:
     parser.add_argument("--source-id", type=str, default=None)
     parser.add_argument("--encoding", type=str, default="utf-8-sig")
     parser.add_argument("--output-jsonl", type=Path, default=DEFAULT_JSONL)
-    parser.add_argument("--embed", action="store_true", help="Build FAISS index (needs GOOGLE_API_KEY).")
+    parser.add_argument(
+        "--output-limits",
+        type=Path,
+        default=DEFAULT_LIMITS_CSV,
+        help="Structured scope/limit table used to answer exact Taiwan hits without Gemini.",
+    )
+    parser.add_argument(
+        "--embed",
+        action="store_true",
+        help="Build FAISS index (the google backend needs GOOGLE_API_KEY).",
+    )
+    parser.add_argument(
+        "--embedding-backend",
+        choices=("google", "hashed-ngram"),
+        default=None,
+        help="Embedding backend for --embed; defaults to the source's embedding_backend "
+        "in the manifest, else google. hashed-ngram is CPU-local and needs no network.",
+    )
     parser.add_argument("--vector-dir", type=Path, default=DEFAULT_VECTOR_DIR)
     parser.add_argument(
         "--embedding-model",
@@ -286,6 +647,17 @@ def main() -> None:
         default=200,
         help="Overlap between embedding segments.",
     )
+    parser.add_argument(
+        "--embed-batch-size",
+        type=int,
+        default=80,
+        help="Segments per embedding request; progress is checkpointed after each batch.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="With --embed: reuse stored vectors for unchanged segments and embed only new/changed ones.",
+    )
     args = parser.parse_args()
 
     manifest_path = args.manifest if args.manifest.is_absolute() else REPO_ROOT / args.manifest
@@ -318,6 +690,13 @@ def main() -> None:
     records = write_jsonl(merged, out_jsonl, country, source_id, as_of_date, official_url)
     print(f"Wrote {len(records)} chunks to {out_jsonl}")
 
+    out_limits = args.output_limits if args.output_limits.is_absolute() else REPO_ROOT / args.output_limits
+    n_rows, n_parsed = write_limits_table(merged, out_limits, country)
+    print(
+        f"Wrote {n_rows} limit clauses to {out_limits} "
+        f"({n_parsed}/{len(records)} additives fully structured)"
+    )
+
     if args.embed:
         vdir = args.vector_dir if args.vector_dir.is_absolute() else REPO_ROOT / args.vector_dir
         build_faiss_index(
@@ -326,6 +705,9 @@ def main() -> None:
             args.embedding_model,
             args.embed_max_chars,
             args.embed_overlap,
+            args.embed_batch_size,
+            args.incremental,
+            args.embedding_backend or source.get("embedding_backend") or "google",
         )
 
 
@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Keep the SQLite response cache / rate limiter out of the working tree.
+os.environ.setdefault("FOOD_INNOVATOR_CACHE_DIR", tempfile.mkdtemp(prefix="food-innovator-tests-"))
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
@@ -0,0 +1,38 @@
+import json
+
+from modules.tw_additive_rag import AdditiveIndex, get_additive_index, tw_resolves_locally
+
+
+def _index(tmp_path, names):
+    path = tmp_path / "chunks.jsonl"
+    with path.open("w", encoding="utf-8") as f:
+        for i, (zh, en) in enumerate(names):
+            rec = {"id": str(i), "text": f"中文品名: {zh}", "metadata": {"zh_name": zh, "en_name": en}}
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    return AdditiveIndex(path).refresh()
+
+
+def test_vitamin_b1_does_not_resolve_to_b12():
+    records, how = get_additive_index().resolve("維生素B1")
+    assert all("B12" not in r["metadata"]["zh_name"] and "Ｂ12" not in r["metadata"]["zh_name"] for r in records)
+    assert not tw_resolves_locally("維生素B1")
+
+
+def test_fuzzy_keeps_numerals(tmp_path):
+    index = _index(tmp_path, [("食用黃色四十號", "Yellow No. 40"), ("維生素b12", "Vitamin B12")])
+    assert index.resolve("食用黃色四號") == ([], "")
+    assert index.resolve("維生素b1") == ([], "")
+
+
+def test_fuzzy_hit_with_same_numerals(tmp_path):
+    index = _index(tmp_path, [("食用黃色四號", "Tartrazine"), ("食用紅色六號", "Ponceau 4R")])
+    records, how = index.resolve("食用黃色四號素")
+    assert how == "fuzzy"
+    assert [r["metadata"]["zh_name"] for r in records] == ["食用黃色四號"]
+
+
+def test_fuzzy_hit_is_not_a_local_resolution():
+    index = get_additive_index()
+    _, how = index.resolve("山梨酸鈣鉀")
+    assert how == "fuzzy"
+    assert not tw_resolves_locally("山梨酸鈣鉀")
@@ -0,0 +1,45 @@
+import csv
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "scripts"))
+
+from build_tw_chunks import DEFAULT_LIMITS_CSV, parse_scope_clause  # noqa: E402
+
+SULFITE_KONJAC = (
+    "本品可使用於蒟蒻：非直接供食用之蒟蒻原料，用量以SO2殘留量計為0.90 g/kg以下；"
+    "直接供食用之蒟蒻製品，用量以SO2殘留量計為0.030 g/kg以下。"
+)
+SULFITES = {
+    "亞硫酸鉀",
+    "亞硫酸鈉",
+    "亞硫酸鈉（無水）",
+    "亞硫酸氫鈉",
+    "低亞硫酸鈉",
+    "偏亞硫酸氫鉀",
+    "亞硫酸氫鉀",
+    "偏亞硫酸氫鈉",
+}
+
+
+def test_simple_limit_clause_is_parsed():
+    fields = parse_scope_clause("本品可使用於麥芽飲料（不含酒精）；用量以SO2殘留量計為0.03 g/kg以下。")
+    assert fields["parsed"]
+    assert fields["limit_type"] == "limit"
+    assert fields["food_scope"] == "麥芽飲料（不含酒精）"
+    assert fields["max_g_per_kg"] == "0.03"
+    assert fields["basis"] == "SO2殘留量"
+
+
+def test_compound_konjac_clause_is_left_unparsed():
+    fields = parse_scope_clause(SULFITE_KONJAC)
+    assert not fields["parsed"]
+    assert fields["max_g_per_kg"] == ""
+
+
+def test_limits_csv_has_no_parsed_compound_konjac_rows():
+    with DEFAULT_LIMITS_CSV.open(encoding="utf-8", newline="") as f:
+        rows = [r for r in csv.DictReader(f) if r["clause_text"] == SULFITE_KONJAC]
+    assert {r["zh_name"] for r in rows} == SULFITES
+    assert all(r["parsed"] == "0" and r["max_g_per_kg"] == "" for r in rows)
@@ -0,0 +1,57 @@
+import pytest
+
+pytest.importorskip("streamlit")
+
+from gemini_utils import estimate_tokens
+from modules import ai_chat
+from modules.ai_chat import ChatMemory
+
+
+def _messages(n):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"訊息{i}"} for i in range(n)]
+
+
+@pytest.fixture
+def folds(monkeypatch):
+    calls = []
+
+    def fake_generate(client, model_name, prompt, **kwargs):
+        calls.append(kwargs)
+        return "摘要"
+
+    monkeypatch.setattr(ai_chat, "_gemini_generate", fake_generate)
+    return calls
+
+
+def _fold_now(memory, messages):
+    memory.update(None, "gemini-test", messages)
+    if memory._pending is not None:
+        memory._pending.result()
+    memory.update(None, "gemini-test", messages)
+
+
+def test_old_turns_are_folded_into_summary(folds):
+    memory = ChatMemory(keep_turns=2)
+    messages = _messages(10)
+    _fold_now(memory, messages)
+
+    assert (memory.summary, memory.folded) == ("摘要", 6)
+    assert folds == [{"max_retries": 2, "use_cache": False}]
+    block = memory.history_block(messages)
+    assert "先前對話摘要：\n摘要" in block
+    assert "訊息5" not in block and "訊息6" in block and "訊息9" in block
+
+
+def test_cleared_history_resets_summary(folds):
+    memory = ChatMemory(keep_turns=2)
+    _fold_now(memory, _messages(10))
+    memory.update(None, "gemini-test", [])
+    assert (memory.summary, memory.folded) == ("", 0)
+
+
+def test_history_block_stays_within_budget():
+    memory = ChatMemory(token_budget=200)
+    messages = [{"role": "user", "content": f"{i}" + "長" * 500} for i in range(20)]
+    block = memory.history_block(messages)
+    assert estimate_tokens(block) <= memory.token_budget + estimate_tokens("對話記錄：\n") + 5
+    assert "AI" not in block and "使用者：19" in block
@@ -0,0 +1,47 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from modules.chunk_store import ChunkStore, chunk_store_ready, write_chunk_store
+
+TEXTS = ["中文品名: 山梨酸鉀", "", "含換行\n與「引號」及 emoji 🍵"]
+METAS = [{"source": "a.txt", "row": 0}, {}, {"source": "c.txt", "tags": ["防腐劑"]}]
+
+
+def test_rows_round_trip_through_offsets(tmp_path):
+    write_chunk_store(tmp_path, TEXTS, METAS)
+    assert chunk_store_ready(tmp_path)
+    assert not list(tmp_path.glob("*.tmp"))
+
+    store = ChunkStore(tmp_path)
+    assert len(store) == 3
+    assert store.offsets[0] == 0
+    assert store.offsets[-1] == (tmp_path / "chunks.jsonl").stat().st_size
+    assert [store.get(i) for i in range(3)] == [{"text": t, "metadata": m} for t, m in zip(TEXTS, METAS)]
+    assert store.get_many([2, 0]) == [store.get(2), store.get(0)]
+
+
+def test_empty_store(tmp_path):
+    write_chunk_store(tmp_path, [], [])
+    assert len(ChunkStore(tmp_path)) == 0
+
+
+def test_missing_offsets_is_not_ready(tmp_path):
+    write_chunk_store(tmp_path, TEXTS, METAS)
+    (tmp_path / "chunks.offsets.npy").unlink()
+    assert not chunk_store_ready(tmp_path)
+
+
+def test_search_rows_map_to_chunks(tmp_path):
+    faiss = pytest.importorskip("faiss")
+    np = pytest.importorskip("numpy")
+    from modules.chunk_store import MappedVectorStore
+
+    write_chunk_store(tmp_path, TEXTS, METAS)
+    index = faiss.IndexFlatL2(2)
+    index.add(np.asarray([[0, 0], [5, 5], [10, 10]], dtype="float32"))
+    vs = MappedVectorStore(index, ChunkStore(tmp_path))
+
+    hits = vs.search_vectors([[9, 9], [0, 1]], k=1)
+    assert [[row for row, _ in h] for h in hits] == [[2], [0]]
+    assert [d.page_content for d in vs.documents([2])] == [TEXTS[2]]
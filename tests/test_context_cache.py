@@ -0,0 +1,135 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import gemini_utils
+from gemini_utils import ContextCache
+
+PREFIX = "大型靜態前綴" * 400
+SMALL_PREFIX = "短前綴"
+
+
+class FakeCaches:
+    def __init__(self, ttl_override=None):
+        self.live = {}
+        self.calls = []
+        self.ttl_override = ttl_override
+        self._n = 0
+
+    def create(self, model, config):
+        self._n += 1
+        name = f"cachedContents/{self._n}"
+        ttl = self.ttl_override if self.ttl_override is not None else int(config["ttl"].rstrip("s"))
+        self.live[name] = config["contents"][0]
+        self.calls.append(("create", name))
+        return SimpleNamespace(name=name, expire_time=time.time() + ttl)
+
+    def update(self, name, config):
+        self.calls.append(("update", name))
+        if name not in self.live:
+            raise RuntimeError(f"404 NOT_FOUND {name}")
+
+    def delete(self, name):
+        self.calls.append(("delete", name))
+        self.live.pop(name, None)
+
+    def count(self, op):
+        return sum(1 for call, _ in self.calls if call == op)
+
+
+class FakeModels:
+    def __init__(self, caches):
+        self.caches = caches
+        self.requests = []
+
+    def generate_content(self, model, contents, config=None):
+        self.requests.append((contents, config))
+        if config and config["cached_content"] not in self.caches.live:
+            raise RuntimeError("400 INVALID_ARGUMENT cached content not found")
+        part = SimpleNamespace(text=f"ok:{len(contents)}", thought=False)
+        return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
+
+
+class FakeClient:
+    def __init__(self, api_key="test-key", ttl_override=None):
+        self.caches = FakeCaches(ttl_override)
+        self.models = FakeModels(self.caches)
+        gemini_utils.register_api_key(self, api_key)
+
+
+@pytest.fixture
+def context_cache(monkeypatch):
+    cache = ContextCache(ttl_seconds=3600, refresh_margin=300, max_entries=2, min_tokens=1024)
+    monkeypatch.setattr(gemini_utils, "_context_cache", cache)
+    return cache
+
+
+def test_create_then_reuse(context_cache):
+    client = FakeClient()
+    first = context_cache.handle(client, "gemini-test", PREFIX)
+    second = context_cache.handle(client, "gemini-test", PREFIX)
+    assert first == second == "cachedContents/1"
+    assert client.caches.count("create") == 1
+    assert context_cache.stats()["reused"] == 1
+
+
+def test_small_prefix_is_sent_inline(context_cache):
+    client = FakeClient()
+    assert context_cache.handle(client, "gemini-test", SMALL_PREFIX) is None
+    assert client.caches.calls == []
+
+
+def test_handle_near_expiry_is_refreshed(context_cache):
+    client = FakeClient(ttl_override=60)  # inside the 300 s refresh margin
+    name = context_cache.handle(client, "gemini-test", PREFIX)
+    assert context_cache.handle(client, "gemini-test", PREFIX) == name
+    assert client.caches.count("create") == 1
+    assert client.caches.count("update") == 1
+    assert context_cache.stats()["refreshed"] == 1
+
+
+def test_least_used_handle_is_evicted(context_cache):
+    client = FakeClient()
+    hot = context_cache.handle(client, "gemini-test", PREFIX + "a")
+    context_cache.handle(client, "gemini-test", PREFIX + "a")
+    cold = context_cache.handle(client, "gemini-test", PREFIX + "b")
+    context_cache.handle(client, "gemini-test", PREFIX + "c")
+    assert ("delete", cold) in client.caches.calls
+    assert hot in client.caches.live
+    assert context_cache.stats()["entries"] == 2
+    assert context_cache.stats()["evicted"] == 1
+
+
+def test_invalid_handle_falls_back_to_inline(context_cache):
+    client = FakeClient()
+    name = context_cache.handle(client, "gemini-test", PREFIX)
+    client.caches.live.pop(name)  # deleted or expired server-side
+
+    text = gemini_utils.gemini_generate(
+        client, "gemini-test", "問題", use_cache=False, cached_prefix=PREFIX
+    )
+
+    (_, failed_config), (inline_contents, inline_config) = client.models.requests
+    assert failed_config == {"cached_content": name}
+    assert inline_config is None
+    assert inline_contents == f"{PREFIX}\n\n問題"
+    assert text == f"ok:{len(inline_contents)}"
+
+
+def test_create_is_throttled_and_retried(context_cache, monkeypatch):
+    client = FakeClient()
+    throttled = []
+    monkeypatch.setattr(gemini_utils, "_throttle", lambda c, m, prompt: throttled.append(prompt))
+    monkeypatch.setattr(gemini_utils.time, "sleep", lambda s: None)
+    create = client.caches.create
+    failures = iter([RuntimeError("429 RESOURCE_EXHAUSTED")])
+
+    def flaky_create(model, config):
+        for error in failures:
+            raise error
+        return create(model, config)
+
+    client.caches.create = flaky_create
+    assert context_cache.handle(client, "gemini-test", PREFIX) == "cachedContents/1"
+    assert throttled == [PREFIX, PREFIX]
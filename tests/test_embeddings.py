@@ -0,0 +1,45 @@
+import math
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("langchain_core")
+
+from modules.embeddings import HashedNgramEmbeddings
+
+CORPUS = ["山梨酸鉀 防腐劑", "苯甲酸鈉 防腐劑", "阿斯巴甜 甜味劑", "二丁基羥基甲苯 抗氧化劑"]
+
+
+def _fitted(dim=512):
+    return HashedNgramEmbeddings(dim=dim).fit(CORPUS)
+
+
+def test_vectors_are_deterministic_and_normalized():
+    first = _fitted().embed_query("山梨酸鉀")
+    second = _fitted().embed_documents(["山梨酸鉀"])[0]
+    assert first == second
+    assert len(first) == 512
+    assert math.isclose(math.fsum(x * x for x in first), 1.0, rel_tol=1e-5)
+
+
+def test_dimension_follows_config_and_survives_reload(tmp_path):
+    model = _fitted(dim=128)
+    model.save(tmp_path)
+    reloaded = HashedNgramEmbeddings.load(tmp_path, model.config())
+    assert reloaded.dim == 128
+    assert reloaded.embed_queries(["阿斯巴甜"]) == model.embed_queries(["阿斯巴甜"])
+
+
+def test_width_and_case_variants_embed_alike():
+    model = _fitted()
+    assert model.embed_query("ＢＨＴ  抗氧化劑") == model.embed_query("bht 抗氧化劑")
+
+
+def test_shared_ngrams_rank_closer():
+    model = _fitted()
+    query = model.embed_query("山梨酸")
+
+    def dot(text):
+        return sum(a * b for a, b in zip(query, model.embed_query(text)))
+
+    assert dot("山梨酸鉀") > dot("阿斯巴甜")
@@ -0,0 +1,105 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import gemini_utils
+from gemini_utils import FileUploadCache
+
+
+class FakeFiles:
+    def __init__(self, ttl=48 * 3600):
+        self.ttl = ttl
+        self.remote = {}
+        self.uploads = []
+
+    def upload(self, file, config):
+        name = f"files/{len(self.uploads) + 1}"
+        self.uploads.append(config["display_name"])
+        self.remote[name] = SimpleNamespace(
+            name=name, uri=f"https://files/{name}", mime_type="text/plain",
+            state="ACTIVE", expiration_time=time.time() + self.ttl,
+        )
+        return self.remote[name]
+
+    def get(self, name):
+        if name not in self.remote:
+            raise RuntimeError(f"404 NOT_FOUND {name}")
+        return self.remote[name]
+
+
+@pytest.fixture
+def client():
+    return SimpleNamespace(files=FakeFiles())
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return FileUploadCache(tmp_path / "uploads.json", refresh_margin=3600)
+
+
+def _page(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def test_upload_once_then_reuse_across_instances(tmp_path, cache, client):
+    a = _page(tmp_path, "a.txt", "法規 A")
+    first = cache.ensure(client, [a])
+    second = FileUploadCache(cache.path).ensure(client, [a])
+    assert client.files.uploads == ["a.txt"]
+    assert second["a.txt"]["file_uri"] == first["a.txt"]["file_uri"]
+
+
+def test_renamed_file_reuses_and_edited_file_uploads(tmp_path, cache, client):
+    a = _page(tmp_path, "a.txt", "法規 A")
+    cache.ensure(client, [a])
+    renamed = _page(tmp_path, "a_copy.txt", "法規 A")
+    assert cache.ensure(client, [renamed])["a_copy.txt"]["file_name"] == "files/1"
+
+    a.write_text("法規 A（修正）", encoding="utf-8")
+    assert cache.ensure(client, [a])["a.txt"]["file_name"] == "files/2"
+
+
+def test_expiring_or_missing_remote_is_uploaded_again(tmp_path, cache, client):
+    a = _page(tmp_path, "a.txt", "法規 A")
+    b = _page(tmp_path, "b.txt", "法規 B")
+    cache.ensure(client, [a, b])
+    client.files.remote["files/1"].expiration_time = time.time() + 60  # inside refresh_margin
+    client.files.remote.pop("files/2")  # deleted server-side
+
+    cache.ensure(client, [a, b])
+    assert len(client.files.uploads) == 4
+
+
+def test_expired_entries_are_dropped_from_state(tmp_path, cache):
+    client = SimpleNamespace(files=FakeFiles(ttl=-1))
+    cache.ensure(client, [_page(tmp_path, "a.txt", "法規 A")])
+    assert cache._read() == {}
+
+
+def test_state_is_read_under_the_file_lock(tmp_path, cache, client):
+    pytest.importorskip("fcntl")
+    a = _page(tmp_path, "a.txt", "法規 A")
+    done = threading.Event()
+    worker = threading.Thread(target=lambda: (cache.ensure(client, [a]), done.set()))
+    with gemini_utils._file_lock(cache._lock_path):
+        worker.start()
+        assert not done.wait(0.2)
+        assert client.files.uploads == []
+    worker.join(5)
+    assert done.is_set()
+
+
+def test_concurrent_sessions_merge_their_entries(tmp_path, cache, client):
+    paths = [_page(tmp_path, f"{i}.txt", f"法規 {i}") for i in range(6)]
+    threads = [
+        threading.Thread(target=FileUploadCache(cache.path).ensure, args=(client, [p])) for p in paths
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert {e["display_name"] for e in cache._read().values()} == {p.name for p in paths}
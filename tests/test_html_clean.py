@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+pytest.importorskip("bs4")
+
+from modules import html_clean
+from modules.html_clean import CLEAN_STATE_FILE, ensure_clean_txt_files
+
+PAGE = "<html><body><nav>選單</nav><p>食品添加物</p><a href='https://example.org'>法規</a></body></html>"
+
+
+def _write_pages(folder, names):
+    for name in names:
+        (folder / f"{name}.html").write_text(PAGE.replace("食品添加物", name), encoding="utf-8")
+
+
+def _run(folder, **kwargs):
+    log = []
+    txt_files = ensure_clean_txt_files(folder, log_fn=log.append, **kwargs)
+    return txt_files, log
+
+
+def _state(folder):
+    return json.loads((folder / CLEAN_STATE_FILE).read_text(encoding="utf-8"))
+
+
+def test_unchanged_pages_are_skipped_and_edits_recleaned(tmp_path):
+    _write_pages(tmp_path, ["a", "b"])
+    txt_files, log = _run(tmp_path)
+    assert [p.name for p in txt_files] == ["a.txt", "b.txt"]
+    assert log == ["✅ Cleaned a.html", "✅ Cleaned b.html"]
+    assert (tmp_path / "a.txt").read_text(encoding="utf-8") == "a\n法規 (https://example.org)"
+
+    _, log = _run(tmp_path)
+    assert log == ["🔁 Using cached: a.txt", "🔁 Using cached: b.txt"]
+
+    (tmp_path / "b.html").write_text(PAGE.replace("食品添加物", "b2"), encoding="utf-8")
+    _, log = _run(tmp_path)
+    assert log == ["🔁 Using cached: a.txt", "✅ Cleaned b.html"]
+    assert (tmp_path / "b.txt").read_text(encoding="utf-8").startswith("b2")
+
+
+def test_force_clean_and_cleaner_version_invalidate(tmp_path, monkeypatch):
+    _write_pages(tmp_path, ["a"])
+    _run(tmp_path)
+    _, log = _run(tmp_path, force_clean=True)
+    assert log == ["✅ Cleaned a.html"]
+
+    monkeypatch.setattr(html_clean, "CLEANER_VERSION", html_clean.CLEANER_VERSION + 1)
+    _, log = _run(tmp_path)
+    assert log == ["✅ Cleaned a.html"]
+
+
+def test_state_of_deleted_pages_is_dropped(tmp_path):
+    _write_pages(tmp_path, ["a", "b"])
+    _run(tmp_path)
+    (tmp_path / "b.html").unlink()
+
+    txt_files, log = _run(tmp_path)
+    assert [p.name for p in txt_files] == ["a.txt"]
+    assert log == ["🔁 Using cached: a.txt"]
+    assert set(_state(tmp_path)) == {"a.html"}
+
+
+def test_pool_cleans_many_pages(tmp_path, monkeypatch):
+    monkeypatch.setattr(html_clean, "POOL_MIN_PAGES", 2)
+    _write_pages(tmp_path, ["a", "b", "c"])
+    txt_files, _ = _run(tmp_path, max_workers=2)
+    assert all(p.read_text(encoding="utf-8").startswith(p.stem) for p in txt_files)
+    assert set(_state(tmp_path)) == {"a.html", "b.html", "c.html"}
@@ -0,0 +1,28 @@
+import gemini_utils
+from gemini_utils import client_limit_key, rate_limit_for, register_api_key
+
+
+class Client:
+    pass
+
+
+def test_limit_key_uses_the_registered_api_key():
+    a, b, c = Client(), Client(), Client()
+    register_api_key(a, "key-a")
+    register_api_key(b, "key-a")
+    register_api_key(c, "key-b")
+    assert client_limit_key(a, "m") == client_limit_key(b, "m") == client_limit_key("key-a", "m")
+    assert client_limit_key(a, "m") != client_limit_key(c, "m")
+
+
+def test_unregistered_clients_share_one_bucket():
+    assert client_limit_key(Client(), "m") == client_limit_key(Client(), "m")
+
+
+def test_per_model_quotas(monkeypatch):
+    monkeypatch.setenv("GEMINI_QUOTA_TIER", "tier1")
+    monkeypatch.setenv("GEMINI_RPM", "50")
+    monkeypatch.setattr(gemini_utils, "RATE_LIMITS", gemini_utils._quota_table())
+    assert rate_limit_for("gemini-2.0-flash") == (50.0, 4_000_000.0)
+    assert rate_limit_for("models/gemini-embedding-001") == (3_000.0, 1_000_000.0)
+    assert rate_limit_for("some-new-model") == (50.0, 1_000_000.0)
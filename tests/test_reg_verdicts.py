@@ -0,0 +1,18 @@
+from modules.reg_verdicts import VerdictCache, match_rows_to_items
+
+KEY = {"source_id": "tw", "as_of_date": "2026-04-01", "model": "gemini-test"}
+
+
+def test_every_row_per_item_is_kept(tmp_path):
+    reg_json = [
+        {"項目": "山梨酸", "使用狀態": "允許", "條件/限量": "乾酪 3.0 g/kg"},
+        {"項目": "山梨酸", "使用狀態": "允許", "條件/限量": "果醬 1.0 g/kg"},
+        {"項目": "己二烯酸", "使用狀態": "資料不足"},
+    ]
+    matched = match_rows_to_items(reg_json, ["山梨酸", "己二烯酸"])
+    assert len(matched["山梨酸"]) == 2
+
+    cache = VerdictCache(tmp_path / "verdicts.sqlite3")
+    cache.put_many("tw", matched, **KEY)
+    hits = cache.get_many("tw", ["山梨酸", "己二烯酸"], **KEY)
+    assert hits == {"山梨酸": matched["山梨酸"]}
@@ -0,0 +1,39 @@
+import time
+
+from gemini_utils import ResponseCache
+
+
+def test_key_is_stable_and_scoped_to_model():
+    key = ResponseCache.make_key("gemini-a", "提示")
+    assert key == ResponseCache.make_key("gemini-a", "提示")
+    assert key != ResponseCache.make_key("gemini-b", "提示")
+    assert key != ResponseCache.make_key("gemini-a", "提示 ")
+
+
+def test_hit_then_expiry(tmp_path, monkeypatch):
+    cache = ResponseCache(tmp_path / "responses.sqlite3", ttl_seconds=60)
+    key = cache.make_key("gemini-a", "提示")
+    cache.set(key, "gemini-a", "回覆")
+    assert cache.get(key) == "回覆"
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert cache.get(key) is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 0, "bytes": 0}
+
+
+def test_entries_persist_across_instances(tmp_path):
+    path = tmp_path / "responses.sqlite3"
+    key = ResponseCache.make_key("gemini-a", "提示")
+    ResponseCache(path).set(key, "gemini-a", "回覆")
+    assert ResponseCache(path).get(key) == "回覆"
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = ResponseCache(tmp_path / "responses.sqlite3", max_bytes=20)
+    cache.set("old", "m", "a" * 10)
+    cache.set("new", "m", "b" * 10)
+    cache.get("old")
+    cache.set("newest", "m", "c" * 10)
+    assert cache.get("new") is None
+    assert cache.get("old") == "a" * 10
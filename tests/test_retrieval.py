@@ -0,0 +1,73 @@
+from pathlib import Path
+
+from modules.tw_additive_rag import (
+    retrieve_each,
+    retrieve_many,
+    retrieve_tw_additive_context_exact_first,
+    retrieve_tw_additive_contexts_exact_first,
+)
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_no_vector_store_returns_no_context_unless_lexical():
+    assert retrieve_many(None, ["己二烯酸"], mode="hybrid") == ""
+    assert retrieve_many(None, ["己二烯酸"], mode="vector") == ""
+    assert "己二烯酸" in retrieve_many(None, ["己二烯酸"], mode="lexical")
+
+
+def test_exact_names_still_resolve_without_vector_store():
+    assert "己二烯酸" in retrieve_tw_additive_context_exact_first(None, ["己二烯酸"])
+
+
+def test_lexical_hits_need_enough_of_the_query():
+    hk = REPO_ROOT / "data" / "processed" / "hongkong" / "regulation_chunks.jsonl"
+    # Only shares "酸" / "鉀"-style characters with legislation titles.
+    assert retrieve_many(None, ["山梨酸鉀"], mode="lexical", jsonl_path=hk, country="hk") == ""
+    assert "防腐劑" in retrieve_many(None, ["防腐劑"], mode="lexical", jsonl_path=hk, country="hk")
+
+
+class _Doc:
+    def __init__(self, text, metadata):
+        self.page_content = text
+        self.metadata = metadata
+
+
+class _FakeVectorStore:
+    """One document per query index; records how many batched calls were made."""
+
+    def __init__(self):
+        self.embed_calls = []
+        self.search_calls = 0
+        self.embedding_function = self
+
+    def embed_queries(self, queries):
+        self.embed_calls.append(list(queries))
+        return [[float(i)] for i in range(len(queries))]
+
+    def search_vectors(self, vectors, k):
+        self.search_calls += 1
+        return [[(int(v[0]), 0.0)] for v in vectors]
+
+    def documents(self, rows):
+        return [_Doc(f"doc-{r}", {"chunk_id": f"c{r}", "zh_name": f"名{r}"}) for r in rows]
+
+
+def test_retrieve_each_batches_and_splits_per_query():
+    vs = _FakeVectorStore()
+    contexts = retrieve_each(vs, ["甲", "乙", "丙"], 1, mode="vector")
+    assert vs.embed_calls == [["甲", "乙", "丙"]]
+    assert vs.search_calls == 1
+    assert [("doc-0" in c, "doc-1" in c, "doc-2" in c) for c in contexts] == [
+        (True, False, False),
+        (False, True, False),
+        (False, False, True),
+    ]
+
+
+def test_exact_first_contexts_search_only_unresolved_items():
+    vs = _FakeVectorStore()
+    contexts = retrieve_tw_additive_contexts_exact_first(vs, ["己二烯酸", "某未知添加物"], k=1)
+    assert vs.embed_calls == [["某未知添加物"]]
+    assert "己二烯酸" in contexts[0] and "doc-0" not in contexts[0]
+    assert "doc-0" in contexts[1]
@@ -0,0 +1,52 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from gemini_utils import SingleFlight
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def _run_concurrently(flight, fn, callers=4):
+    release = threading.Event()
+    runs = []
+
+    def work():
+        runs.append(1)
+        release.wait(5)
+        return fn()
+
+    with ThreadPoolExecutor(callers) as pool:
+        futures = [pool.submit(flight.do, "key", work) for _ in range(callers)]
+        _wait_for(lambda: flight.stats()["coalesced"] == callers - 1)
+        release.set()
+    return runs, futures
+
+
+def test_concurrent_callers_share_one_run():
+    flight = SingleFlight()
+    runs, futures = _run_concurrently(flight, lambda: "結果")
+    assert [f.result() for f in futures] == ["結果"] * 4
+    assert len(runs) == 1
+    assert flight.stats() == {"calls": 4, "coalesced": 3, "in_flight": 0}
+
+
+def test_error_reaches_every_waiter_and_is_not_remembered():
+    flight = SingleFlight()
+
+    def fail():
+        raise RuntimeError("503 UNAVAILABLE")
+
+    runs, futures = _run_concurrently(flight, fail)
+    for future in futures:
+        with pytest.raises(RuntimeError, match="503"):
+            future.result()
+    assert len(runs) == 1
+    assert flight.do("key", lambda: "重試成功") == "重試成功"
@@ -0,0 +1,18 @@
+from modules.tw_additive_rag import tw_structured_verdicts, usage_conditions
+
+
+def test_antioxidant_rows_carry_exclusion_and_sum_rule():
+    rows = tw_structured_verdicts("二丁基羥基甲苯")
+    assert rows
+    for row in rows:
+        assert row["使用狀態"] == "允許（附條件）"
+        assert "不包括鮮乳及保久乳" in row["標示或衛生要求"]
+        assert "總和應不得大於1" in row["標示或衛生要求"]
+
+
+def test_wrapped_sweetener_rule_is_joined():
+    text = (
+        "中文品名: 甲\n\n類別規則與說明:\n1. 本表為正面表列，非表列之食品品項，不得使用該\n食品添加物。\n"
+        "2. 同一食品依表列使用範圍規定混合使用甜味劑時，每一種\n甜味劑之使用量除以其用量標準所得之數值總和不得大於1。"
+    )
+    assert usage_conditions(text) == ["同一食品依表列使用範圍規定混合使用甜味劑時，每一種甜味劑之使用量除以其用量標準所得之數值總和不得大於1。"]